@@ -5,34 +5,97 @@ Calculations provided by aiida_spirit.
 Register calculations via the "aiida.calculations" entry point in setup.json.
 """
 from os import path  #modification to run test
+import hashlib
+import posixpath
+import shutil
+import zipfile
 import numpy as np
-from pandas import DataFrame
 from aiida.common import datastructures
 from aiida.engine import CalcJob
-from aiida.orm import Dict, StructureData, ArrayData, List
-from .data._formatting_info import _forbidden_keys
-from .data._type_check import verify_input_para  #, validate_input_dict
+from aiida.orm import Dict, StructureData, ArrayData, List, RemoteData, QueryBuilder, Computer, CalcJobNode
+from .data._formatting_info import _forbidden_keys, _plugin_keys
+from .data._input_template import InputTemplate
+from .data._type_check import verify_input_para, validate_float  #, validate_input_dict
+from .data._run_options import RUN_OPTIONS_HELP, validate_run_options, validate_monte_carlo_restart
 from .tools.spirit_script_builder import SpiritScriptBuilder
+from .tools.mc_script_builder import MCScriptBuilder
+from .tools.stationarity_script_builder import StationarityScriptBuilder
+from .tools import writers, observables, compression, mc_sampling, checkpoints, stationarity
+from .tools.writers import (iter_array_chunks, open_array_file, format_rows,
+                            write_couplings, write_pinning, write_defects,
+                            write_initial_state)
+from .tools.file_cache import get_file_cache, get_node_hash
+from .tools.ovf import OVF_FILETYPES, write_ovf
+from .tools.compression import COMPRESSION_SUFFIXES
 
 # this is the template input config file which is read in and changed according to the inputs
 TEMPLATE_PATH = path.join(path.dirname(path.realpath(__file__)),
                           'data/input_original.cfg')
+# the template is parsed only once, rendering then only changes the lines of the given keys
+INPUT_TEMPLATE = InputTemplate.from_file(TEMPLATE_PATH)
 
 # define file names
 _RUN_SPIRIT = 'run_spirit.py'  # python file that runs the spirit job through the spirit python API
 _SPIRIT_STDOUT = 'spirit.stdout'  # filename where the stdout of the spirit run is put
 _INPUT_CFG = 'input_created.cfg'  # spirit input file
 _ATOM_TYPES = 'atom_types.txt'
+_INITIAL_STATE = 'initial_state.txt'  # initial spin directions (text format)
+_INITIAL_STATE_OVF = 'initial_state.ovf'  # initial spin directions (binary OVF format)
+_COUPLINGS = 'couplings.txt'  # couplings file that is read by spirit
+_COUPLINGS_ARCHIVE = 'couplings.npz'  # compressed binary couplings that are expanded on the compute node
+_WRITERS_MODULE = 'aiida_spirit_writers'  # copy of aiida_spirit.tools.writers that is used in run_spirit.py
+_OBSERVABLES_MODULE = 'aiida_spirit_observables'  # copy of aiida_spirit.tools.observables used in run_spirit.py
+_COMPRESSION_MODULE = 'aiida_spirit_compression'  # copy of aiida_spirit.tools.compression used in run_spirit.py
+_MC_SAMPLING_MODULE = 'aiida_spirit_mc_sampling'  # copy of aiida_spirit.tools.mc_sampling used in run_spirit.py
+_CHECKPOINTS_MODULE = 'aiida_spirit_checkpoints'  # copy of aiida_spirit.tools.checkpoints used in run_spirit.py
+_STATIONARITY_MODULE = 'aiida_spirit_stationarity'  # copy of aiida_spirit.tools.stationarity used in run_spirit.py
+_SUMMARY = 'summary.json'  # observables of the final state that are computed on the compute node
+_TIMINGS = 'timings.json'  # wall-clock time and peak memory of the phases of run_spirit.py
+_RUN_INFO = 'run_info.json'  # machine readable summary of the run (written in the quiet mode)
+_PARENT_FOLDER = 'parent_calc'  # folder into which the spin configurations of the parent_folder are linked
+_RESTART_INFO = 'restart_info.json'  # spin configuration file and iteration from which a run is continued
+_CHECKPOINT = 'spirit_Image-00_Spins-checkpoint.ovf'  # periodic checkpoint of the spin configuration
+_STATIONARITY = 'stationarity.json'  # reason for the stop and averages of an LLG run that is run until stationary
+
+# allowed formats in which the couplings are uploaded
+_COUPLINGS_FORMATS = {'text': _COUPLINGS, 'npz': _COUPLINGS_ARCHIVE}
 
 # Default retrieve list
 _RETLIST = [_SPIRIT_STDOUT, _INPUT_CFG, _RUN_SPIRIT, _ATOM_TYPES]
 
+# output files of spirit that are needed by the parser
+_LLG_OUTPUT_FILES = [
+    'spirit_Image-00_Energy-archive.txt', 'spirit_Image-00_Spins-final.ovf',
+    'spirit_Image-00_Spins-initial.ovf'
+]
+_MC_OUTPUT_FILES = ['output_mc.txt']
+_MC_RESTART = 'output_mc_restart.txt'  # finished temperatures of a previous MC run (monte_carlo_restart input)
+
+# columns of output_mc.txt (the MC run writes the first _N_MC_COLUMNS, the parallel tempering all columns)
+_MC_COLUMNS = [
+    'temperature', 'energy', 'magnetization', 'susceptibility',
+    'specific_heat', 'binder_cumulant', 'energy_error', 'magnetization_error',
+    'n_samples', 'n_effective_samples', 'n_decorrelation',
+    'exchange_acceptance'
+]
+_N_MC_COLUMNS = 11
+
+# default of the time (in seconds) that is kept free at the end of the job for writing the output files
+# if the walltime_margin is not set in the run_options: 10% of the max_wallclock_seconds but at most 10 minutes
+_MAX_WALLTIME_MARGIN = 600
+
 
 # validators for input ports
 def validate_params(params, _):  # pylint: disable=inconsistent-return-statements
     """Validate the input parameters."""
     for key, val in params.get_dict().items():
-        if key not in _forbidden_keys:
+        if key in _plugin_keys:
+            # special keywords that are handled by the plugin and are not written to the input config
+            try:
+                validate_float(key, val, *_plugin_keys[key])
+            except TypeError as err:
+                return f'Parameters validator returned TypeError: {err}'
+        elif key not in _forbidden_keys:
             try:
                 _ = verify_input_para(key, val)
             except ValueError as err:
@@ -62,6 +125,12 @@ class SpiritCalculation(CalcJob):
             'num_mpiprocs_per_machine': 1,
         }
         spec.inputs['metadata']['options']['parser_name'].default = 'spirit'
+        spec.input('metadata.options.shared_couplings_folder', valid_type=str, required=False,
+                   help="""Absolute path of a folder on the remote computer in which the couplings files
+                        are stored once per content hash. If this is given, the couplings file is only
+                        uploaded if no previous calculation on the computer finished with the same file,
+                        and it is symlinked from this folder into the working directory of the calculation.
+                        """)
 
         # put here the input ports (parameters, structure, jij_data, ...)
         spec.input('parameters', valid_type=Dict, required=False,
@@ -70,20 +139,13 @@ class SpiritCalculation(CalcJob):
                         (see https://spirit-docs.readthedocs.io/en/latest/core/docs/Input.html).
                         """)
         spec.input('run_options', valid_type=Dict, required=False,
+                   validator=validate_run_options,
                    default=lambda: Dict(dict={'simulation_method': 'LLG',
                                               'solver': 'Depondt',
                                               'configuration': {},
                                               'post_processing': '',
                                              }),
-                   help="""Dict node that allows to control the spirit run
-                        (e.g. simulation_method=LLG, solver=Depondt).
-                        The configuration input specifies the input configuration
-                        (the default is to start from a random configuration,
-                        plus_z is also possible to start from all spins pointing in +z).
-                        The post_processing string is added to the run script and allows
-                        to add e.g. quantities.get_topological_charge(p_state) for the
-                        calculation of the topological charge of a 2D system.
-                        """)
+                   help=RUN_OPTIONS_HELP)
         spec.input('structure', valid_type=StructureData, required=True,
                    help='Use a node that specifies the input crystal structure')
         spec.input('jij_data', valid_type=ArrayData, required=True,
@@ -113,6 +175,20 @@ class SpiritCalculation(CalcJob):
                         define the 'initial_state' array (columns should be x, y, z).
                         This overwrites the configuration input!
                         """)
+        spec.input('monte_carlo_restart', valid_type=ArrayData, required=False,
+                   validator=validate_monte_carlo_restart,
+                   help="""Use the monte_carlo output of a previous MC calculation (e.g. one that was killed
+                        before all temperatures were finished) to restart the temperature scan. The temperatures
+                        of this node are not sampled again and are copied to the monte_carlo output
+                        (only used for simulation_method=MC).
+                        """)
+        spec.input('parent_folder', valid_type=RemoteData, required=False,
+                   help="""Use the remote_folder of a previous LLG calculation (e.g. one that was killed
+                        because the wall-clock limit was reached) to continue it. The spin configuration with the
+                        largest iteration (final state, checkpoint or the snapshots spirit writes every
+                        llg_n_iterations_log iterations) is read and only the remaining iterations of
+                        llg_n_iterations are run. This overwrites the configuration and the initial_state input!
+                        """)
         spec.input('add_to_retrieved', valid_type=List, required=False,
                    help='List of strings specifying additional files that should be retrieved.')
 
@@ -120,7 +196,7 @@ class SpiritCalculation(CalcJob):
         spec.output('output_parameters', valid_type=Dict, required=True,
                     help='Parsed values from the spirit stdout, stored as Dict for quick access.')
         spec.output('magnetization', valid_type=ArrayData, required=False,
-                    help='initial and final magnetization')
+                    help='initial and final magnetization (stored as SpinConfigurationData)')
         spec.output('energies', valid_type=ArrayData, required=False,
                     help='energy convergence')
         spec.output('atom_types', valid_type=ArrayData, required=False,
@@ -132,6 +208,12 @@ class SpiritCalculation(CalcJob):
         spec.exit_code(100, 'ERROR_MISSING_OUTPUT_FILES', message='Calculation did not produce all expected output files.')
         spec.exit_code(101, 'ERROR_SPIRIT_CODE_INCOMPATIBLE',
                        message='The Spirit Code does not support a feature that is needed (e.g. pinning).')
+        spec.exit_code(102, 'ERROR_MC_INCOMPLETE',
+                       message='The MC run did not finish all temperatures, the monte_carlo output contains the '
+                       'finished temperatures and can be used as monte_carlo_restart input.')
+        spec.exit_code(103, 'ERROR_MAX_WALLTIME_REACHED',
+                       message='Spirit stopped the simulation because the maximal walltime was reached, an LLG run '
+                       'can be continued with the remote_folder as parent_folder input.')
 
 
     def prepare_for_submission(self, folder):
@@ -158,7 +240,7 @@ class SpiritCalculation(CalcJob):
             self.write_defects_file(folder)
 
         ##############################################
-        # CREATE "initial_state.txt" file if needed
+        # CREATE "initial_state.txt" (or "initial_state.ovf") file if needed
         if 'initial_state' in self.inputs:
             self.write_initial_configuration(folder)
 
@@ -166,6 +248,17 @@ class SpiritCalculation(CalcJob):
         # CREATE "couplings.txt" FILE FROM Jij
         self.write_couplings_file(folder)
 
+        # put the couplings file into the shared folder on the remote and only link it
+        remote_symlink_list = []
+        shared_couplings_folder = self.inputs.metadata.options.get('shared_couplings_folder', None)
+        if shared_couplings_folder is not None and not self.inputs.metadata.get('dry_run', False):
+            remote_symlink_list += self.upload_shared_couplings(folder, shared_couplings_folder,
+                                                                self._get_couplings_filename())
+
+        # link the spin configurations of the parent calculation to continue from them
+        if 'parent_folder' in self.inputs:
+            remote_symlink_list += self.link_parent_folder(folder)
+
         ##############################################
         # CREATE "run_spirit.py"
         self.write_run_spirit(folder)
@@ -181,7 +274,15 @@ class SpiritCalculation(CalcJob):
         # Prepare a `CalcInfo` to be returned to the engine
         calcinfo = datastructures.CalcInfo()
         calcinfo.codes_info = [codeinfo]
+        calcinfo.remote_symlink_list = remote_symlink_list
 
+        calcinfo.retrieve_list, calcinfo.retrieve_temporary_list = self._get_retrieve_lists()
+
+        return calcinfo
+
+
+    def _get_retrieve_lists(self):
+        """Return the retrieve list and the temporary retrieve list of the calculation."""
         # this should be a list of the filenames we expect when spirit ran
         # i.e. the files we specify here will be copied back to the file repository
         # note that the retlist_tmp contains only files which are only needed in parsing
@@ -197,21 +298,33 @@ class SpiritCalculation(CalcJob):
             retlist += ['defects.txt']
 
         run_opts = self.inputs.run_options.get_dict()
-        if run_opts['simulation_method'].upper() == 'LLG':
-            retlist_tmp += ['spirit_Image-00_Energy-archive.txt',
-                            'spirit_Image-00_Spins-final.ovf',
-                            'spirit_Image-00_Spins-initial.ovf']
-        elif run_opts['simulation_method'].upper() == 'MC':
-            retlist_tmp += ['output_mc.txt']
+        retrieve_profile = run_opts.get('retrieve_profile', 'standard')
+        output_files = self._get_output_files()
+        if run_opts.get('compression') is not None:
+            # these are compressed in run_spirit.py
+            suffix = COMPRESSION_SUFFIXES[run_opts['compression']]
+            output_files = [fname if fname in _MC_OUTPUT_FILES else fname + suffix for fname in output_files]
+        if retrieve_profile == 'minimal' and run_opts['simulation_method'].upper() == 'LLG':
+            # only the summary of the observables is retrieved
+            output_files = [_SUMMARY]
+        if retrieve_profile == 'full':
+            retlist += output_files
+        else:
+            retlist_tmp += output_files
 
         # from the input we can specify additional files that should be retrieved
         if 'add_to_retrieved' in self.inputs:
             retlist += self.inputs.add_to_retrieved.get_list()
+        if run_opts.get('profile_phases', False):
+            retlist.append(_TIMINGS)
+        if run_opts.get('quiet', False):
+            retlist.append(_RUN_INFO)
+        if 'parent_folder' in self.inputs:
+            retlist.append(_RESTART_INFO)
+        if 'stationarity' in run_opts:
+            retlist.append(_STATIONARITY)
 
-        calcinfo.retrieve_list = retlist
-        calcinfo.retrieve_temporary_list = retlist_tmp
-
-        return calcinfo
+        return retlist, retlist_tmp
 
 
     def write_input_cfg(self, folder):
@@ -234,29 +347,41 @@ class SpiritCalculation(CalcJob):
             # do this only if nothing is given in the input parameters
             input_dict['boundary_conditions'] = structure.pbc
 
-        # go through the template input config and overwrite values from inputs
-        input_file = []
-        with open(TEMPLATE_PATH, 'r') as f_orig:
-            for line in f_orig:
-                input_file.append(line)
-
-                if line[0] != '#' or '\n':
-                    # if line is not a comment or line is not empty
-                    # check if the parameter has to be modified and use function to modify line if needed
-                    l_param_value = line.split(' ', 1)
-                    key = l_param_value[0]
-
-                    if key in input_dict:
-                        if key not in _forbidden_keys:
-                            val_str = verify_input_para(key, input_dict[key])
-                            input_file[-1] = _modify_line(line, val_str)
-
-                    ##############################################
-                    # MODIFY "GEOMETRY" SECTION FROM .cfg FILE
-                    # from the StructureData node given as an input, the "GEOMETRY" section is created
-                    if key == 'bravais_lattice':
-                        geometry_string = _get_geometry(structure)
-                        input_file[-1] = geometry_string
+        # set the format of the spin configuration output files from the run_options
+        # (values given explicitly in the parameters take precedence)
+        ovf_filetype = OVF_FILETYPES[self.inputs.run_options.get_dict().get('ovf_format', 'text')]
+        for key in ['llg_output_configuration_filetype', 'mc_output_configuration_filetype']:
+            input_dict.setdefault(key, ovf_filetype)
+
+        # the observables are computed in run_spirit.py for the minimal retrieve_profile,
+        # spirit then does not need to write the spin configurations and energies
+        if self.inputs.run_options.get_dict().get('retrieve_profile', 'standard') == 'minimal':
+            input_dict.setdefault('llg_output_any', False)
+
+        # in the quiet mode nothing is logged to the stdout (the iteration messages of spirit are logged on
+        # every level), the log file only contains errors and the parser uses the run_info.json instead
+        if self.inputs.run_options.get_dict().get('quiet', False):
+            input_dict.setdefault('log_to_console', False)
+            input_dict.setdefault('log_console_level', 2)
+            input_dict.setdefault('log_file_level', 2)
+
+        # overwrite the values of the template input config from inputs
+        values = {
+            key: verify_input_para(key, val)
+            for key, val in input_dict.items()
+            if key in INPUT_TEMPLATE and key not in _forbidden_keys
+        }
+
+        # spirit stops the LLG simulation and writes the final state before the job is killed by the scheduler
+        # (the walltime is checked only in the iteration loop of spirit, the MC script checks it itself)
+        max_walltime = self._get_max_walltime()
+        if max_walltime is not None:
+            values['llg_max_walltime'] = ' ' + _format_walltime(max_walltime)
+        ##############################################
+        # MODIFY "GEOMETRY" SECTION FROM .cfg FILE
+        # from the StructureData node given as an input, the "GEOMETRY" section is created
+        input_file = INPUT_TEMPLATE.render(
+            values, replacements={'bravais_lattice': _get_geometry(structure)})
 
         if 'pinning' in self.inputs:
             # put `pinned_from_file pinning.txt` into the input config to read the pinning info in the spirit run
@@ -274,6 +399,21 @@ class SpiritCalculation(CalcJob):
             f_created.writelines(input_file)
 
 
+    def _get_max_walltime(self):
+        """Return the walltime (in seconds) after which the simulation is stopped (None if it is not limited).
+
+        This is the max_wallclock_seconds of the options minus the walltime_margin of the run_options.
+        """
+        max_wallclock_seconds = self.inputs.metadata.options.get('max_wallclock_seconds', None)
+        if max_wallclock_seconds is None:
+            return None
+        default_margin = min(_MAX_WALLTIME_MARGIN, 0.1 * max_wallclock_seconds)
+        margin = self.inputs.run_options.get_dict().get('walltime_margin', default_margin)
+        max_walltime = int(max_wallclock_seconds - margin)
+        # a walltime of zero is not limited in spirit
+        return max_walltime if max_walltime > 0 else None
+
+
     def get_defects_info(self):
         """Get the defects info that is added to the config file"""
         # add line that specifies the defects file and add the atom_type info to the config file
@@ -307,6 +447,10 @@ class SpiritCalculation(CalcJob):
           0  1 0 0  -1
           0  0 1 0  -1
         """
+        cache_key = self._get_file_cache_key('defects.txt', self.inputs.defects)
+        if self._fetch_from_file_cache(folder, 'defects.txt', cache_key):
+            return
+
         # check if defects list is given
         if 'defects' not in self.inputs.defects.get_arraynames():
             # no list of defects specified
@@ -314,16 +458,12 @@ class SpiritCalculation(CalcJob):
             with folder.open('defects.txt', 'w') as _f:
                 _f.writelines(['n_defects 0\n'])
         else:
-            # get defects array from the input node
-            defects = self.inputs.defects.get_array('defects')
-
-            # convert to dataframe for easier writeout
-            defects_df = DataFrame(defects, columns=['i', 'da', 'db', 'dc', 'itype'])
-            defects_df = defects_df.astype({'i':'int64', 'da':'int64', 'db':'int64', 'dc':'int64', 'itype':'int64'})
-
-            # Write the defects file in csv format that spirit can understand
+            # Write the defects file in csv format that spirit can understand,
+            # the array is streamed in chunks to keep the memory footprint small
             with folder.open('defects.txt', 'w') as _f:
-                defects_df.to_csv(_f, sep='\t', index=False, header=False)
+                write_defects(_f, iter_array_chunks(self.inputs.defects, 'defects'))
+
+        self._store_in_file_cache(folder, 'defects.txt', cache_key)
 
 
     def write_pinning_file(self, folder): # pylint: disable=unused-argument
@@ -334,90 +474,191 @@ class SpiritCalculation(CalcJob):
           0  1 0 0  0.0 1.0 0.0
           0  0 1 0  0.0 0.0 1.0
         """
-        # get pinning array from the input node
-        pinning = self.inputs.pinning.get_array('pinning')
-
-        # convert to dataframe for easier writeout
-        pinning_df = DataFrame(pinning, columns=['i', 'da', 'db', 'dc', 'Sx', 'Sy', 'Sz'])
-        pinning_df = pinning_df.astype({'i':'int64', 'da':'int64', 'db':'int64', 'dc':'int64',
-                                        'Sx':'float64', 'Sy':'float64', 'Sz':'float64'})
-
-        # make sure the pinning direction is normalized
-        norm = np.sqrt(pinning_df['Sx']**2 + pinning_df['Sy']**2 + pinning_df['Sz']**2)
-        pinning_df['Sx'] /= norm
-        pinning_df['Sy'] /= norm
-        pinning_df['Sz'] /= norm
+        cache_key = self._get_file_cache_key('pinning.txt', self.inputs.pinning)
+        if self._fetch_from_file_cache(folder, 'pinning.txt', cache_key):
+            return
 
-        # Write the pinning file in csv format that spirit can understand
+        # Write the pinning file in csv format that spirit can understand,
+        # the pinning directions are normalized chunk by chunk while streaming the array
         with folder.open('pinning.txt', 'w') as _f:
-            pinning_df.to_csv(_f, sep='\t', index=False, header=False)
+            write_pinning(_f, iter_array_chunks(self.inputs.pinning, 'pinning'))
+
+        self._store_in_file_cache(folder, 'pinning.txt', cache_key)
 
 
     def write_initial_configuration(self, folder):
-        """Write the 'initial_state.txt' file that contains the direction for each spin"""
-        # get the initial state (i.e. directions array) from the input node
-        initial_state = self.inputs.initial_state.get_array('initial_state')
+        """Write the 'initial_state.txt' file that contains the direction for each spin
+
+        For the binary ovf_format of the run_options the directions are written to a binary OVF file instead.
+        """
+        filename = self._get_initial_state_filename()
+        chunks = iter_array_chunks(self.inputs.initial_state, 'initial_state')
+        if filename == _INITIAL_STATE:
+            # Write the initial state in csv format that spirit can understand,
+            # the directions are normalized chunk by chunk while streaming the array
+            with folder.open(filename, 'w') as _f:
+                write_initial_state(_f, chunks)
+        else:
+            nspins = self.inputs.initial_state.get_shape('initial_state')[0]
+            with folder.open(filename, 'wb') as _f:
+                write_ovf(_f, (writers.normalize_rows(np.array(c, dtype=np.float64)) for c in chunks),
+                          nspins, ovf_format=self.inputs.run_options.get_dict().get('ovf_format'))
 
-        # convert to dataframe for easier writeout
-        initial_state_df = DataFrame(initial_state, columns=['x', 'y', 'z'])
-        initial_state_df = initial_state_df.astype({'x':'float64', 'y':'float64', 'z':'float64'})
 
-        # make sure the pinning direction is normalized
-        norm = np.sqrt(initial_state_df['x']**2 + initial_state_df['y']**2 + initial_state_df['z']**2)
-        initial_state_df['x'] /= norm
-        initial_state_df['y'] /= norm
-        initial_state_df['z'] /= norm
+    def link_parent_folder(self, folder):
+        """Link the spin configurations of the parent calculation into the `parent_calc` folder.
+
+        The spin configuration from which the run is continued is chosen in run_spirit.py since the
+        files in the remote folder of the parent calculation are only known on the remote computer.
+        The restart info of the parent calculation is linked as well (the run may have been a restart itself).
+
+        :param folder: sandbox folder in which the (empty) `parent_calc` folder is created
+        :returns: list of (computer uuid, remote path, name in working directory) for the remote_symlink_list
+        """
+        parent_folder = self.inputs.parent_folder
+        folder.get_subfolder(_PARENT_FOLDER, create=True)
+        remote_path = parent_folder.get_remote_path()
+        computer_uuid = parent_folder.computer.uuid
+        return [
+            (computer_uuid, posixpath.join(remote_path, checkpoints.SPINS_PATTERN), _PARENT_FOLDER),
+            (computer_uuid, posixpath.join(remote_path, _RESTART_INFO), posixpath.join(_PARENT_FOLDER, _RESTART_INFO)),
+        ]
 
-        # Write the pinning file in csv format that spirit can understand
-        with folder.open('initial_state.txt', 'w') as _f:
-            initial_state_df.to_csv(_f, sep='\t', index=False, header=False)
+
+    def _get_output_files(self):
+        """Return the list of output files of spirit that are retrieved for parsing."""
+        method = self.inputs.run_options.get_dict()['simulation_method'].upper()
+        if method == 'LLG':
+            return _LLG_OUTPUT_FILES
+        if method in ['MC', 'PT']:
+            return _MC_OUTPUT_FILES
+        return []
+
+
+    def _get_initial_state_filename(self):
+        """Return the name of the initial state file (text or binary OVF)."""
+        if self.inputs.run_options.get_dict().get('ovf_format', 'text') == 'text':
+            return _INITIAL_STATE
+        return _INITIAL_STATE_OVF
 
 
     def write_couplings_file(self, folder): # pylint: disable=unused-argument
-        """Write the couplings.txt file that contains the Jij's"""
+        """Write the couplings.txt file that contains the Jij's
+
+        The Jij_expanded array is streamed in chunks from the repository of the
+        jij_data node, which keeps the memory bounded for very large coupling sets.
+        With `couplings_format='npz'` in the run_options the arrays are instead packed
+        into a compressed archive that is converted to couplings.txt on the compute node.
+        """
 
         jij_data = self.inputs.jij_data # Collection of numpy arrays
-        jij_expanded = jij_data.get_array('Jij_expanded') # Extracts the Jij_expanded array
-
-        # create Dataframe and use either Jijs and DMI vectors or only Jijs if no Dijs are given
-        # maybe we need an option to not use the DMI vector even if they are found?
-        # Convert the data to Pandas Dataframe
-        has_dmi = False
-        if len(jij_expanded[0]) >= 8:
-            # has Dij's
-            # compute magnitude of DMI vector and add after Jij column
-            # Dx, Dy, Dz are only used to get direction
-            jd = np.zeros((len(jij_expanded), 10))
-            jd[:, :6] = jij_expanded[:, :6]
-            jd[:, 6] = np.linalg.norm(jij_expanded[:, 6:9], axis=1)
-            jd[:, 7:10] = jij_expanded[:, 6:9]
-            jijs_df = DataFrame(jd, columns=['i', 'j', 'da', 'db', 'dc', 'Jij', 'Dij', 'Dijx', 'Dijy', 'Dijz'])
-            jijs_df['Dijx'] /= jijs_df['Dij']
-            jijs_df['Dijy'] /= jijs_df['Dij']
-            jijs_df['Dijz'] /= jijs_df['Dij']
-            has_dmi = True
-        elif len(jij_expanded[0]) >= 6:
-            # has Jijs
-            jijs_df = DataFrame(jij_expanded[:, :6], columns=['i', 'j', 'da', 'db', 'dc', 'Jij'])
-        else:
-            # no Jijs found, stop here
-            raise ValueError('jij_data invalid')
+        filename = self._get_couplings_filename()
+
+        cache_key = self._get_file_cache_key(filename, jij_data, self.couplings_rcut)
+        if self._fetch_from_file_cache(folder, filename, cache_key):
+            return
 
-        if not has_dmi:
-            jijs_df = jijs_df.astype({'i':'int64', 'j':'int64', 'da':'int64', 'db':'int64', 'dc':'int64', 'Jij':'float64'})
+        if filename == _COUPLINGS_ARCHIVE:
+            self.write_couplings_archive(folder)
         else:
-            jijs_df = jijs_df.astype({'i':'int64', 'j':'int64', 'da':'int64', 'db':'int64', 'dc':'int64', 'Jij':'float64',
-                                      'Dij':'float64', 'Dijx':'float64', 'Dijy':'float64', 'Dijz':'float64'})
+            positions_chunks = None
+            if self.couplings_rcut is not None:
+                # cut all couplings that are futher away that the cutoff radius
+                positions_chunks = iter_array_chunks(jij_data, 'positions_expanded')
+
+            # Write the couplings file in csv format that spirit can understand
+            with folder.open(_COUPLINGS, 'w') as _f:
+                write_couplings(_f, iter_array_chunks(jij_data, 'Jij_expanded'),
+                                positions_chunks=positions_chunks, rcut=self.couplings_rcut)
+
+        self._store_in_file_cache(folder, filename, cache_key)
+
 
-        # cut all couplings that are futher away that the cutoff radius
+    def write_couplings_archive(self, folder):
+        """Write the couplings.npz archive that contains the raw Jij_expanded (and positions_expanded) arrays
+
+        The `.npy` files are streamed from the repository of the jij_data node into a compressed zip archive
+        (i.e. the format of `np.savez_compressed`) without loading the arrays into memory.
+        """
+        jij_data = self.inputs.jij_data
+        arraynames = ['Jij_expanded']
         if self.couplings_rcut is not None:
-            r = np.sqrt(np.sum(jij_data.get_array('positions_expanded')**2, axis=1))
-            jijs_df = jijs_df[r <= self.couplings_rcut]
+            arraynames.append('positions_expanded')
+
+        with folder.open(_COUPLINGS_ARCHIVE, 'wb') as _f:
+            with zipfile.ZipFile(_f, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for arrayname in arraynames:
+                    with open_array_file(jij_data, arrayname) as source:
+                        with archive.open(f'{arrayname}.npy', 'w', force_zip64=True) as dest:
+                            shutil.copyfileobj(source, dest, 2**20)
+
+
+    def _get_couplings_filename(self):
+        """Return the name of the couplings file that is uploaded"""
+        couplings_format = self.inputs.run_options.get_dict().get('couplings_format', 'text')
+        return _COUPLINGS_FORMATS[couplings_format]
+
 
-        # Write the couplings file in csv format that spirit can understand
-        with folder.open('couplings.txt', 'w') as _f:
-            # spirit wants to have the data separated in tabs
-            jijs_df.to_csv(_f, sep='\t', index=False)
+    def upload_shared_couplings(self, folder, shared_folder, filename=_COUPLINGS):
+        """Keep the couplings file in a shared folder on the remote computer.
+
+        The file is stored there under the name `couplings-<sha256 of content>.<ext>`. If a previous calculation
+        on the same computer finished with this file, it is only symlinked into the working directory and removed
+        from the sandbox folder. Otherwise it is uploaded with the calculation and moved to the shared folder by
+        run_spirit.py. The remote path is stored in the `shared_couplings` extra of the calculation.
+
+        :param folder: sandbox folder that contains the couplings file
+        :param shared_folder: absolute path of the shared folder on the remote computer
+        :param filename: name of the couplings file in the sandbox folder
+        :returns: list of (computer uuid, remote path, name in working directory) for the remote_symlink_list
+        """
+        content_hash = hashlib.sha256()
+        with folder.open(filename, 'rb') as _f:
+            for block in iter(lambda: _f.read(2**20), b''):
+                content_hash.update(block)
+        extension = posixpath.splitext(filename)[1]
+        remote_path = posixpath.join(shared_folder, f'couplings-{content_hash.hexdigest()}{extension}')
+        _set_extra(self.node, 'shared_couplings', remote_path)
+
+        query = QueryBuilder()
+        query.append(Computer, filters={'id': self.node.computer.pk}, tag='computer')
+        query.append(CalcJobNode, with_computer='computer', project='id',
+                     filters={'extras.shared_couplings': remote_path, 'attributes.exit_status': 0})
+        if query.first() is None:
+            self.logger.info('uploading couplings file to shared folder: %s', remote_path)
+            return []
+
+        self.logger.info('reusing couplings file in shared folder: %s', remote_path)
+        folder.remove_path(filename)
+        return [(self.node.computer.uuid, remote_path, filename)]
+
+
+    def _get_file_cache_key(self, filename, node, *args):
+        """Return the key of a generated file in the local file cache (None if caching is disabled)."""
+        # pylint: disable=attribute-defined-outside-init
+        if not hasattr(self, '_file_cache'):
+            self._file_cache = get_file_cache()
+        if self._file_cache is None:
+            return None
+        return self._file_cache.make_key(filename, get_node_hash(node), *args)
+
+
+    def _fetch_from_file_cache(self, folder, filename, cache_key):
+        """Copy a file from the local file cache to the folder, returns True if this was successful."""
+        if cache_key is None:
+            return False
+        hit = self._file_cache.fetch(cache_key, folder.get_abs_path(filename))
+        # record the usage of the cache in the extras of the calculation
+        file_cache_info = _get_extra(self.node, 'file_cache', {})
+        file_cache_info[filename] = 'hit' if hit else 'miss'
+        _set_extra(self.node, 'file_cache', file_cache_info)
+        return hit
+
+
+    def _store_in_file_cache(self, folder, filename, cache_key):
+        """Put a written file into the local file cache."""
+        if cache_key is not None:
+            self._file_cache.store(cache_key, folder.get_abs_path(filename))
 
 
     def write_run_spirit(self, folder):
@@ -432,35 +673,44 @@ class SpiritCalculation(CalcJob):
         config = run_opts.get('configuration', {})
         post_proc = run_opts.get('post_processing', '')
 
-        if method.upper() == 'MC':
+        if method.upper() in ['MC', 'PT']:
             self.write_mc_script(folder) # A bit unclean but lets separate the code somewhat
             return
 
         # write the default spirit input file (e.g. for LLG)
-        script = SpiritScriptBuilder()
+        builder = StationarityScriptBuilder if 'stationarity' in run_opts else SpiritScriptBuilder
+        script = builder(profile_phases=run_opts.get('profile_phases', False))
         script.import_modules()
+        script.phase('import')
+        self._add_couplings_expansion(folder, script)
+        script.phase('couplings')
         with script.state_block():
-            # write out the atom_types (needed for parsing defects)
-            script += 'atom_types = geometry.get_atom_types(p_state)'
-            with script.block("with open('"+_ATOM_TYPES+"', 'w') as _f:"):
-                script += "_f.writelines([f'{i}\\n' for i in atom_types])"
-
-            # deal with the input configuration
-            if 'plus_z' in config and config.get('plus_z', False):
-                script.configuration('plus_z')
-            else:
-                for _ in range(config.get('random', 1)):
-                    script.configuration('random')
-
-            # set an initial state defined for all spins
-            # this overwites the previous configuration setting!
-            if 'initial_state' in self.inputs:
-                script += 'io.image_read(p_state, "initial_state.txt")'
-            script.start_simulation(method, solver)
+            script.phase('state_setup')
+            script.write_atom_types(_ATOM_TYPES)
+            self._add_initial_configuration(folder, script, config)
+            script.phase('configuration')
+            self._add_llg_simulation(folder, script, method, solver)
+            script.phase('simulation')
+            if run_opts.get('quiet', False):
+                script.write_run_info(_RUN_INFO, method, solver, run_info='run_info',
+                                      max_walltime=self._get_max_walltime())
+
+            # compute the observables on the compute node if only the summary is retrieved
+            if run_opts.get('retrieve_profile', 'standard') == 'minimal':
+                folder.insert_path(observables.__file__, f'{_OBSERVABLES_MODULE}.py')
+                script.write_summary(_SUMMARY, observables_module=_OBSERVABLES_MODULE,
+                                     **_get_lattice_info(self.inputs))
+                script.phase('summary')
 
             # maybe add post_processing script
             if len(post_proc) > 0:
                 script += post_proc
+                script.phase('post_processing')
+        script.phase('state_teardown')
+
+        if run_opts.get('retrieve_profile', 'standard') != 'minimal':
+            self._add_output_compression(folder, script)
+        script.write_timings(_TIMINGS)
 
         # write run_spirit.py to the folder
         with folder.open(_RUN_SPIRIT, 'w') as f:
@@ -468,136 +718,182 @@ class SpiritCalculation(CalcJob):
             f.write(txt)
 
 
-    def write_mc_script(self, folder):
-        """Write the MC script version of run_spirit.py"""
-        script = SpiritScriptBuilder()
-        script += """
-        import numpy as np
-        from spirit import state
-        from spirit import system
-        from spirit import simulation
-        from spirit import configuration
-        from spirit import parameters
-        from spirit import hamiltonian
-        from spirit import quantities
-        from spirit import geometry
-        from spirit import constants
-        """
+    def _add_initial_configuration(self, folder, script, config):
+        """Set the initial spin configuration (plus_z, random, the initial_state input or the parent_folder)."""
+        # deal with the input configuration
+        if 'plus_z' in config and config.get('plus_z', False):
+            script.configuration('plus_z')
+        else:
+            for _ in range(config.get('random', 1)):
+                script.configuration('random')
+
+        # set an initial state defined for all spins
+        # this overwites the previous configuration setting!
+        if 'initial_state' in self.inputs:
+            script += f'io.image_read(p_state, "{self._get_initial_state_filename()}")'
+        if 'parent_folder' in self.inputs:
+            folder.insert_path(checkpoints.__file__, f'{_CHECKPOINTS_MODULE}.py')
+            script.restart_from(_PARENT_FOLDER, _RESTART_INFO, checkpoints_module=_CHECKPOINTS_MODULE)
 
+
+    def _add_llg_simulation(self, folder, script, method, solver):
+        """Run the simulation (until stationary, with periodic checkpoints or in a single run)."""
         run_opts = self.inputs.run_options.get_dict()
-        mc_configuration = run_opts['mc_configuration']
+        quiet = run_opts.get('quiet', False)
+        checkpoint_interval = run_opts.get('checkpoint_interval')
+        if 'stationarity' in run_opts:
+            self._add_stationary_run(folder, script, method, solver)
+        elif checkpoint_interval is not None:
+            folder.insert_path(checkpoints.__file__, f'{_CHECKPOINTS_MODULE}.py')
+            with script.periodic_checkpoints(_CHECKPOINT, checkpoint_interval,
+                                             OVF_FILETYPES[run_opts.get('ovf_format', 'text')],
+                                             checkpoints_module=_CHECKPOINTS_MODULE):
+                script.start_simulation(method, solver, run_info='run_info' if quiet else None)
+        else:
+            script.start_simulation(method, solver, run_info='run_info' if quiet else None)
 
-        keys = ['n_thermalisation', 'n_decorrelation', 'n_samples', 'n_temperatures', 'T_start', 'T_end']
 
-        for k in keys:
-            script += '{:20} = {}'.format(k, mc_configuration[k])
+    def _add_stationary_run(self, folder, script, method, solver):
+        """Advance the LLG simulation in chunks until the energy and the magnetization are stationary.
 
-        script += """
-        sample_temperatures     = np.linspace(T_start, T_end, n_temperatures)
-        energy_samples          = []
-        magnetization_samples   = []
-        susceptibility_samples  = []
-        specific_heat_samples   = []
-        binder_cumulant_samples = []
+        With a temperature the force convergence is never reached. The run is stopped once the means of the
+        energy and the magnetization agree over two sliding windows of chunks and the averaging iterations are
+        done. The spin configuration is written to the checkpoint file after every chunk.
+        """
+        run_opts = self.inputs.run_options.get_dict()
+        folder.insert_path(stationarity.__file__, f'{_STATIONARITY_MODULE}.py')
+        folder.insert_path(mc_sampling.__file__, f'{_MC_SAMPLING_MODULE}.py')
+        folder.insert_path(checkpoints.__file__, f'{_CHECKPOINTS_MODULE}.py')
+        # the output settings of spirit (from the parameters or the template) that are used after the first chunk
+        input_dict = self.inputs.parameters.get_dict() if 'parameters' in self.inputs else {}
+        if run_opts.get('retrieve_profile', 'standard') == 'minimal':
+            input_dict.setdefault('llg_output_any', False)
+        output = {}
+        for key, cfg_key in [('any', 'llg_output_any'), ('final', 'llg_output_final'),
+                             ('archive', 'llg_output_configuration_archive')]:
+            output[key] = bool(int(input_dict.get(cfg_key, INPUT_TEMPLATE.get(cfg_key))))
+        output['filetype'] = OVF_FILETYPES[run_opts.get('ovf_format', 'text')]
+        max_walltime = self._get_max_walltime()
+        script.stationarity_settings(run_opts['stationarity'], max_walltime=max_walltime,
+                                     stationarity_module=_STATIONARITY_MODULE, mc_sampling_module=_MC_SAMPLING_MODULE)
+        script.stationarity_checkpoints(_CHECKPOINT, output['filetype'], checkpoints_module=_CHECKPOINTS_MODULE)
+        script.run_until_stationary(method, solver, output=output, deadline=max_walltime is not None, checkpoint=True)
+        script.write_stationarity(run_info='run_info', result_file=_STATIONARITY)
+
+
+    def _add_couplings_expansion(self, folder, script):
+        """Convert the couplings archive to couplings.txt on the compute node if the couplings are uploaded as npz.
+
+        With a shared couplings folder the couplings file is moved there (or only checked) first.
+
+        The script uses a copy of the writers module of this plugin which is put next to run_spirit.py.
         """
+        shared_path = _get_extra(self.node, 'shared_couplings')
+        if shared_path is not None:
+            # the couplings file is still in the sandbox folder if it is uploaded with this calculation
+            script.link_shared_file(self._get_couplings_filename(), shared_path,
+                                    uploaded=folder.isfile(self._get_couplings_filename()))
+        if self._get_couplings_filename() == _COUPLINGS_ARCHIVE:
+            folder.insert_path(writers.__file__, f'{_WRITERS_MODULE}.py')
+            script.expand_couplings(_COUPLINGS_ARCHIVE, _COUPLINGS, rcut=self.couplings_rcut,
+                                    writers_module=_WRITERS_MODULE)
 
-        with script.state_block():
-            # write out the atom_types (needed for parsing defects)
-            script += 'atom_types = geometry.get_atom_types(p_state)'
-            with script.block("with open('"+_ATOM_TYPES+"', 'w') as _f:"):
-                script += "_f.writelines([f'{i}\\n' for i in atom_types])"
-
-            # get number of spins
-            script += 'NOS = system.get_nos(p_state)'
-
-            # Loop over temperatures
-            with script.block('for iT, T in enumerate(sample_temperatures):'):
-                script += 'parameters.mc.set_temperature(p_state, T)'
-                script.configuration('plus_z')
-                script += """
-                # Cumulative average variables
-                E  = 0
-                E2 = 0
-                M  = 0
-                M2 = 0
-                M4 = 0
-
-                # Thermalisation
-                parameters.mc.set_iterations(p_state, n_thermalisation, n_thermalisation) # We want n_thermalisation iterations and only a single log message
-
-                # Sampling at given temperature
-                parameters.mc.set_iterations(p_state, n_decorrelation*n_samples, n_decorrelation*n_samples) # We want n_decorrelation iterations and only a single log message
-                simulation.start(p_state, simulation.METHOD_MC, single_shot=True) # Start a single-shot MC simulation
-
-                for n in range(n_samples):
-                    # Run decorrelation
-                    for i_decorr in range(n_decorrelation):
-                        simulation.single_shot(p_state) # one MC iteration
-                    # Get energy
-                    E_local = system.get_energy(p_state) / NOS
-                    # Get magnetization
-                    M_local = np.array(quantities.get_magnetization(p_state))
-                    M_local_tot = np.linalg.norm(M_local)
-                    # Add to cumulative averages
-                    E   += E_local
-                    E2  += E_local**2
-                    M   += M_local_tot
-                    M2  += M_local_tot**2
-                    M4  += M_local_tot**4
-
-                # Make sure the MC simulation is not running anymore
-                simulation.stop(p_state)
-
-                # Average over samples
-                E  /= n_samples
-                E2 /= n_samples
-                M  /= n_samples
-                M2 /= n_samples
-                M4 /= n_samples
-
-                # Calculate observables
-                chi = (M2 - np.dot(M, M)) / (constants.k_B * T)
-                c_v = (E2 - E**2) / (constants.k_B * T**2)
-                cumulant = 1 - M4/(3 * M2**2)
-
-                energy_samples.append(E)
-                magnetization_samples.append(M)
-                susceptibility_samples.append(chi)
-                specific_heat_samples.append(c_v)
-                binder_cumulant_samples.append(cumulant)
-                """
-
-        script += """
-        output_mc      = np.zeros((len(sample_temperatures), 6))
-        output_mc[:,0] = sample_temperatures
-        output_mc[:,1] = energy_samples
-        output_mc[:,2] = magnetization_samples
-        output_mc[:,3] = susceptibility_samples
-        output_mc[:,4] = specific_heat_samples
-        output_mc[:,5] = binder_cumulant_samples
-
-        np.savetxt("output_mc.txt", output_mc, header="sample_temperatures, energy_samples, magnetization_samples, susceptibility_samples, specific_heat_samples, binder_cumulant_samples")
+
+    def _add_output_compression(self, folder, script):
+        """Compress the output files of spirit at the end of run_spirit.py if a compression is set in the run_options.
+
+        The script uses a copy of the compression module of this plugin which is put next to run_spirit.py.
         """
+        compression_type = self.inputs.run_options.get_dict().get('compression')
+        # output_mc.txt is small and is written incrementally, it is kept uncompressed such that
+        # the finished temperatures can be retrieved if the job is killed
+        output_files = [fname for fname in self._get_output_files() if fname not in _MC_OUTPUT_FILES]
+        if compression_type is not None and output_files:
+            folder.insert_path(compression.__file__, f'{_COMPRESSION_MODULE}.py')
+            script.compress_files(output_files, compression_type, compression_module=_COMPRESSION_MODULE)
+
+
+    def write_mc_script(self, folder):
+        """Write the MC script version of run_spirit.py (also used for the parallel tempering)"""
+        run_opts = self.inputs.run_options.get_dict()
+        mc_configuration = run_opts['mc_configuration']
+        parallel_tempering = run_opts['simulation_method'].upper() == 'PT'
+        n_workers = 1 if parallel_tempering else min(mc_configuration.get('n_workers', 1),
+                                                     mc_configuration['n_temperatures'])
+        # with a target error the decorrelation and the number of samples are adapted to the autocorrelation time
+        adaptive = any(mc_configuration.get(key) is not None
+                       for key in ['target_energy_error', 'target_magnetization_error'])
+        run_info_file = _RUN_INFO if run_opts.get('quiet', False) else None
+
+        script = MCScriptBuilder(profile_phases=run_opts.get('profile_phases', False))
+        if n_workers > 1:
+            script.set_omp_threads(n_workers, mc_configuration.get('n_threads'))
+        # the samples are accumulated with the online accumulators of the mc_sampling module
+        folder.insert_path(mc_sampling.__file__, f'{_MC_SAMPLING_MODULE}.py')
+        script.import_mc_modules(parallel_tempering, adaptive, mc_sampling_module=_MC_SAMPLING_MODULE)
+        script.phase('import')
+
+        script.mc_settings(mc_configuration, parallel_tempering, adaptive)
+        max_walltime = self._get_max_walltime()
+        if max_walltime is not None:
+            script.deadline(max_walltime)
+
+        self._add_couplings_expansion(folder, script)
+        script.phase('couplings')
+
+        if parallel_tempering:
+            script.replica_exchange(max_walltime is not None, _ATOM_TYPES, run_info_file)
+        else:
+            restart_file = self.write_mc_restart_file(folder) if 'monte_carlo_restart' in self.inputs else None
+            script.mc_output_file(_MC_OUTPUT_FILES[0], _N_MC_COLUMNS, restart_file, n_workers)
+            script.temperature_sampling(n_workers, adaptive, max_walltime is not None, _ATOM_TYPES, run_info_file)
+        script.write_mc_output(_MC_OUTPUT_FILES[0], parallel_tempering)
+        script.phase('output')
+        self._add_output_compression(folder, script)
+        script.write_timings(_TIMINGS)
 
         # write run_spirit.py to the folder
         with folder.open(_RUN_SPIRIT, 'w') as f:
             f.write(script.body)
 
-def _modify_line(my_string, new_value):
-    """Gets a line and the new parameter value as inputs
-    and returns the line with the new parameter"""
+    def write_mc_restart_file(self, folder):
+        """Write the finished temperatures of the monte_carlo_restart input, which are not sampled again.
 
-    splitted = my_string.split(' ', 1)
-    cnt = 0
-    for element in splitted[1]:
-        if element == ' ':
-            cnt += 1
-        else:
-            break
-    whitespace_count = cnt + 1
-    splitted[1] = new_value
-    ret_str = splitted[0] + whitespace_count*' ' + splitted[1] + '\n'
-    return ret_str
+        :returns: name of the written file
+        """
+        restart = self.inputs.monte_carlo_restart
+        arraynames = restart.get_arraynames()
+        ntemp = len(restart.get_array('temperature'))
+        # older versions did not write the statistics of the samples
+        columns = [
+            restart.get_array(name) if name in arraynames else np.full(ntemp, np.nan)
+            for name in _MC_COLUMNS[:_N_MC_COLUMNS]
+        ]
+        with folder.open(_MC_RESTART, 'w') as _f:
+            np.savetxt(_f, np.column_stack(columns))
+        return _MC_RESTART
+
+
+def _format_walltime(seconds):
+    """Format a walltime in seconds as it is read by spirit (hours:minutes:seconds)"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes}:{seconds}'
+
+
+def _get_extra(node, key, default=None):
+    """Get an extra of a node (compatible with aiida-core 1.x and 2.x)"""
+    if hasattr(node, 'base'):
+        return node.base.extras.get(key, default)
+    return node.get_extra(key, default)
+
+
+def _set_extra(node, key, value):
+    """Set an extra of a node (compatible with aiida-core 1.x and 2.x)"""
+    if hasattr(node, 'base'):
+        node.base.extras.set(key, value)
+    else:
+        node.set_extra(key, value)
 
 
 def _get_geometry(structure):
@@ -610,23 +906,49 @@ def _get_geometry(structure):
     U2rel = np.linalg.inv(cell.transpose())
 
     # bravais vectors as strings
-    sv = ''
-    for element in cell:
-        string_v = ' '.join(map(str, element))
-        sv += string_v + '\n'
-
-    # sites in unit cell
-    num_sites = len(structure.sites)
-    sites_pos = ''
-    for site in structure.sites:
-        pos = site.position
-        # transform positions to relative coordinates
-        pos_rel = np.dot(U2rel, pos)
-        pos_rel = pos_rel%1 # fold back to unit cell
-        string_pos = ' '.join(map(str, pos_rel))
-        sites_pos += string_pos + '\n'
+    sv = format_rows(cell, '%r %r %r\n')
+
+    # sites in unit cell, transformed to relative coordinates
+    positions = _get_site_positions(structure)
+    num_sites = len(positions)
+    pos_rel = np.dot(positions, U2rel.transpose())
+    pos_rel = pos_rel%1 # fold back to unit cell
+    sites_pos = format_rows(pos_rel, '%r %r %r\n')
 
     # collect string that defines the geometry
     geometry_string = 'bravais_vectors\n' + sv + '\n' + 'basis\n' + str(num_sites) + '\n' + sites_pos
 
     return geometry_string
+
+
+def _get_site_positions(structure):
+    """Get the positions of all sites as (N, 3) array
+
+    This reads the raw site attributes directly which avoids creating a Site object per site.
+    """
+    if hasattr(structure, 'base'):
+        # aiida-core>=2.0
+        sites = structure.base.attributes.get('sites', [])
+    else:
+        sites = structure.get_attribute('sites', [])
+    return np.array([site['position'] for site in sites], dtype=float).reshape(-1, 3)
+
+
+def _get_lattice_info(inputs):
+    """Get the size of the spirit system and the lattice from the inputs of a calculation
+
+    :param inputs: inputs of a SpiritCalculation (i.e. `self.inputs` or `node.inputs`)
+    :returns: dict with n_basis_cells, n_basis_atoms, cell and pbc
+    """
+    structure = inputs.structure
+    parameters = {}
+    if 'parameters' in inputs:
+        parameters = inputs.parameters.get_dict()
+    # the default value is taken from the template input config
+    n_basis_cells = parameters.get('n_basis_cells', INPUT_TEMPLATE.get('n_basis_cells').split())
+    return {
+        'n_basis_cells': [int(i) for i in n_basis_cells],
+        'n_basis_atoms': len(_get_site_positions(structure)),
+        'cell': [list(vec) for vec in structure.cell],
+        'pbc': [bool(i) for i in parameters.get('boundary_conditions', structure.pbc)],
+    }
@@ -3,8 +3,8 @@
 Things for type and consistency checking of spirit input parameters
 """
 
-# list of keys which are only set by the plugin and are forbitted to be modified by the user
-_forbidden_keys = [
+# set of keys which are only set by the plugin and are forbitted to be modified by the user
+_forbidden_keys = {
     'output_file_tag',
     'log_output_folder',
     'llg_output_folder',
@@ -21,10 +21,15 @@ _forbidden_keys = [
     'gneb_max_walltime',
     'mmf_max_walltime',
     'ema_max_walltime',
-]
+}
+
+# keys which are handled by the plugin itself (i.e. not written to the input config) with the allowed value range
+_plugin_keys = {
+    'couplings_cutoff_radius': [0, None],
+}
 
-# hard coded list of keywords that expect a single boolean value
-_single_bools = [
+# hard coded set of keywords that expect a single boolean value
+_single_bools = {
     'save_input_initial',
     'save_input_final',
     'save_positions_initial',
@@ -84,7 +89,7 @@ _single_bools = [
     'ema_output_energy_add_readability_lines',
     'ema_output_configuration_step',
     'ema_output_configuration_archive',
-]
+}
 
 # keys for which values should be arrays/lists of booleans, together with the expected length
 _array_bools = {'boundary_conditions': 3}
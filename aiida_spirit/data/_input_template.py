@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiled version of the spirit input config template
+"""
+
+
+class InputTemplate():
+    """Spirit input config template that is parsed only once.
+
+    The lines of the template are kept together with a lookup table from the keys
+    to the line numbers. Rendering the template then only touches the lines of the
+    keys that are overwritten.
+
+    :param lines: list of lines of the template (including the newline characters)
+    """
+    def __init__(self, lines):
+        self.lines = list(lines)
+        # key -> line numbers in which the key is set
+        self.key_lines = {}
+        # line number -> beginning of the line up to the value of the key
+        self.prefixes = {}
+        for iline, line in enumerate(self.lines):
+            if line[0] in '#\n':
+                # skip comments and empty lines
+                continue
+            splitted = line.split(' ', 1)
+            key = splitted[0].rstrip('\n')
+            if len(splitted) > 1:
+                # keep the whitespace between key and value
+                nspaces = len(splitted[1]) - len(splitted[1].lstrip(' '))
+            else:
+                nspaces = 0
+            self.key_lines.setdefault(key, []).append(iline)
+            self.prefixes[iline] = key + (nspaces + 1) * ' '
+
+    @classmethod
+    def from_file(cls, filename):
+        """Read the template from a file."""
+        with open(filename, 'r', encoding='utf-8') as f_orig:
+            return cls(f_orig.readlines())
+
+    def __contains__(self, key):
+        return key in self.key_lines
+
+    def get(self, key, default=None):
+        """Return the value string of a key in the template (of its first line, default if the key is missing)."""
+        if key not in self.key_lines:
+            return default
+        iline = self.key_lines[key][0]
+        return self.lines[iline][len(self.prefixes[iline]):].strip()
+
+    def render(self, values, replacements=None):
+        """Return the content of the input config with modified values.
+
+        :param values: dict of key -> value string, only keys that appear in the template are changed
+        :param replacements: dict of key -> string that replaces the complete line of the key
+        :returns: list of lines of the input config
+        """
+        lines = self.lines.copy()
+        for key, val_str in values.items():
+            for iline in self.key_lines.get(key, ()):
+                lines[iline] = self.prefixes[iline] + val_str + '\n'
+        if replacements is not None:
+            for key, new_lines in replacements.items():
+                for iline in self.key_lines.get(key, ()):
+                    lines[iline] = new_lines
+        return lines
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Documentation and validation of the run_options and of the monte_carlo_restart input of the SpiritCalculation
+
+Every group of run options is checked by a function of its own that returns an error message
+(or None if the options are valid).
+"""
+
+from ..tools.ovf import OVF_FILETYPES
+from ..tools.compression import COMPRESSION_SUFFIXES
+from ..tools.traces import TRACE_REDUCTIONS
+from .spin_configuration import ENCODINGS, ANGLE_DTYPES
+
+# allowed formats in which the couplings are uploaded
+COUPLINGS_FORMATS = ['text', 'npz']
+
+# allowed values of the retrieve_profile in the run_options
+RETRIEVE_PROFILES = ['minimal', 'standard', 'full']
+
+# help of the run_options input port
+RUN_OPTIONS_HELP = """Dict node that allows to control the spirit run
+(e.g. simulation_method=LLG, solver=Depondt).
+The configuration input specifies the input configuration
+(the default is to start from a random configuration,
+plus_z is also possible to start from all spins pointing in +z).
+The post_processing string is added to the run script and allows
+to add e.g. quantities.get_topological_charge(p_state) for the
+calculation of the topological charge of a 2D system.
+The couplings_format controls how the couplings are uploaded: 'text' (default)
+writes couplings.txt, 'npz' uploads the compressed binary arrays of the jij_data
+which are converted to couplings.txt on the compute node.
+The ovf_format sets the format of the spin configuration files: 'text' (default),
+'binary4' or 'binary8' (or 'binary' for the precision of the spirit build).
+This is used for the initial_state input and the spin configurations written by spirit.
+The spin_encoding controls how the magnetization output is stored: 'float64' (default, lossless),
+'float32' or 'angles' (quantised polar angles with spin_angle_bits=8, 16 (default) or 32 bits).
+The retrieve_profile controls which output files of spirit are retrieved: 'standard' (default)
+parses the spin configurations and energies and only keeps the resulting nodes, 'full'
+additionally keeps the raw files in the retrieved folder and 'minimal' computes the
+observables of an LLG run on the compute node such that only a small summary file
+is retrieved (no magnetization and energies outputs are created).
+With compression='gzip' or 'zstd' (needs the zstandard package) the output files of spirit
+are compressed on the compute node before they are retrieved.
+The energies_reduction ('stride', 'lttb' or 'tail') limits the energies output to
+energies_max_rows rows (default 1000), the first and last rows are always kept.
+The parser_threads (default 4) sets the number of threads that parse the output files.
+With profile_phases=True the wall-clock time and peak memory of the phases of the run
+(state setup, configuration, simulation, ...) are stored in output_parameters['timings'].
+With quiet=True spirit does not log to the stdout and the output_parameters are created
+from a machine readable summary of the run (run_info.json) instead of the stdout.
+For simulation_method=MC the n_workers in the mc_configuration (default 1) sets the
+number of worker processes that sample blocks of the temperatures in parallel
+(with n_threads OpenMP threads each, default: available cores / n_workers).
+simulation_method=PT runs a parallel tempering MC with one replica per temperature,
+neighbouring replicas are swapped every exchange_interval iterations
+(mc_configuration, default n_decorrelation).
+With target_energy_error or target_magnetization_error in the mc_configuration the
+MC sampling adapts the decorrelation (up to max_decorrelation) to the autocorrelation
+time of the first min_samples samples and stops once the standard errors (binning analysis)
+are below the targets, n_samples is then the maximal number of samples.
+With checkpoint_interval (in seconds) the spin configuration of an LLG run is written to
+a checkpoint file in the remote folder at this wall-clock interval while spirit runs.
+If max_wallclock_seconds is set in the options, spirit stops the LLG simulation
+walltime_margin seconds (default: 10% but at most 600 seconds) before the job would be
+killed and writes the final state (the MC script does not start new temperatures, the
+parallel tempering stops the sampling).
+With a stationarity dict (LLG only) the simulation is advanced in chunks of chunk_iterations
+(default llg_n_iterations_log) until the means of the energy and the magnetization over the
+last two windows of window chunks (default 10) agree within n_sigma (default 2) standard
+errors of their difference, the averages over the following averaging_iterations (default
+window * chunk_iterations) and the reason for the stop are stored in
+output_parameters['stationarity'].
+"""
+
+# run options with a fixed set of allowed values: (default, allowed values), None means that the option is not set
+_CHOICES = {
+    'couplings_format': ('text', COUPLINGS_FORMATS),
+    'ovf_format': ('text', list(OVF_FILETYPES)),
+    'spin_encoding': ('float64', ENCODINGS),
+    'spin_angle_bits': (16, list(ANGLE_DTYPES)),
+    'retrieve_profile': ('standard', RETRIEVE_PROFILES),
+    'compression': (None, list(COMPRESSION_SUFFIXES)),
+    'energies_reduction': (None, TRACE_REDUCTIONS),
+}
+
+# allowed keys of the stationarity run options
+_STATIONARITY_KEYS = [
+    'chunk_iterations', 'window', 'n_sigma', 'averaging_iterations'
+]
+
+
+def validate_run_options(run_options, _):  # pylint: disable=inconsistent-return-statements
+    """Validate the run options."""
+    run_opts = run_options.get_dict()
+    for validate in [
+            validate_choices, validate_numbers, validate_stationarity,
+            validate_mc_configuration
+    ]:
+        message = validate(run_opts)
+        if message is not None:
+            return message
+
+
+def validate_monte_carlo_restart(monte_carlo_restart, _):  # pylint: disable=inconsistent-return-statements
+    """Validate the monte_carlo_restart input."""
+    if 'temperature' not in monte_carlo_restart.get_arraynames():
+        return 'The monte_carlo_restart input needs the temperature array of a monte_carlo output'
+
+
+def validate_choices(run_opts):  # pylint: disable=inconsistent-return-statements
+    """Check the run options that have a fixed set of allowed values."""
+    for key, (default, allowed) in _CHOICES.items():
+        value = run_opts.get(key, default)
+        if value is not None and value not in allowed:
+            return f'Unknown {key} in run_options: {value} (allowed: {allowed})'
+
+
+def validate_numbers(run_opts):  # pylint: disable=inconsistent-return-statements
+    """Check the numerical and boolean run options."""
+    energies_max_rows = run_opts.get('energies_max_rows', 1000)
+    if not isinstance(energies_max_rows, int) or energies_max_rows < 3:
+        return f'energies_max_rows in run_options needs to be an integer >= 3 (got {energies_max_rows})'
+    parser_threads = run_opts.get('parser_threads', 4)
+    if not isinstance(parser_threads, int) or parser_threads < 1:
+        return f'parser_threads in run_options needs to be a positive integer (got {parser_threads})'
+    for key in ['profile_phases', 'quiet']:
+        if not isinstance(run_opts.get(key, False), bool):
+            return f'{key} in run_options needs to be a boolean'
+    walltime_margin = run_opts.get('walltime_margin', 0)
+    if not isinstance(walltime_margin, (int, float)) or walltime_margin < 0:
+        return f'walltime_margin in run_options needs to be a non-negative number (got {walltime_margin})'
+    checkpoint_interval = run_opts.get('checkpoint_interval')
+    if checkpoint_interval is not None and (
+            not isinstance(checkpoint_interval,
+                           (int, float)) or checkpoint_interval <= 0):
+        return f'checkpoint_interval in run_options needs to be a positive number (got {checkpoint_interval})'
+
+
+def validate_stationarity(run_opts):  # pylint: disable=inconsistent-return-statements
+    """Check the stationarity run options (LLG only)."""
+    if 'stationarity' not in run_opts:
+        return None
+    if run_opts.get('simulation_method', 'LLG').upper() != 'LLG':
+        return 'The stationarity run_options are only available for simulation_method=LLG'
+    if not isinstance(run_opts['stationarity'], dict):
+        return 'stationarity in run_options needs to be a dict'
+    for key, value in run_opts['stationarity'].items():
+        if key not in _STATIONARITY_KEYS:
+            return f'Unknown key in the stationarity run_options: {key}'
+        if key == 'n_sigma':
+            if not isinstance(value, (int, float)) or value <= 0:
+                return f'n_sigma in stationarity needs to be a positive number (got {value})'
+        elif not isinstance(value, int) or value < 1:
+            return f'{key} in stationarity needs to be a positive integer (got {value})'
+
+
+def validate_mc_configuration(run_opts):  # pylint: disable=inconsistent-return-statements
+    """Check the mc_configuration of the MC and the parallel tempering (PT) runs."""
+    method = run_opts.get('simulation_method', 'LLG').upper()
+    if method not in ['MC', 'PT']:
+        return None
+    mc_configuration = run_opts.get('mc_configuration', {})
+    for key in [
+            'n_workers', 'n_threads', 'exchange_interval', 'min_samples',
+            'max_decorrelation'
+    ]:
+        value = mc_configuration.get(key, 1)
+        if not isinstance(value, int) or value < 1:
+            return f'{key} in mc_configuration needs to be a positive integer (got {value})'
+    adaptive = False
+    for key in ['target_energy_error', 'target_magnetization_error']:
+        value = mc_configuration.get(key)
+        if value is not None and (not isinstance(value,
+                                                 (int, float)) or value <= 0):
+            return f'{key} in mc_configuration needs to be a positive number (got {value})'
+        adaptive = adaptive or value is not None
+    if method == 'PT':
+        if adaptive:
+            return 'The adaptive sampling with target errors is not available for the parallel tempering (PT)'
+        if mc_configuration.get('n_temperatures', 0) < 2:
+            return 'The parallel tempering (PT) needs at least 2 temperatures (n_temperatures)'
+        if min(mc_configuration.get('T_start', 0),
+               mc_configuration.get('T_end', 0)) <= 0:
+            return 'The temperatures of the parallel tempering (PT) need to be larger than zero'
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Data plugin for spin configurations (i.e. the directions of all spins of a spirit calculation).
+
+The spin directions are stored in full precision or in a compact encoding:
+
+* ``float64``: full precision (no compression, the default)
+* ``float32``: single precision (half the size)
+* ``angles``: the polar and azimuthal angles quantised to unsigned integers with
+  ``angle_bits`` bits each (with 16 bits a third of the float32 size and a maximal
+  angular error of about 5e-5 rad)
+
+The arrays are only decoded when they are accessed with `get_array`.
+"""
+
+import numpy as np
+from aiida.orm import ArrayData
+
+# allowed encodings of the spin directions
+ENCODINGS = ['float64', 'float32', 'angles']
+# allowed number of bits per angle for the angles encoding and the corresponding data type
+ANGLE_DTYPES = {8: np.uint8, 16: np.uint16, 32: np.uint32}
+
+# name of the array that stores which spins are defects (i.e. have zero length)
+DEFECT_MASK = 'defect_mask'
+
+
+def encode_angles(directions, angle_bits=16):
+    """Quantise the directions of (N, 3) vectors to (N, 2) integer angles (theta, phi)."""
+    nlevels = 2**angle_bits - 1
+    theta = np.arccos(
+        np.clip(
+            directions[:, 2] /
+            np.maximum(np.linalg.norm(directions, axis=1), 1e-300), -1., 1.))
+    phi = np.arctan2(directions[:, 1], directions[:, 0])
+    encoded = np.empty((len(directions), 2), dtype=ANGLE_DTYPES[angle_bits])
+    encoded[:, 0] = np.rint(theta / np.pi * nlevels)
+    encoded[:, 1] = np.rint((phi + np.pi) / (2 * np.pi) * nlevels)
+    return encoded
+
+
+def decode_angles(encoded, angle_bits=16):
+    """Convert the (N, 2) integer angles back to (N, 3) unit vectors."""
+    nlevels = 2**angle_bits - 1
+    theta = encoded[:, 0] * (np.pi / nlevels)
+    phi = encoded[:, 1] * (2 * np.pi / nlevels) - np.pi
+    sin_theta = np.sin(theta)
+    directions = np.empty((len(encoded), 3), dtype=np.float64)
+    directions[:, 0] = sin_theta * np.cos(phi)
+    directions[:, 1] = sin_theta * np.sin(phi)
+    directions[:, 2] = np.cos(theta)
+    return directions
+
+
+class SpinConfigurationData(ArrayData):
+    """ArrayData that stores spin configurations in a compact encoding.
+
+    Use `set_spins` to store a (N, 3) array of spin directions and `get_array` to get
+    the decoded (N, 3) float64 array back. Spins with zero length (or nan, e.g. vacancies)
+    are stored in a defect mask (shared by all spin configurations of the node)
+    and are set to zero again when decoding.
+    """
+    _decoded_arrays = None
+
+    def set_spins(self, name, directions, encoding='float64', angle_bits=16):
+        """Store the spin directions with the given encoding.
+
+        :param name: name of the array
+        :param directions: (N, 3) array of spin directions
+        :param encoding: one of 'float64', 'float32' or 'angles'
+        :param angle_bits: number of bits per angle for the 'angles' encoding (8, 16 or 32)
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                f'Unknown spin encoding: {encoding} (allowed: {ENCODINGS})')
+        if encoding == 'angles' and angle_bits not in ANGLE_DTYPES:
+            raise ValueError(
+                f'angle_bits needs to be one of {list(ANGLE_DTYPES)}')
+
+        directions = np.nan_to_num(
+            np.asarray(directions, dtype=np.float64).reshape(-1, 3))
+        is_defect = ~(np.abs(directions) > 0).any(axis=1)
+        if is_defect.any():
+            self.set_array(DEFECT_MASK, is_defect)
+
+        if encoding == 'angles':
+            self.set_array(name, encode_angles(directions, angle_bits))
+        else:
+            self.set_array(name, directions.astype(encoding))
+
+        encodings = self._get_attr('spin_encodings', {})
+        encodings[name] = {
+            'encoding': encoding,
+            'angle_bits': angle_bits if encoding == 'angles' else None
+        }
+        self._set_attr('spin_encodings', encodings)
+
+    def initialize(self):
+        super().initialize()
+        self._decoded_arrays = {}
+
+    def get_array(self, name=None):
+        """Return an array stored in the node, spin configurations are decoded to (N, 3) float64 arrays.
+
+        Without a name the only array of the node is returned (see `ArrayData.get_array`). The decoded
+        arrays of a stored node are cached like the arrays of the base class.
+        """
+        if name is None:
+            arraynames = self.get_arraynames()
+            if len(arraynames) != 1:
+                # the base class raises the error for a missing name
+                return super().get_array(name)
+            name = arraynames[0]
+        info = self._get_attr('spin_encodings', {}).get(name)
+        if info is None:
+            return super().get_array(name)
+        if self.is_stored and name in self._decoded_arrays:
+            return self._decoded_arrays[name]
+
+        array = super().get_array(name)
+        if info['encoding'] == 'angles':
+            directions = decode_angles(array, info['angle_bits'])
+        else:
+            directions = array.astype(np.float64)
+        if DEFECT_MASK in self.get_arraynames():
+            directions[super().get_array(DEFECT_MASK)] = 0.
+        if self.is_stored:
+            self._decoded_arrays[name] = directions
+        return directions
+
+    def clear_internal_cache(self):
+        """Clear the cache of the arrays that were read from the repository and of the decoded arrays."""
+        super().clear_internal_cache()
+        self._decoded_arrays = {}
+
+    def get_shape(self, name):
+        """Return the shape of an array, for spin configurations the shape of the decoded array."""
+        shape = super().get_shape(name)
+        if name in self._get_attr('spin_encodings', {}):
+            return (shape[0], 3)
+        return shape
+
+    def get_spin_names(self):
+        """Return the names of the stored spin configurations."""
+        return list(self._get_attr('spin_encodings', {}))
+
+    def get_defect_mask(self):
+        """Return a boolean array that is True for the spins that are defects."""
+        if DEFECT_MASK in self.get_arraynames():
+            return super().get_array(DEFECT_MASK)
+        for name in self.get_spin_names():
+            return np.zeros(self.get_shape(name)[0], dtype=bool)
+        return None
+
+    @property
+    def n_basis_cells(self):
+        """Number of basis cells of the spirit calculation in the directions of the three lattice vectors."""
+        return self._get_attr('n_basis_cells', None)
+
+    @n_basis_cells.setter
+    def n_basis_cells(self, value):
+        self._set_attr('n_basis_cells', [int(i) for i in value])
+
+    @property
+    def n_basis_atoms(self):
+        """Number of atoms in the basis cell."""
+        return self._get_attr('n_basis_atoms', None)
+
+    @n_basis_atoms.setter
+    def n_basis_atoms(self, value):
+        self._set_attr('n_basis_atoms', int(value))
+
+    def _get_attr(self, key, default):
+        """Get an attribute (compatible with aiida-core 1.x and 2.x)"""
+        if hasattr(self, 'base'):
+            return self.base.attributes.get(key, default)
+        return self.get_attribute(key, default)
+
+    def _set_attr(self, key, value):
+        """Set an attribute (compatible with aiida-core 1.x and 2.x)"""
+        if hasattr(self, 'base'):
+            self.base.attributes.set(key, value)
+        else:
+            self.set_attribute(key, value)
@@ -4,17 +4,26 @@ Parsers provided by aiida_spirit.
 
 Register parsers via the "aiida.parsers" entry point in setup.json.
 """
+import contextlib
+import functools
+import json
 import pathlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from aiida.engine import ExitCode
 from aiida.parsers.parser import Parser
-from aiida.plugins import CalculationFactory
 from aiida.common import exceptions
 from aiida.orm import Dict, ArrayData
-from masci_tools.io.common_functions import search_string
-from .calculations import _RETLIST, _SPIRIT_STDOUT, _ATOM_TYPES
-
-SpiritCalculation = CalculationFactory('spirit')
+from .calculations import (SpiritCalculation, _RETLIST, _SPIRIT_STDOUT,
+                           _ATOM_TYPES, _SUMMARY, _TIMINGS, _RUN_INFO,
+                           _RESTART_INFO, _STATIONARITY, _MC_COLUMNS,
+                           _get_lattice_info)
+from .tools.ovf import read_ovf
+from .tools.compression import COMPRESSION_SUFFIXES, open_decompressed
+from .data.spin_configuration import SpinConfigurationData
+from .tools.observables import get_observables
+from .tools.traces import read_trace, reduce_trace, join_restarted_trace
 
 
 class SpiritParser(Parser):
@@ -52,22 +61,74 @@ class SpiritParser(Parser):
                 files_retrieved, files_expected))
             return self.exit_codes.ERROR_MISSING_OUTPUT_FILES
 
-        # parse information from output file (number of iterations, convergence info, ...)
-        retrieved_dict = self.parse_retrieved()
-
-        # parse files in temporary folder
+        # files in temporary folder
         # these files are not kept in the file repository but become numy arrays and are stored as ArrayData output nodes
         retrieved_temporary_folder = kwargs.get('retrieved_temporary_folder',
                                                 None)
+        parse_temporary = retrieved_temporary_folder is not None
         if retrieved_temporary_folder is not None:
+            retrieved_temporary_folder = pathlib.Path(
+                retrieved_temporary_folder)
+        if self.node.inputs.run_options.get_dict().get(
+                'retrieve_profile') == 'full':
+            # the output files of spirit are kept in the retrieved folder
+            retrieved_temporary_folder, parse_temporary = None, True
+
+        # the independent files are parsed concurrently
+        parsed = self._parse_files(
+            self._get_parse_tasks(retrieved_temporary_folder, parse_temporary))
+
+        # parse information from output file (number of iterations, convergence info, ...)
+        retrieved_dict = self.parse_retrieved(parsed)
+        if parse_temporary:
             retrieved_dict = self.parse_temporary_retrieved(
-                retrieved_dict, retrieved_temporary_folder)
+                retrieved_dict, parsed)
+        retrieved_dict['output_parameters'].update_dict(
+            {'parser_timings': self.parser_timings})
 
         for key, value in retrieved_dict.items():
             self.out(key, value)
 
-        # check consistency of spirit_version_info with the inputs
+        return self._check_outputs(retrieved_dict, parse_temporary)
+
+    def _check_outputs(self, retrieved_dict, parse_temporary):
+        """Return the exit code for incomplete MC runs, runs that reached the walltime or spirit builds
+        without the features that are needed by the inputs."""
+        # the job may have been killed before all temperatures of an MC run were finished
+        run_opts = self.node.inputs.run_options.get_dict()
+        if parse_temporary and run_opts['simulation_method'].upper() in [
+                'MC', 'PT'
+        ]:
+            n_finished = 0
+            if 'monte_carlo' in retrieved_dict:
+                n_finished = len(
+                    retrieved_dict['monte_carlo'].get_array('temperature'))
+            n_temperatures = run_opts['mc_configuration']['n_temperatures']
+            if n_finished < n_temperatures:
+                self.logger.warning(
+                    'Only {} of the {} temperatures of the MC run are finished'
+                    .format(n_finished, n_temperatures))
+                return self.exit_codes.ERROR_MC_INCOMPLETE
+
+        # spirit stopped the simulation before the job was killed by the scheduler
+        # (the parallel tempering stops with less than n_samples samples)
         output_node = retrieved_dict['output_parameters']
+        stop_reason = output_node.get_dict().get('stationarity',
+                                                 {}).get('stop_reason')
+        if run_opts['simulation_method'].upper(
+        ) == 'PT' and 'monte_carlo' in retrieved_dict:
+            if retrieved_dict['monte_carlo'].get_array('n_samples').min(
+            ) < run_opts['mc_configuration']['n_samples']:
+                stop_reason = 'walltime'
+        if output_node.get_dict().get(
+                'termination_reason'
+        ) == _WALLTIME_REACHED or stop_reason == 'walltime':
+            self.logger.warning(
+                'The simulation was stopped because the maximal walltime was reached'
+            )
+            return self.exit_codes.ERROR_MAX_WALLTIME_REACHED
+
+        # check consistency of spirit_version_info with the inputs
         if 'pinning' in self.node.inputs:
             version_info = output_node['spirit_version_info']
             if not 'enabled' in version_info['Pinning']:
@@ -79,49 +140,153 @@ class SpiritParser(Parser):
 
         return ExitCode(0)
 
-    def _parse_if_found(self, filename, *args, folder=None, **kwargs):
-        """Parses a file and loads it with `np.loadtxt`.
-        The `*args` and `**kwargs` are passed to `np.loadtxt`.
-        If the file is not found it returns None."""
+    @contextlib.contextmanager
+    def _open_if_found(self,
+                       filename,
+                       folder=None,
+                       compression=None,
+                       text=False):
+        """Open a file in the folder (or in the retrieved folder if folder is None).
+        For compressed files (the filename plus the suffix of the compression) the content
+        is decompressed while reading. Yields None if the file is not found."""
+        if compression is not None:
+            filename += COMPRESSION_SUFFIXES[compression]
         if folder is None:
-            folder = self.retrieved
-            if filename in folder.list_object_names():
-                with folder.open(filename, 'r') as _f:
-                    return np.loadtxt(_f, *args, **kwargs)
-            else:
-                return self._file_not_found(filename)
+            found = filename in self.retrieved.list_object_names()
         else:
-            filenames = [f.name for f in folder.glob('*')]
-            if filename in filenames:
-                with (folder / filename).open('r') as _f:
-                    return np.loadtxt(_f, *args, **kwargs)
-            else:
-                return self._file_not_found(filename)
+            found = (folder / filename).exists()
+        if not found:
+            self._file_not_found(filename)
+            yield None
+            return
+        with (self.retrieved.open(filename, 'rb') if folder is None else
+              (folder / filename).open('rb')) as _f:
+            yield open_decompressed(_f, compression, text=text)
+
+    def _get_parse_tasks(self,
+                         retrieved_temporary_folder,
+                         parse_temporary=True):
+        """Collect the files that are parsed.
+
+        :param retrieved_temporary_folder: folder with the files of the retrieve_temporary_list
+            (the retrieved folder is used if this is None)
+        :param parse_temporary: also parse the output files of the retrieve_temporary_list
+        :returns: dict of key -> (parse function, filename, keyword arguments of `_open_if_found`)
+        """
+        tasks = {
+            # the stdout is streamed, it can be very large for high log levels
+            'output_parameters': (parse_outfile, _SPIRIT_STDOUT, {}),
+            # ndmin=1 keeps the array 1-d for a single spin
+            'atom_types': (functools.partial(np.loadtxt,
+                                             ndmin=1), _ATOM_TYPES, {
+                                                 'text': True
+                                             }),
+        }
+        if self.node.inputs.run_options.get_dict().get('quiet', False):
+            # machine readable summary of the run, the stdout is only parsed if this is missing
+            tasks['output_parameters'] = (_parse_run_info_file, _RUN_INFO, {
+                'text': True
+            })
+        if self.node.inputs.run_options.get_dict().get('profile_phases',
+                                                       False):
+            # wall-clock time and peak memory of the phases of run_spirit.py
+            tasks['timings'] = (json.load, _TIMINGS, {'text': True})
+        if 'parent_folder' in self.node.inputs:
+            # spin configuration file and iteration from which the run was continued
+            tasks['restart'] = (json.load, _RESTART_INFO, {'text': True})
+        if 'stationarity' in self.node.inputs.run_options.get_dict():
+            # reason for the stop and averages of the LLG run that was advanced in chunks
+            tasks['stationarity'] = (json.load, _STATIONARITY, {'text': True})
+        if parse_temporary:
+            # the output files may have been compressed on the compute node
+            folder = {'folder': retrieved_temporary_folder}
+            compressed = dict(
+                folder,
+                compression=self.node.inputs.run_options.get_dict().get(
+                    'compression'))
+            tasks.update({
+                # observables that were computed on the compute node ('minimal' retrieve_profile)
+                'summary': (json.load, _SUMMARY, dict(folder, text=True)),
+                'energies':
+                (read_trace, 'spirit_Image-00_Energy-archive.txt', compressed),
+                'initial':
+                (read_ovf, 'spirit_Image-00_Spins-initial.ovf', compressed),
+                'final':
+                (read_ovf, 'spirit_Image-00_Spins-final.ovf', compressed),
+                'monte_carlo': (functools.partial(np.loadtxt,
+                                                  ndmin=2), 'output_mc.txt',
+                                dict(folder, text=True)),
+            })
+        return tasks
+
+    def _parse_files(self, tasks):
+        """Parse files concurrently in a thread pool.
+
+        The files are opened in the main thread, only the reading and parsing is done in the worker
+        threads (numpy releases the GIL in large parts of the parsing and during the file access).
+        The number of threads is set with `parser_threads` in the run_options (default 4).
+        The time needed to parse every file is stored in `self.parser_timings`.
+
+        :param tasks: dict of key -> (parse function, filename, keyword arguments of `_open_if_found`)
+        :returns: dict of key -> parsed content (None if the file is not found)
+        """
+        nthreads = self.node.inputs.run_options.get_dict().get(
+            'parser_threads', 4)
+        parsed = {key: None for key in tasks}
+        self.parser_timings = {}  # pylint: disable=attribute-defined-outside-init
+        with contextlib.ExitStack() as stack:
+            handles = {
+                key:
+                stack.enter_context(self._open_if_found(filename, **kwargs))
+                for key, (_, filename, kwargs) in tasks.items()
+            }
+            with ThreadPoolExecutor(max_workers=nthreads) as pool:
+                futures = {
+                    key: pool.submit(_timed, tasks[key][0], handle)
+                    for key, handle in handles.items() if handle is not None
+                }
+            for key, future in futures.items():
+                filename = tasks[key][1]
+                parsed[key], self.parser_timings[filename] = future.result()
+                self.logger.info(
+                    f'Parsed {filename} in {self.parser_timings[filename]:.3f} s'
+                )
+        return parsed
 
     def _file_not_found(self, filename):
         self.logger.info('{} not found!'.format(filename))
 
-    def parse_retrieved(self):  # pylint: disable=too-many-locals
-        """Parse the output from the retrieved and create aiida nodes"""
+    def parse_retrieved(self, parsed):
+        """Create aiida nodes from the parsed files of the retrieved folder
 
-        retrieved = self.retrieved
+        :param parsed: dict with the parsed content of the files (see `_get_parse_tasks`)
+        """
 
-        # parse info from stdout
-        output_filename = _SPIRIT_STDOUT
-        self.logger.info("Parsing '{}'".format(output_filename))
-        with retrieved.open(output_filename, 'r') as _f:
-            txt = _f.readlines()
-        out_dict = parse_outfile(txt)
+        # info from stdout (or from the run_info.json in the quiet mode)
+        out_dict = parsed['output_parameters']
+        if out_dict is None:
+            self.logger.info(f'Parsing {_SPIRIT_STDOUT} instead')
+            with self.retrieved.open(_SPIRIT_STDOUT, 'rb') as _f:
+                out_dict = parse_outfile(_f)
+        stationarity = parsed.get('stationarity')
+        if stationarity is not None and 'run_info' in stationarity:
+            # the stdout only has the run info of the first chunk of the run
+            out_dict.pop('termination_reason', None)
+            out_dict.update(
+                _parse_chunked_run_info(stationarity.pop('run_info')))
         output_node = Dict(dict=out_dict)
-
-        # parse output files
-        self.logger.info('Parsing atom types')
-        atyp = self._parse_if_found(_ATOM_TYPES)
+        if parsed.get('timings') is not None:
+            output_node['timings'] = parsed['timings']
+        if parsed.get('restart') is not None:
+            output_node['restart'] = parsed['restart']
+        if stationarity is not None:
+            output_node['stationarity'] = stationarity
 
         # Write dictionary of retrieved quantities
         _retrieved_dict = {'output_parameters': output_node}
 
         # collect arrays in ArrayData
+        atyp = parsed['atom_types']
         if atyp is not None:
             atypes = ArrayData()
             atypes.set_array('atom_types', atyp)
@@ -132,61 +297,76 @@ class SpiritParser(Parser):
 
         return _retrieved_dict
 
-    def parse_temporary_retrieved(self, _retrieved_dict,
-                                  retrieved_temporary_folder):
-        """Parse files that are defined in the retrieve_temporary_list"""
-        retrieved_temporary_folder = pathlib.Path(retrieved_temporary_folder)
-
-        self.logger.info('Parsing energy archive')
-        energ = self._parse_if_found('spirit_Image-00_Energy-archive.txt',
-                                     folder=retrieved_temporary_folder,
-                                     skiprows=1)
-
-        self.logger.info('Parsing initial magnetization')
-        m_init = self._parse_if_found('spirit_Image-00_Spins-initial.ovf',
-                                      folder=retrieved_temporary_folder)
-
-        self.logger.info('Parsing final magnetization')
-        m_final = self._parse_if_found('spirit_Image-00_Spins-final.ovf',
-                                       folder=retrieved_temporary_folder)
+    def _get_energies(self, energ):
+        """Create the energies output from the parsed energy archive (the rows of a stationarity run are
+        joined and the rows are reduced with the energies_reduction of the run_options)."""
+        energies = ArrayData()
+        energies.extras['description'] = {
+            'energies': 'Energy convergence with iterations.',
+        }
+        run_opts = self.node.inputs.run_options.get_dict()
+        if 'stationarity' in run_opts and energ.ndim == 2:
+            # the iterations of the archive start at zero in every chunk
+            energ = join_restarted_trace(energ)
+        if run_opts.get('energies_reduction') is not None and energ.ndim == 2:
+            # keep a bounded number of rows (column 0 is the iteration, column 1 the total energy)
+            energ, rows = reduce_trace(energ, run_opts['energies_reduction'],
+                                       run_opts.get('energies_max_rows', 1000))
+            energies.set_array('rows', rows)
+            energies.extras['description'][
+                'rows'] = 'Indices of the kept rows of the energy archive.'
+        energies.set_array('energies', energ)
+        return energies
+
+    def parse_temporary_retrieved(self, _retrieved_dict, parsed):
+        """Create aiida nodes from the parsed files that are defined in the retrieve_temporary_list
+
+        :param parsed: dict with the parsed content of the files (see `_get_parse_tasks`)
+        """
+        if parsed['summary'] is not None:
+            _retrieved_dict['output_parameters'].update_dict(parsed['summary'])
 
-        self.logger.info('Parsing MC output')
-        out_mc = self._parse_if_found('output_mc.txt',
-                                      folder=retrieved_temporary_folder)
+        energ = parsed['energies']
+        m_init = parsed['initial']
+        m_final = parsed['final']
+        out_mc = parsed['monte_carlo']
 
         if m_init is not None and m_final is not None:
-            mag = ArrayData()
-            mag.set_array(
-                'initial',
-                np.nan_to_num(m_init))  # nan_to_num is needed with defects
-            mag.set_array('final', np.nan_to_num(m_final))
+            mag = self._get_spin_configuration_data()
+            # nan_to_num is needed with defects
+            encoding = self._get_spin_encoding()
+            mag.set_spins('initial', np.nan_to_num(m_init), **encoding)
+            mag.set_spins('final', np.nan_to_num(m_final), **encoding)
             mag.extras['description'] = {
                 'initial': 'initial directions of the magnetization vectors',
                 'final': 'final directions of the magnetization vectors',
             }
             _retrieved_dict.update({'magnetization': mag})
 
+            # compute observables from the final state and store them in the output parameters
+            self.logger.info(
+                'Computing observables of the final magnetization')
+            _retrieved_dict['output_parameters'].update_dict(
+                self._get_observables(np.nan_to_num(m_final),
+                                      _retrieved_dict.get('atom_types')))
+
         if energ is not None:
-            energies = ArrayData()
-            energies.set_array('energies', energ)
-            energies.extras['description'] = {
-                'energies': 'Energy convergence with iterations.',
-            }
-            _retrieved_dict.update({'energies': energies})
+            _retrieved_dict.update({'energies': self._get_energies(energ)})
 
-        # Only add mc if it is found
-        if out_mc is not None:
+        # Only add mc if it is found (the file only has a header if no temperature was finished)
+        if out_mc is not None and out_mc.size > 0:
             output_mc = ArrayData()
 
             # Associante the columns of out_mc with individual arrays
-            array_names = [
-                'temperature', 'energy', 'magnetization', 'susceptibility',
-                'specific_heat', 'binder_cumulant'
-            ]
+            # (the statistics are missing in the files of older versions, exchange_acceptance is only
+            # written by the parallel tempering)
+            array_names = _MC_COLUMNS[:out_mc.shape[1]]
+            # the rows of a file of a killed run are in the order in which the temperatures were finished
+            out_mc = out_mc[np.argsort(out_mc[:, 0], kind='stable')]
             for i, name in enumerate(array_names):
                 output_mc.set_array(name, out_mc[:, i])
 
-            output_mc.extras['description'] = {
+            description = {
                 'temperature':
                 'The temperature at which the sampling was performed',
                 'energy':
@@ -199,73 +379,262 @@ class SpiritParser(Parser):
                 'The specific heat at the sampled temperature',
                 'binder_cumulant':
                 'The binder_cumulant at the sampled temperature',
+                'energy_error':
+                'The standard error of the average energy (binning analysis)',
+                'magnetization_error':
+                'The standard error of the average spin direction (binning analysis)',
+                'n_samples':
+                'The number of samples at the sampled temperature',
+                'n_effective_samples':
+                'The number of effectively independent samples at the sampled temperature',
+                'n_decorrelation':
+                'The number of MC iterations between the samples',
+                'exchange_acceptance':
+                'The acceptance rate of the swaps with the replica at the next temperature (parallel tempering)',
+            }
+            output_mc.extras['description'] = {
+                name: description[name]
+                for name in array_names
             }
             _retrieved_dict.update({'monte_carlo': output_mc})
 
         return _retrieved_dict
 
+    def _get_spin_encoding(self):
+        """Get the encoding of the spin configurations from the run_options"""
+        run_opts = self.node.inputs.run_options.get_dict()
+        return {
+            'encoding': run_opts.get('spin_encoding', 'float64'),
+            'angle_bits': run_opts.get('spin_angle_bits', 16),
+        }
+
+    def _get_observables(self, spins, atom_types_node):
+        """Compute the observables of a spin configuration (see `aiida_spirit.tools.observables`)"""
+        atom_types = None
+        if atom_types_node is not None:
+            atom_types = atom_types_node.get_array('atom_types')
+        return get_observables(spins,
+                               _get_lattice_info(self.node.inputs),
+                               atom_types=atom_types)
+
+    def _get_spin_configuration_data(self):
+        """Create an empty SpinConfigurationData node with the metadata of the spirit system"""
+        mag = SpinConfigurationData()
+        lattice_info = _get_lattice_info(self.node.inputs)
+        mag.n_basis_cells = lattice_info['n_basis_cells']
+        mag.n_basis_atoms = lattice_info['n_basis_atoms']
+        return mag
+
+
+def _timed(func, *args):
+    """Call func(*args) and return the result and the runtime in seconds"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+# keys that are searched in the spirit stdout, only the first line that contains a key is used
+_OUTFILE_KEYS = [
+    'Total duration', 'Iterations / sec', 'Simulated time',
+    'Number of  Errors', 'Number of Warnings', 'Terminated', 'Solver:',
+    'Reason:'
+]
+_VERSION_INFO_KEYS = [
+    'Version', 'Revision', 'OpenMP', 'CUDA', 'std::thread', 'Defects',
+    'Pinning', 'scalar type'
+]
+# termination reason in the log of spirit if the llg_max_walltime is reached
+_WALLTIME_REACHED = 'The maximum walltime has been reached'
+# number of characters that are read at once from the stdout file
+_BLOCK_SIZE = 2**22
+
+
+def _iter_blocks(txt):
+    """Iterate over blocks of complete lines of a file handle (or over the lines of a list)"""
+    if not hasattr(txt, 'read'):
+        yield from txt
+        return
+    rest = txt.read(
+        0)  # empty str or bytes, depending on the mode of the file handle
+    newline = '\n' if isinstance(rest, str) else b'\n'
+    while True:
+        block = txt.read(_BLOCK_SIZE)
+        if not block:
+            if rest:
+                yield rest
+            return
+        block = rest + block
+        iend = block.rfind(newline) + 1
+        block, rest = block[:iend], block[iend:]
+        if block:
+            yield block
+
+
+def find_first_lines(txt, keys):
+    """Find the first line that contains each of the keys in a single pass.
+
+    The text is processed in blocks of lines and for every block only the keys that
+    were not found yet are searched for. The search stops when all keys are found.
+
+    :param txt: file handle (text or binary mode) or list of lines
+    :param keys: list of strings that are searched for
+    :returns: dict with the first line (including the newline) that contains a key
+    """
+    found = {}
+    pending = list(keys)
+    for block in _iter_blocks(txt):
+        if isinstance(block, bytes):
+            # files opened in binary mode are searched without decoding the full content
+            block_keys, newline = [key.encode() for key in pending], b'\n'
+        else:
+            block_keys, newline = pending, '\n'
+        for key, block_key in zip(pending, block_keys):
+            idx = block.find(block_key)
+            if idx >= 0:
+                istart = block.rfind(newline, 0, idx) + 1
+                iend = block.find(newline, idx)
+                line = block[istart:] if iend < 0 else block[istart:iend + 1]
+                found[key] = line.decode('utf-8',
+                                         errors='replace') if isinstance(
+                                             line, bytes) else line
+        if len(found) == len(keys):
+            break
+        pending = [key for key in pending if key not in found]
+    return found
+
+
+def _version_info_value(line):
+    """Strip the decoration of a line of the spirit version info in the stdout"""
+    found_str = line.replace('==========', '').replace('  ', '')
+    if found_str[0] == ' ':
+        found_str = found_str[1:-1]
+    return found_str
+
 
 def parse_outfile(txt):
-    """parse the spirit output file"""
+    """parse the spirit output file
+
+    :param txt: file handle of the spirit stdout (text or binary mode) or list of lines
+    """
 
     out_dict = {}
+    lines = find_first_lines(txt, _OUTFILE_KEYS + _VERSION_INFO_KEYS)
 
-    itmp = search_string('Total duration', txt)
-    if itmp >= 0:
-        t_str = txt[itmp].split()[2]
+    if 'Total duration' in lines:
+        t_str = lines['Total duration'].split()[2]
         tmp = [float(i) for i in t_str.split(':')]
         t_sec = tmp[0] * 3600 + tmp[1] * 60 + tmp[2]
         out_dict['runtime'] = t_str
         out_dict['runtime_sec'] = t_sec
 
-    itmp = search_string('Iterations / sec', txt)
-    if itmp >= 0:
-        tmp = txt[itmp].split()[-1]
+    if 'Iterations / sec' in lines:
+        tmp = lines['Iterations / sec'].split()[-1]
         it_per_s = float(tmp)
         out_dict['it_per_s'] = it_per_s
 
-    itmp = search_string('Simulated time', txt)
-    if itmp >= 0:
-        tmp = txt[itmp].split()
+    if 'Simulated time' in lines:
+        tmp = lines['Simulated time'].split()
         sim_time = float(tmp[-2])
         sim_time_unit = tmp[-1]
         out_dict['simulation_time'] = sim_time
         out_dict['simulation_time_unit'] = sim_time_unit
 
-    itmp = search_string('Number of  Errors', txt)
-    if itmp >= 0:
-        tmp = txt[itmp].split()
+    if 'Number of  Errors' in lines:
+        tmp = lines['Number of  Errors'].split()
         num_errors = int(tmp[-1])
         out_dict['num_errors'] = num_errors
 
-    itmp = search_string('Number of Warnings', txt)
-    if itmp >= 0:
-        tmp = txt[itmp].split()
+    if 'Number of Warnings' in lines:
+        tmp = lines['Number of Warnings'].split()
         num_warn = int(tmp[-1])
         out_dict['num_warnings'] = num_warn
 
-    itmp = search_string('Terminated', txt)
-    if itmp >= 0:
-        tmp = txt[itmp].split()
+    if 'Terminated' in lines:
+        tmp = lines['Terminated'].split()
         out_dict['simulation_mode'] = tmp[-3]
 
-    itmp = search_string('Solver:', txt)
-    if itmp >= 0:
-        tmp = txt[itmp].split()
+    if 'Solver:' in lines:
+        tmp = lines['Solver:'].split()
         out_dict['solver'] = tmp[-1]
 
+    if 'Reason:' in lines:
+        out_dict['termination_reason'] = lines['Reason:'].split('Reason:',
+                                                                1)[1].strip()
+
     # parse information on the spirit executable (i.e. check parallelization and enabled features)
     spirit_version_info = {}
-    for key in [
-            'Version', 'Revision', 'OpenMP', 'CUDA', 'std::thread', 'Defects',
-            'Pinning', 'scalar type'
-    ]:
-        itmp = search_string(key, txt)
-        if itmp >= 0:
-            found_str = txt[itmp].replace('==========', '').replace('  ', '')
-            if found_str[0] == ' ':
-                found_str = found_str[1:-1]
-            spirit_version_info[key] = found_str
+    for key in _VERSION_INFO_KEYS:
+        if key in lines:
+            spirit_version_info[key] = _version_info_value(lines[key])
     out_dict['spirit_version_info'] = spirit_version_info
 
     return out_dict
+
+
+def _parse_run_info_file(handle):
+    """Read the run_info.json and convert it with `parse_run_info`"""
+    return parse_run_info(json.load(handle))
+
+
+def _format_runtime(runtime_ms):
+    """Format a runtime in milliseconds like spirit does in the log (hours:minutes:seconds)"""
+    minutes, seconds = divmod(runtime_ms / 1000, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f'{hours}:{minutes}:{seconds:.3f}'
+
+
+def _parse_chunked_run_info(run_info):
+    """Convert the summed up run info of the chunks of a run until stationary (from the stationarity.json)
+    to the keys of the output dict of `parse_outfile`"""
+    out_dict = {
+        'runtime': _format_runtime(run_info['runtime_ms']),
+        'runtime_sec': run_info['runtime_ms'] / 1000,
+        'it_per_s': run_info['it_per_s'],
+        'simulation_time': run_info['simulation_time'],
+        'simulation_time_unit': 'ps',
+    }
+    if 'termination_reason' in run_info:
+        out_dict['termination_reason'] = run_info['termination_reason']
+    return out_dict
+
+
+def parse_run_info(run_info):
+    """Convert the run_info.json that is written by run_spirit.py in the quiet mode
+    to the same output dict that `parse_outfile` creates from the stdout
+
+    :param run_info: dict with the content of the run_info.json
+    """
+    out_dict = {
+        key: run_info[key]
+        for key in [
+            'num_errors', 'num_warnings', 'simulation_mode', 'solver',
+            'it_per_s', 'n_iterations', 'max_torque', 'energy',
+            'energy_per_spin', 'termination_reason'
+        ] if key in run_info
+    }
+
+    if 'runtime_ms' in run_info:
+        out_dict['runtime'] = _format_runtime(run_info['runtime_ms'])
+        out_dict['runtime_sec'] = run_info['runtime_ms'] / 1000
+
+    if 'simulation_time' in run_info:
+        out_dict['simulation_time'] = run_info['simulation_time']
+        out_dict['simulation_time_unit'] = 'ps'
+
+    # same strings as in the stdout of spirit (parse_outfile keeps the line break of the version and the revision)
+    version = run_info['spirit_version']
+    using = {'ON': 'Using', 'OFF': 'Not using'}
+    out_dict['spirit_version_info'] = {
+        'Version': f"Version:{version['version']}\n",
+        'Revision': f"Revision: {version['revision']}\n",
+        'OpenMP': f"{using[version['openmp']]} OpenMP",
+        'CUDA': f"{using[version['cuda']]} CUDA",
+        'std::thread': f"{using[version['threads']]} std::thread",
+        'Defects': 'Defects are enabled'
+        if version['defects'] == 'ON' else 'Defects are not enabled',
+        'Pinning': 'Pinning is enabled'
+        if version['pinning'] == 'ON' else 'Pinning is not enabled',
+        'scalar type': f"Using {version['scalartype']} as scalar type",
+    }
+
+    return out_dict
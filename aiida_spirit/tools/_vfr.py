@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 """
 Interface to the spirit web view used in the plotting tool.
+
+IPython is only imported when a frame is created or updated, so that importing
+this module does not slow down the import of the plugin.
 """
 
 import json
 import secrets
 import numpy as np
-from IPython.display import display, HTML, Javascript
 
 _vfr_frame_id_mapping = {}
 _next_frame_id = 1
@@ -18,6 +20,7 @@ _frame_id_suffix = secrets.token_hex(32)
 def setup(vfr_frame_id='', height_px=600, width_percent=100):
     """Create a frame in the jupyter ntoebook to into which the spins are shown."""
     global _vfr_frame_id_mapping, _next_frame_id, _frame_id_suffix
+    from IPython.display import HTML  # pylint: disable=import-outside-toplevel
     if vfr_frame_id not in _vfr_frame_id_mapping:
         _vfr_frame_id_mapping[vfr_frame_id] = 'vfr_frame_wrapper_' + str(
             _next_frame_id) + '_' + _frame_id_suffix
@@ -68,6 +71,7 @@ def setup(vfr_frame_id='', height_px=600, width_percent=100):
 def update(positions, directions, rectilinear=True, vfr_frame_id=''):
     """Update the spins in the frame."""
     global _vfr_frame_id_mapping
+    from IPython.display import display, Javascript  # pylint: disable=import-outside-toplevel
     vfr_frame_id = _vfr_frame_id_mapping[vfr_frame_id]
     n_cells = positions.shape[:-1][::-1]
     n = int(np.prod(positions.shape[:-1]))
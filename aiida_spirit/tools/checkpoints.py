@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Periodic checkpoints of the spin configuration of an LLG run and the restart from the spin
+configurations of a previous run.
+
+The spin configurations that spirit writes (initial, final and the snapshots of every log step)
+and the checkpoints contain the iteration at which they were written in the description of the
+OVF header. The module only uses the standard library such that a copy of it can be used in
+run_spirit.py on the compute node.
+"""
+
+import glob
+import json
+import os
+import re
+import threading
+
+# spin configuration files of spirit (and the checkpoint) that can be used for a restart
+SPINS_PATTERN = 'spirit_Image-00_Spins*.ovf'
+
+# the iteration is written to the header as `# Desc: Iteration: 1000` (or `# Desc:      Iteration: 1000`)
+_ITERATION_REGEX = re.compile(rb'^#\s*Desc:\s*Iteration:\s*(\d+)')
+# every complete OVF file (text or binary) ends with this line
+_END_OF_FILE = b'# End: Segment'
+
+
+def read_ovf_iteration(filename):
+    """Read the iteration from the description in the header of an OVF file.
+
+    :param filename: name of the OVF file
+    :returns: iteration (None if the header has no iteration)
+    """
+    with open(filename, 'rb') as _f:
+        for line in _f:
+            if line.startswith(b'# Begin: Data'):
+                break
+            match = _ITERATION_REGEX.match(line)
+            if match:
+                return int(match.group(1))
+    return None
+
+
+def is_complete_ovf(filename):
+    """Check that an OVF file was written completely (e.g. the job was not killed while it was written)."""
+    with open(filename, 'rb') as _f:
+        _f.seek(0, os.SEEK_END)
+        _f.seek(max(0, _f.tell() - 2 * len(_END_OF_FILE)))
+        return _f.read().rstrip().endswith(_END_OF_FILE)
+
+
+def find_restart_file(folder, restart_info_file=None):
+    """Find the spin configuration with the largest iteration in a folder.
+
+    Files that were not written completely are skipped. If the spin configurations were written
+    by a run that was itself restarted, its restart info file (see `write_restart_info`) contains the
+    iteration at which that run was started which is added to the iterations in the headers.
+
+    :param folder: folder with the spin configurations of the previous run
+    :param restart_info_file: name of the restart info file of the previous run (in the folder)
+    :returns: name of the spin configuration file and the iteration (None and 0 if no file is found)
+    """
+    candidates = []
+    for filename in glob.glob(os.path.join(folder, SPINS_PATTERN)):
+        if not is_complete_ovf(filename):
+            continue
+        iteration = read_ovf_iteration(filename)
+        if iteration is not None:
+            # the final configuration is preferred over a snapshot of the same iteration
+            candidates.append((iteration, 'Spins-final' in filename, filename))
+    if not candidates:
+        return None, 0
+    iteration, _, filename = max(candidates)
+
+    if restart_info_file is not None and os.path.exists(
+            os.path.join(folder, restart_info_file)):
+        with open(os.path.join(folder, restart_info_file),
+                  'r',
+                  encoding='utf-8') as _f:
+            iteration += json.load(_f)['iteration']
+    return filename, iteration
+
+
+def write_restart_info(restart_info_file, filename, iteration):
+    """Write the spin configuration file and the iteration from which a run is continued to a json file."""
+    with open(restart_info_file, 'w', encoding='utf-8') as _f:
+        json.dump({
+            'file': os.path.basename(filename),
+            'iteration': iteration
+        }, _f)
+
+
+def temporary_filename(filename):
+    """Name of the temporary file to which a checkpoint is written before it replaces the previous checkpoint.
+
+    The name does not match the SPINS_PATTERN but keeps the `.ovf` extension (spirit warns about other extensions).
+    """
+    head, tail = os.path.split(filename)
+    return os.path.join(head, 'tmp_' + tail)
+
+
+class PeriodicCheckpoint:
+    """Write checkpoints at a fixed wall-clock interval in a background thread.
+
+    The checkpoint is written to a temporary file first which then replaces the previous
+    checkpoint, a job that is killed while a checkpoint is written keeps the previous one.
+    Usage::
+
+        with PeriodicCheckpoint(write, 'checkpoint.ovf', interval=600):
+            simulation.start(...)
+    """
+    def __init__(self, write, filename, interval):
+        """
+        :param write: function that writes the checkpoint to the file name that is passed to it,
+            it returns False if no checkpoint was written (e.g. because the simulation is not running)
+        :param filename: name of the checkpoint file
+        :param interval: wall-clock time between the checkpoints in seconds (not used if only `write_now` is called)
+        """
+        self.write = write
+        self.filename = filename
+        self.interval = interval
+        self.n_written = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write_now()
+
+    def write_now(self):
+        """Write a checkpoint."""
+        tmp_filename = temporary_filename(self.filename)
+        if self.write(tmp_filename) is False:
+            return
+        os.replace(tmp_filename, self.filename)
+        self.n_written += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        return False
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Compression of the output files of spirit on the compute node and streaming decompression in the parser.
+
+The module only depends on the standard library (and optionally on `zstandard` for the
+'zstd' compression) such that a copy of it can be used in run_spirit.py on the compute node.
+"""
+
+import gzip
+import io
+import os
+import shutil
+
+# file name suffixes of the compressed files
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+# number of bytes that are copied at once
+_BLOCK_SIZE = 2**20
+
+
+def _import_zstandard():
+    """Import the optional zstandard package (installed with the `zstd` extra)"""
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError as err:
+        raise ImportError(
+            "The 'zstd' compression needs the zstandard package (pip install zstandard)"
+        ) from err
+    return zstandard
+
+
+def compress_file(filename, compression='gzip', remove=True):
+    """Compress a file and (by default) remove the uncompressed file.
+
+    :param filename: name of the file that is compressed
+    :param compression: 'gzip' or 'zstd'
+    :param remove: remove the uncompressed file
+    :returns: name of the compressed file
+    """
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(
+            f'Unknown compression: {compression} (allowed: {list(COMPRESSION_SUFFIXES)})'
+        )
+    compressed_name = filename + COMPRESSION_SUFFIXES[compression]
+
+    with open(filename, 'rb') as _fin:
+        if compression == 'gzip':
+            # a low compression level is much faster and compresses the number columns almost as well
+            with gzip.open(compressed_name, 'wb', compresslevel=3) as _fout:
+                shutil.copyfileobj(_fin, _fout, _BLOCK_SIZE)
+        else:
+            zstandard = _import_zstandard()
+            with open(compressed_name, 'wb') as _fout:
+                zstandard.ZstdCompressor().copy_stream(_fin,
+                                                       _fout,
+                                                       read_size=_BLOCK_SIZE,
+                                                       write_size=_BLOCK_SIZE)
+
+    if remove:
+        os.remove(filename)
+    return compressed_name
+
+
+def open_decompressed(handle, compression=None, text=False):
+    """Wrap a binary file handle such that the content is decompressed while reading.
+
+    :param handle: binary file handle of the (compressed) file
+    :param compression: None, 'gzip' or 'zstd'
+    :param text: return a text mode handle
+    :returns: file handle that yields the decompressed content
+    """
+    if compression == 'gzip':
+        handle = gzip.GzipFile(fileobj=handle, mode='rb')
+    elif compression == 'zstd':
+        zstandard = _import_zstandard()
+        # the buffered reader adds readline and iteration which are needed for parsing
+        handle = io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(handle), _BLOCK_SIZE)
+    elif compression is not None:
+        raise ValueError(
+            f'Unknown compression: {compression} (allowed: {list(COMPRESSION_SUFFIXES)})'
+        )
+    if text:
+        handle = io.TextIOWrapper(handle, encoding='utf-8')
+    return handle
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Local content-addressed cache for the generated input files (couplings, pinning, defects).
+
+Calculations that use the same input nodes (e.g. all calculations of a temperature scan
+use the same `jij_data`) can then copy the file from the cache instead of writing it again.
+
+The cache is enabled by setting the `AIIDA_SPIRIT_CACHE_DIR` environment variable
+(for the daemon it has to be set in the environment in which the daemon is started).
+The maximal size of the cache in MB is set with `AIIDA_SPIRIT_CACHE_SIZE` (default: 2048).
+If the cache grows beyond that size, the least recently used files are removed.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+# version of the file writers, changing this invalidates all cached files
+WRITER_VERSION = 1
+
+# environment variables that control the cache
+CACHE_DIR_ENV = 'AIIDA_SPIRIT_CACHE_DIR'
+CACHE_SIZE_ENV = 'AIIDA_SPIRIT_CACHE_SIZE'
+DEFAULT_CACHE_SIZE = 2048  # in MB
+
+
+def get_node_hash(node):
+    """Get the hash of an AiiDA node which is independent of the node's uuid."""
+    if hasattr(node, 'base'):
+        # aiida-core>=2.0
+        return node.base.caching.get_hash()
+    return node.get_hash()
+
+
+class FileCache():
+    """Content-addressed file cache with a least recently used eviction strategy.
+
+    :param path: directory in which the cached files are stored
+    :param max_size: maximal size of all files in the cache in bytes
+    """
+    def __init__(self, path, max_size=DEFAULT_CACHE_SIZE * 1024**2):
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Create a cache key from a list of parts (which need to have a stable string representation)."""
+        hasher = hashlib.sha256()
+        for part in (WRITER_VERSION, ) + parts:
+            hasher.update(repr(part).encode('utf-8'))
+            hasher.update(b'\0')
+        return hasher.hexdigest()
+
+    def get_path(self, key):
+        """Return the path of a cached file."""
+        return os.path.join(self.path, key)
+
+    def fetch(self, key, dest):
+        """Copy a cached file to `dest`.
+
+        :returns: True if the file was found in the cache, False otherwise
+        """
+        src = self.get_path(key)
+        try:
+            # mark as recently used for the LRU eviction
+            os.utime(src)
+            try:
+                # hard links avoid copying, the sandbox files are not modified afterwards
+                if os.path.exists(dest):
+                    os.remove(dest)
+                os.link(src, dest)
+            except OSError:
+                shutil.copyfile(src, dest)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key, src):
+        """Put the file `src` into the cache and evict old files if the cache is too large."""
+        # write to a temporary file first to make the insertion atomic
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, self.get_path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used files until the cache is smaller than `max_size`."""
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_file() and not entry.name.startswith('.tmp-'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+def get_file_cache():
+    """Return the FileCache configured by the environment variables or None if caching is disabled."""
+    path = os.environ.get(CACHE_DIR_ENV, '')
+    if path == '':
+        return None
+    max_size = float(os.environ.get(CACHE_SIZE_ENV,
+                                    DEFAULT_CACHE_SIZE)) * 1024**2
+    return FileCache(path, max_size=max_size)
@@ -4,6 +4,7 @@ Tools to get files from the remote folder
 """
 
 from aiida.common.folders import SandboxFolder
+from .ovf import read_ovf
 
 
 def list_remote_files(node):
@@ -32,3 +33,15 @@ def get_file_content_from_remote(node, fname):
             raise ValueError(f"File '{fname}' not found on remote")
 
         return contents
+
+
+def get_spins_from_remote(node, fname):
+    """copy a (text or binary) OVF file with spin directions from the remote and read the directions"""
+    with SandboxFolder() as tempfolder:
+        try:
+            node.outputs.remote_folder.getfile(
+                fname, tempfolder.get_abs_path('tempfile'))
+        except Exception as err:  # pylint: disable=broad-except
+            raise ValueError(f"File '{fname}' not found on remote") from err
+        with tempfolder.open('tempfile', 'rb') as f:
+            return read_ovf(f)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Online accumulators and replica exchange for the Monte Carlo sampling in run_spirit.py.
+
+The samples are accumulated with Welford's algorithm, i.e. the mean and the variance are
+updated with every sample without storing the samples and without the cancellation of
+`<x^2> - <x>^2`. The statistical errors of the correlated samples are estimated with an
+online binning analysis. The module only uses the standard library such that a copy of
+it can be used in run_spirit.py on the compute node.
+"""
+
+import math
+import random
+
+
+class OnlineMoments:
+    """Running mean and variance of a stream of values (Welford's algorithm)."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.
+        self._m2 = 0.
+
+    def add(self, value):
+        """Add a sample."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        """Population variance of the samples (zero if there are no samples)."""
+        if self.count == 0:
+            return 0.
+        return self._m2 / self.count
+
+
+class BinningAnalysis(OnlineMoments):
+    """Running mean, variance and standard error of a correlated stream of values.
+
+    The samples are averaged pairwise into bins of 2, 4, 8, ... samples while they are added.
+    The standard error of the mean that is estimated from the bin averages grows with the bin
+    size until the bins are longer than the autocorrelation time. The largest estimate of the
+    levels with at least `min_bins` bins is used as error (which is less noisy than the estimate
+    of the largest bins alone).
+    """
+    def __init__(self, min_bins=64):
+        super().__init__()
+        self.min_bins = min_bins
+        # moments of the averages of bins with 2, 4, 8, ... samples
+        self._levels = []
+        # first value of the bin that is not complete yet (for every level)
+        self._pending = []
+
+    def add(self, value):
+        """Add a sample."""
+        super().add(value)
+        level = 0
+        while True:
+            if level == len(self._pending):
+                self._levels.append(OnlineMoments())
+                self._pending.append(None)
+            if self._pending[level] is None:
+                self._pending[level] = value
+                return
+            value = 0.5 * (self._pending[level] + value)
+            self._pending[level] = None
+            self._levels[level].add(value)
+            level += 1
+
+    @staticmethod
+    def _standard_error(moments):
+        """Standard error of the mean of uncorrelated values."""
+        if moments.count < 2:
+            return 0.
+        return math.sqrt(moments.variance / (moments.count - 1))
+
+    @property
+    def error(self):
+        """Standard error of the mean (binning analysis)."""
+        errors = [
+            self._standard_error(moments) for moments in self._levels
+            if moments.count >= self.min_bins
+        ]
+        return max([self._standard_error(self)] + errors)
+
+    @property
+    def autocorrelation_time(self):
+        """Integrated autocorrelation time in units of the samples (0.5 for uncorrelated samples)."""
+        naive_error = self._standard_error(self)
+        if naive_error == 0.:
+            return 0.5
+        return 0.5 * (self.error / naive_error)**2
+
+
+def adapt_decorrelation(n_decorrelation, autocorrelation_time,
+                        max_decorrelation):
+    """Number of decorrelation steps after which the samples are approximately uncorrelated.
+
+    :param n_decorrelation: number of steps between the samples that were used to measure the autocorrelation time
+    :param autocorrelation_time: integrated autocorrelation time in units of the samples
+    :param max_decorrelation: upper limit of the returned number of steps
+    :returns: number of decorrelation steps (never smaller than n_decorrelation)
+    """
+    # the estimate of the autocorrelation time is noisy, uncorrelated samples have 0.5
+    if autocorrelation_time <= 1:
+        return n_decorrelation
+    return max(
+        n_decorrelation,
+        min(max_decorrelation,
+            round(2 * autocorrelation_time * n_decorrelation)))
+
+
+class MCAccumulator:
+    """Accumulate the energy per spin and the norm of the magnetization of the MC samples.
+
+    Besides the mean, the variance and the binning errors of E and |M| the moments <M^2>
+    and <M^4> are accumulated which are needed for the Binder cumulant.
+    """
+    def __init__(self):
+        self.energy = BinningAnalysis()
+        self.magnetization = BinningAnalysis()
+        self.magnetization2 = OnlineMoments()
+        self.magnetization4 = OnlineMoments()
+
+    def add(self, energy, magnetization):
+        """Add a sample of the energy per spin and the norm of the magnetization."""
+        self.energy.add(energy)
+        self.magnetization.add(magnetization)
+        self.magnetization2.add(magnetization**2)
+        self.magnetization4.add(magnetization**4)
+
+    def observables(self, temperature, k_b):
+        """Return the averages and the response functions at the temperature.
+
+        :param temperature: temperature of the sampling
+        :param k_b: Boltzmann constant (in the energy units of the samples per temperature unit)
+        :returns: energy, magnetization, susceptibility, specific heat and Binder cumulant
+        """
+        chi = self.magnetization.variance / (k_b * temperature)
+        c_v = self.energy.variance / (k_b * temperature**2)
+        cumulant = 1 - self.magnetization4.mean / (3 *
+                                                   self.magnetization2.mean**2)
+        return self.energy.mean, self.magnetization.mean, chi, c_v, cumulant
+
+    @property
+    def n_samples(self):
+        """Number of accumulated samples."""
+        return self.energy.count
+
+    @property
+    def autocorrelation_time(self):
+        """Larger integrated autocorrelation time of E and |M| in units of the samples."""
+        return max(self.energy.autocorrelation_time,
+                   self.magnetization.autocorrelation_time)
+
+    def statistics(self):
+        """Return the statistics of the samples.
+
+        :returns: standard errors of E and |M|, number of samples and number of effectively independent samples
+        """
+        n_effective = self.n_samples / (2 * self.autocorrelation_time)
+        return self.energy.error, self.magnetization.error, self.n_samples, n_effective
+
+    def converged(self, energy_error=None, magnetization_error=None):
+        """Check if the standard errors of E and |M| are below the target errors (None is not checked)."""
+        if energy_error is not None and self.energy.error > energy_error:
+            return False
+        if magnetization_error is not None and self.magnetization.error > magnetization_error:
+            return False
+        return True
+
+
+class ReplicaExchange:
+    """Exchange of the configurations of replicas at neighbouring temperatures (parallel tempering).
+
+    The replicas are ordered by temperature. In every attempt the swaps of either the even or
+    the odd pairs of neighbouring replicas are proposed (alternating between attempts) and are
+    accepted with the probability min(1, exp((beta_i - beta_j) * (E_i - E_j))).
+    """
+    def __init__(self, temperatures, k_b, seed=None):
+        """
+        :param temperatures: temperatures of the replicas (larger than zero)
+        :param k_b: Boltzmann constant (in the energy units of the replicas per temperature unit)
+        :param seed: seed of the random numbers that decide on the acceptance
+        """
+        self.betas = [1. / (k_b * temperature) for temperature in temperatures]
+        self.n_attempts = [0] * (len(self.betas) - 1)
+        self.n_accepted = [0] * (len(self.betas) - 1)
+        self._offset = 0
+        self._random = random.Random(seed)
+
+    def propose(self, energies):
+        """Propose the swaps of the neighbouring replicas for the total energies of the replicas.
+
+        :param energies: total energy of every replica
+        :returns: list of the accepted pairs (i, i+1) whose configurations have to be swapped
+        """
+        swaps = []
+        for i in range(self._offset, len(self.betas) - 1, 2):
+            self.n_attempts[i] += 1
+            delta = (self.betas[i] - self.betas[i + 1]) * (energies[i] -
+                                                           energies[i + 1])
+            if delta >= 0 or self._random.random() < math.exp(delta):
+                self.n_accepted[i] += 1
+                swaps.append((i, i + 1))
+        self._offset = 1 - self._offset
+        return swaps
+
+    @property
+    def acceptance_rates(self):
+        """Fraction of the accepted swaps for every pair of neighbouring replicas."""
+        return [
+            accepted / attempts if attempts else 0.
+            for accepted, attempts in zip(self.n_accepted, self.n_attempts)
+        ]
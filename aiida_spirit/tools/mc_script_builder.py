@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+Helper class for building the Monte Carlo version of the run_spirit script.
+"""
+from .spirit_script_builder import SpiritScriptBuilder
+
+
+class MCScriptBuilder(SpiritScriptBuilder):
+    """Helper class to build the MC version of run_spirit.py (also used for the parallel tempering).
+
+    The temperatures are either sampled one after the other (optionally in forked worker processes)
+    or all at once with the replica exchange. The samples are accumulated with the online accumulators
+    of the copy of the mc_sampling module that is put next to run_spirit.py.
+    """
+    def set_omp_threads(self, n_workers, n_threads=None):
+        """Set the number of OpenMP threads of every worker (has to be done before spirit is loaded).
+
+        Without `n_threads` the cores that are available to the job are split between the `n_workers` workers.
+        """
+        self += 'import os'
+        if n_threads is not None:
+            self += 'n_threads = {}'.format(n_threads)
+        else:
+            self += """
+            _n_cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+            n_threads = max(1, _n_cores // %d)
+            """ % n_workers
+        self += "os.environ['OMP_NUM_THREADS'] = str(n_threads)"
+
+    def import_mc_modules(self,
+                          parallel_tempering=False,
+                          adaptive=False,
+                          mc_sampling_module='aiida_spirit_mc_sampling'):
+        """Import numpy, the spirit modules and the accumulators of the mc_sampling module."""
+        self += """
+        import numpy as np
+        from spirit import state
+        from spirit import system
+        from spirit import simulation
+        from spirit import configuration
+        from spirit import parameters
+        from spirit import hamiltonian
+        from spirit import quantities
+        from spirit import geometry
+        from spirit import constants
+        """
+        if parallel_tempering:
+            self += 'from spirit import chain'
+            self += 'from {} import MCAccumulator, ReplicaExchange'.format(
+                mc_sampling_module)
+        elif adaptive:
+            self += 'from {} import MCAccumulator, adapt_decorrelation'.format(
+                mc_sampling_module)
+        else:
+            self += 'from {} import MCAccumulator'.format(mc_sampling_module)
+
+    def mc_settings(self,
+                    mc_configuration,
+                    parallel_tempering=False,
+                    adaptive=False):
+        """Define the settings of the sampling, the temperature grid and the header of the MC output file."""
+        keys = [
+            'n_thermalisation', 'n_decorrelation', 'n_samples',
+            'n_temperatures', 'T_start', 'T_end'
+        ]
+        settings = {key: mc_configuration[key] for key in keys}
+        if parallel_tempering:
+            settings['exchange_interval'] = mc_configuration.get(
+                'exchange_interval', mc_configuration['n_decorrelation'])
+        if adaptive:
+            settings.update({
+                'target_energy_error':
+                mc_configuration.get('target_energy_error'),
+                'target_magnetization_error':
+                mc_configuration.get('target_magnetization_error'),
+                'min_samples':
+                mc_configuration.get('min_samples', 256),
+                'max_decorrelation':
+                mc_configuration.get('max_decorrelation', 100 *
+                                     mc_configuration['n_decorrelation']),
+            })
+        for key, value in settings.items():
+            self += '{:20} = {}'.format(key, value)
+
+        self += 'sample_temperatures     = np.linspace(T_start, T_end, n_temperatures)'
+
+        self += """
+        # columns: temperature, energy, magnetization, susceptibility, specific heat, Binder cumulant,
+        # standard errors of E and |M|, number of samples, effective number of samples and decorrelation steps
+        header = "sample_temperatures, energy_samples, magnetization_samples, susceptibility_samples, specific_heat_samples, binder_cumulant_samples"
+        header += ", energy_error, magnetization_error, n_samples, n_effective_samples, n_decorrelation"
+        """
+
+    def deadline(self, max_walltime):
+        """Define the `deadline` after which no new temperature (or sample of the replicas) is started."""
+        self += """
+        # no new temperature (or sample of the replicas) is started if it would not be finished before the job is killed
+        import time
+        deadline = time.monotonic() + %d
+        """ % max_walltime
+
+    def mc_output_file(self,
+                       output_file='output_mc.txt',
+                       n_columns=11,
+                       restart_file=None,
+                       n_workers=1):
+        """Start the MC output file and add the function that appends the result of a temperature to it.
+
+        Every finished temperature is written to the disk immediately such that the results are kept
+        if the job is killed. The temperatures in the `restart_file` (finished temperatures of a previous
+        run) are copied to the output file and are not sampled again.
+        """
+        self += 'import os'
+        if restart_file is not None:
+            self += """
+            # the temperatures of the previous run are not sampled again
+            finished = np.loadtxt('{}', ndmin=2)
+            sample_temperatures = np.array([T for T in sample_temperatures if not np.isclose(T, finished[:, 0]).any()])
+            """.format(restart_file)
+        else:
+            self += 'finished = np.zeros((0, {}))'.format(n_columns)
+        with self.block("with open('{}', 'w') as _f:".format(output_file)):
+            self += 'np.savetxt(_f, finished, header=header)'
+        if n_workers > 1:
+            self += """
+            # the workers append to the same file
+            import multiprocessing
+            output_lock = multiprocessing.get_context('fork').Lock()
+            """
+        with self.block('def write_result(T, result):'):
+            self += '"""Append the result of a temperature to the output file and flush it to the disk"""'
+            with self.block('with {}open(\'{}\', \'a\') as _f:'.format(
+                    'output_lock, ' if n_workers > 1 else '', output_file)):
+                self += """
+                np.savetxt(_f, [(T,) + tuple(result)])
+                _f.flush()
+                os.fsync(_f.fileno())
+                """
+
+    def temperature_sampling(self,
+                             n_workers=1,
+                             adaptive=False,
+                             deadline=False,
+                             atom_types_file='atom_types.txt',
+                             run_info_file=None):
+        """Sample the temperatures independently and write the results with `write_result`.
+
+        With more than one worker the temperature grid is split into contiguous blocks that are
+        sampled in forked worker processes, each with a state of its own. In the adaptive sampling
+        the decorrelation is adapted to the autocorrelation time of the first `min_samples` samples
+        and the sampling stops once the target errors are reached (or after n_samples samples).
+        With a `deadline` (see `deadline`) no temperature is started that would not be finished
+        before the deadline (estimated from the runtime of the previous temperature).
+        """
+        parallel = n_workers > 1
+        with self.block('def run_temperatures(temperatures, first=True):'):
+            self += '"""Sample the temperatures and append the results to the output file"""'
+            with self.state_block():
+                if not parallel:
+                    self.phase('state_setup')
+                with self.block('if first:'):
+                    self.write_atom_types(atom_types_file)
+                self += """
+                NOS = system.get_nos(p_state)
+
+                def sample(accumulator, n_decorr, n_new_samples):
+                    \"\"\"Sample at the current temperature with n_decorr MC iterations between the samples\"\"\"
+                    for n in range(n_new_samples):
+                        # Run decorrelation (all iterations in a single call of the API)
+                        simulation.n_shot(p_state, n_decorr)
+                        # Get energy per spin (the energy of the system is only updated by update_data)
+                        # and norm of the magnetization
+                        system.update_data(p_state)
+                        E_local = system.get_energy(p_state) / NOS
+                        M_local_tot = np.linalg.norm(quantities.get_magnetization(p_state))
+                        accumulator.add(E_local, M_local_tot)
+                """
+
+                # Loop over temperatures
+                if deadline:
+                    self += 't_temperature = 0'
+                with self.block('for T in temperatures:'):
+                    self._sample_temperature(adaptive, deadline)
+                if not parallel:
+                    self.phase('simulation')
+                if run_info_file is not None:
+                    with self.block('if first:'):
+                        self.write_run_info(run_info_file, 'MC')
+            if not parallel:
+                self.phase('state_teardown')
+
+        if parallel:
+            self += """
+            # sample contiguous blocks of the temperatures in worker processes (fork keeps the functions
+            # of this script available in the workers)
+            n_workers = %d
+            temperature_blocks = np.array_split(sample_temperatures, n_workers)
+            with multiprocessing.get_context('fork').Pool(n_workers) as pool:
+                pool.starmap(run_temperatures, [(block, iblock == 0) for iblock, block in enumerate(temperature_blocks)])
+            """ % n_workers
+            self.phase('simulation')
+        else:
+            self += 'run_temperatures(sample_temperatures)'
+
+    def _sample_temperature(self, adaptive=False, deadline=False):
+        """Thermalise and sample at the temperature T of the loop over the temperatures."""
+        if deadline:
+            with self.block('if time.monotonic() + t_temperature > deadline:'):
+                self += "print(f'Stopping before T={T} because the maximal walltime is reached')"
+                self += 'break'
+            self += 't_start = time.monotonic()'
+        self += 'parameters.mc.set_temperature(p_state, T)'
+        self.configuration('plus_z')
+        self += """
+        # Online accumulators of E, |M| and their moments
+        accumulator = MCAccumulator()
+        n_decorr = n_decorrelation
+
+        # Thermalisation and sampling are done in a single MC simulation
+        n_iterations = n_thermalisation + %s*n_samples
+        parameters.mc.set_iterations(p_state, n_iterations, n_iterations) # We want n_iterations iterations and only a single log message
+        simulation.start(p_state, simulation.METHOD_MC, single_shot=True) # Start a single-shot MC simulation
+
+        # Thermalisation
+        if n_thermalisation > 0:
+            simulation.n_shot(p_state, n_thermalisation)
+        """ % ('max_decorrelation' if adaptive else 'n_decorrelation')
+        if adaptive:
+            self += """
+            # adapt the decorrelation to the autocorrelation time of the first samples,
+            # the samples are discarded if the decorrelation changes
+            sample(accumulator, n_decorr, min(min_samples, n_samples))
+            n_decorr_adapted = adapt_decorrelation(n_decorr, accumulator.autocorrelation_time, max_decorrelation)
+            if n_decorr_adapted != n_decorr:
+                n_decorr = n_decorr_adapted
+                accumulator = MCAccumulator()
+
+            # sample until the target errors are reached
+            while accumulator.n_samples < n_samples:
+                if accumulator.n_samples >= min_samples and accumulator.converged(target_energy_error, target_magnetization_error):
+                    break
+                sample(accumulator, n_decorr, min(min_samples, n_samples - accumulator.n_samples))
+            """
+        else:
+            self += 'sample(accumulator, n_decorr, n_samples)'
+        self += """
+        # Make sure the MC simulation is not running anymore
+        simulation.stop(p_state)
+
+        # Calculate observables and their statistics and write them out immediately
+        write_result(T, accumulator.observables(T, constants.k_B) + accumulator.statistics() + (n_decorr,))
+        """
+        if deadline:
+            self += 't_temperature = time.monotonic() - t_start'
+
+    def replica_exchange(self,
+                         deadline=False,
+                         atom_types_file='atom_types.txt',
+                         run_info_file=None):
+        """Sample all temperatures at once with the parallel tempering.
+
+        Every temperature has a replica (an image of the chain of spirit) that is sampled with
+        MC and the configurations of neighbouring temperatures are swapped with the Metropolis
+        probability every `exchange_interval` iterations.
+        With a `deadline` (see `deadline`) the sampling stops before a sample that would not be
+        finished before the deadline (estimated from the runtime of the previous sample), the results
+        of the samples that were taken are written nevertheless.
+        """
+        with self.state_block():
+            self.phase('state_setup')
+            self.write_atom_types(atom_types_file)
+            self += """
+            NOS = system.get_nos(p_state)
+
+            # one replica (image) per temperature
+            n_replicas = len(sample_temperatures)
+            chain.image_to_clipboard(p_state)
+            for _ in range(n_replicas - 1):
+                chain.insert_image_after(p_state)
+
+            n_iterations = n_thermalisation + n_decorrelation*n_samples
+            for i, T in enumerate(sample_temperatures):
+                parameters.mc.set_temperature(p_state, T, idx_image=i)
+                configuration.plus_z(p_state, idx_image=i)
+                parameters.mc.set_iterations(p_state, n_iterations, n_iterations, idx_image=i)
+                simulation.start(p_state, simulation.METHOD_MC, single_shot=True, idx_image=i)
+            """
+            self.phase('configuration')
+            self._add_replica_functions()
+            self += """
+            # Thermalisation (with exchanges)
+            run_replicas(n_thermalisation)
+            """
+            self._sample_replicas(deadline)
+            self += """
+            # Make sure the MC simulations are not running anymore
+            for i in range(n_replicas):
+                simulation.stop(p_state, idx_image=i)
+
+            # Calculate observables
+            observables = [acc.observables(T, constants.k_B) + acc.statistics() + (n_decorrelation,)
+                           for acc, T in zip(accumulators, sample_temperatures)]
+            exchange_acceptance = exchange.acceptance_rates + [np.nan]
+            """
+            self.phase('simulation')
+            if run_info_file is not None:
+                self.write_run_info(run_info_file, 'MC')
+        self.phase('state_teardown')
+
+    def _add_replica_functions(self):
+        """Define the accumulators of the replicas and the functions that run them with exchange attempts."""
+        self += """
+        accumulators = [MCAccumulator() for _ in sample_temperatures]
+        exchange = ReplicaExchange(sample_temperatures, constants.k_B)
+        n_since_exchange = 0
+
+        def get_energies():
+            \"\"\"Total energies of all replicas (the energy is only updated by update_data)\"\"\"
+            energies = []
+            for i in range(n_replicas):
+                system.update_data(p_state, idx_image=i)
+                energies.append(system.get_energy(p_state, idx_image=i))
+            return energies
+
+        def run_replicas(n_iter):
+            \"\"\"Run n_iter MC iterations of all replicas with exchange attempts every exchange_interval iterations\"\"\"
+            global n_since_exchange
+            while n_iter > 0:
+                n_shot = min(n_iter, exchange_interval - n_since_exchange)
+                for i in range(n_replicas):
+                    simulation.n_shot(p_state, n_shot, idx_image=i)
+                n_iter -= n_shot
+                n_since_exchange += n_shot
+                if n_since_exchange == exchange_interval:
+                    n_since_exchange = 0
+                    for i, j in exchange.propose(get_energies()):
+                        # swap the spin directions in place (the arrays are views of the spirit memory)
+                        spins_i = system.get_spin_directions(p_state, idx_image=i)
+                        spins_j = system.get_spin_directions(p_state, idx_image=j)
+                        spins_i[:], spins_j[:] = spins_j.copy(), spins_i.copy()
+        """
+
+    def _sample_replicas(self, deadline=False):
+        """Take n_samples samples of all replicas (fewer if the `deadline` is reached)."""
+        self += '# Sampling of all replicas'
+        if deadline:
+            self += 't_sample = 0'
+        with self.block('for n in range(n_samples):'):
+            if deadline:
+                # at least one sample is taken such that all temperatures have results
+                with self.block(
+                        'if n > 0 and time.monotonic() + t_sample > deadline:'
+                ):
+                    self += "print(f'Stopping after {n} samples because the maximal walltime is reached')"
+                    self += 'break'
+                self += 't_start = time.monotonic()'
+            self += """
+            run_replicas(n_decorrelation)
+            energies = get_energies()
+            for i in range(n_replicas):
+                M_local_tot = np.linalg.norm(quantities.get_magnetization(p_state, idx_image=i))
+                accumulators[i].add(energies[i] / NOS, M_local_tot)
+            """
+            if deadline:
+                self += 't_sample = time.monotonic() - t_start'
+
+    def write_mc_output(self,
+                        output_file='output_mc.txt',
+                        parallel_tempering=False):
+        """Write the final MC output file with the rows sorted by the temperature."""
+        if parallel_tempering:
+            self += """
+            # acceptance rate of the swaps with the replica at the next temperature
+            output_mc = np.column_stack([sample_temperatures, observables, exchange_acceptance])
+            header += ", exchange_acceptance"
+            np.savetxt('%s', output_mc, header=header)
+            """ % output_file
+        else:
+            self += """
+            # sort the rows of the finished temperatures (the workers append them in the order in which they finish)
+            output_mc = np.loadtxt('%s', ndmin=2)
+            output_mc = output_mc[np.argsort(output_mc[:, 0], kind='stable')]
+            np.savetxt('%s', output_mc, header=header)
+            """ % (output_file, output_file)
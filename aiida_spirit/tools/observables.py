@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Observables that are derived from a spin configuration.
+
+All functions work on the (N, 3) array of spin directions in the order that spirit
+uses (the basis atoms run fastest, then the translations along a, b and c) and only
+need numpy, such that they can also be used on the compute node.
+"""
+
+import numpy as np
+
+
+def get_magnetization(spins, mask=None):
+    """Average magnetization of the spins.
+
+    :param spins: (N, 3) array of spin directions
+    :param mask: boolean array which is True for the spins that are used (all spins if None)
+    :returns: average magnetization vector
+    """
+    if mask is not None:
+        spins = spins[mask]
+    if len(spins) == 0:
+        return np.zeros(3)
+    return spins.mean(axis=0)
+
+
+def get_sublattice_magnetizations(spins, n_basis_atoms, mask=None):
+    """Average magnetization of each sublattice (i.e. for each atom of the basis cell).
+
+    :param spins: (N, 3) array of spin directions
+    :param n_basis_atoms: number of atoms in the basis cell
+    :param mask: boolean array which is True for the spins that are used (all spins if None)
+    :returns: (n_basis_atoms, 3) array of the average magnetization vectors
+    """
+    spins = spins.reshape(-1, n_basis_atoms, 3)
+    if mask is None:
+        return spins.mean(axis=0)
+    mask = mask.reshape(-1, n_basis_atoms)
+    counts = np.maximum(mask.sum(axis=0), 1)
+    return (spins * mask[:, :, np.newaxis]).sum(axis=0) / counts[:, np.newaxis]
+
+
+def get_atom_type_magnetizations(spins, atom_types):
+    """Average magnetization for each atom type (negative atom types are vacancies and are skipped).
+
+    :param spins: (N, 3) array of spin directions
+    :param atom_types: array with the atom type of every spin
+    :returns: dict of atom type -> average magnetization vector
+    """
+    atom_types = np.asarray(atom_types).astype(int)
+    return {
+        int(itype): spins[atom_types == itype].mean(axis=0)
+        for itype in np.unique(atom_types) if itype >= 0
+    }
+
+
+def _solid_angles(n1, n2, n3):
+    """Signed solid angles spanned by the unit vectors of the corners of triangles (Berg and Luescher)."""
+    triple = np.einsum('ij,ij->i', n1, np.cross(n2, n3))
+    denom = 1. + np.einsum('ij,ij->i', n1, n2) + np.einsum(
+        'ij,ij->i', n2, n3) + np.einsum('ij,ij->i', n3, n1)
+    return 2. * np.arctan2(triple, denom)
+
+
+def _plaquette_corners(grid, pbc):
+    """Spins at the corners (00, 10, 11, 01) of the plaquettes of a (nb, na, 3) grid of spins.
+    The plaquettes across the boundary are included for periodic systems."""
+    nb, na = grid.shape[:2]
+    ia = np.arange(na if pbc[0] else na - 1)
+    ib = np.arange(nb if pbc[1] else nb - 1)
+    ia1, ib1 = (ia + 1) % na, (ib + 1) % nb
+    corners = [(ib, ia), (ib, ia1), (ib1, ia1), (ib1, ia)]
+    return [
+        grid[np.ix_(rows, columns)].reshape(-1, 3) for rows, columns in corners
+    ]
+
+
+def get_topological_charge(spins,
+                           n_basis_cells,
+                           cell,
+                           pbc=(False, False, False)):
+    """Topological charge of a 2D spin configuration on a lattice with a single atom basis.
+
+    Each plaquette of the lattice is split into two triangles and the solid angles of the
+    spins at the corners of the triangles are summed up (Berg and Luescher).
+
+    :param spins: (N, 3) array of spin directions (N = na * nb)
+    :param n_basis_cells: number of basis cells (na, nb, 1)
+    :param cell: Bravais vectors (the orientation of a and b defines the sign of the charge)
+    :param pbc: periodic boundary conditions in the directions of a and b
+    :returns: topological charge (None if the system is not 2D)
+    """
+    na, nb, nc = n_basis_cells
+    if nc != 1 or na < 2 or nb < 2 or len(spins) != na * nb:
+        return None
+    s00, s10, s11, s01 = _plaquette_corners(spins.reshape(nb, na, 3), pbc)
+
+    charge = (_solid_angles(s00, s10, s11).sum() +
+              _solid_angles(s00, s11, s01).sum()) / (4 * np.pi)
+
+    # the triangles are counter-clockwise if a x b points in +z direction
+    cell = np.asarray(cell)
+    if np.cross(cell[0], cell[1])[2] < 0:
+        charge *= -1
+    return charge
+
+
+def get_observables(spins, lattice_info, atom_types=None):
+    """Collect the observables of a spin configuration in a json serializable dict.
+
+    :param spins: (N, 3) array of spin directions (defects have zero length)
+    :param lattice_info: dict with the number of basis cells in the directions of the three lattice vectors
+        (n_basis_cells), the number of atoms in the basis cell (n_basis_atoms), the Bravais vectors (cell)
+        and the periodic boundary conditions (pbc)
+    :param atom_types: array with the atom type of every spin (negative values are vacancies)
+    :returns: dict with the observables
+    """
+    if atom_types is not None:
+        atom_types = np.atleast_1d(atom_types)
+    if atom_types is not None and len(atom_types) == len(spins):
+        mask = atom_types >= 0
+    else:
+        atom_types = None
+        mask = (np.abs(spins) > 0).any(axis=1)
+
+    n_basis_atoms = lattice_info['n_basis_atoms']
+    magnetization = get_magnetization(spins)
+    masked = get_magnetization(spins, mask)
+    observables = {
+        'magnetization': magnetization.tolist(),
+        'magnetization_abs': float(np.linalg.norm(magnetization)),
+        'magnetization_masked': masked.tolist(),
+        'magnetization_masked_abs': float(np.linalg.norm(masked)),
+        'n_defects': int((~mask).sum()),
+    }
+    if n_basis_atoms > 1 and len(spins) % n_basis_atoms == 0:
+        observables[
+            'magnetization_sublattices'] = get_sublattice_magnetizations(
+                spins, n_basis_atoms, mask).tolist()
+    if atom_types is not None:
+        observables['magnetization_atom_types'] = {
+            str(itype): magn.tolist()
+            for itype, magn in get_atom_type_magnetizations(
+                spins, atom_types).items()
+        }
+    if n_basis_atoms == 1:
+        charge = get_topological_charge(
+            spins, lattice_info['n_basis_cells'], lattice_info['cell'],
+            lattice_info.get('pbc', (False, False, False)))
+        if charge is not None:
+            observables['topological_charge'] = float(charge)
+    return observables
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Reading and writing of spin configurations in the OVF 2.0 format that spirit uses.
+
+Besides the text format, spirit understands the binary variants of OVF where the data
+segment contains the raw little-endian floats (`Binary 4` or `Binary 8`). The binary
+files are about 3 times smaller and can be read without parsing any text.
+
+The reader uses the header (`valuedim`, `xnodes`, ...) to preallocate the output array,
+text data segments are then parsed in blocks of complete lines (`iter_text_blocks`) which
+keeps the temporary memory small.
+"""
+
+import numpy as np
+from .writers import format_rows
+
+# run_options value -> spirit filetype of the configuration output (see `spirit.io.FILEFORMAT_OVF_*`)
+OVF_FILETYPES = {'text': 3, 'binary': 0, 'binary4': 1, 'binary8': 2}
+
+# data type and check value of the binary data segments (defined in the OVF 2.0 specification)
+_BINARY_DTYPES = {4: np.dtype('<f4'), 8: np.dtype('<f8')}
+_CHECK_VALUES = {4: 1234567.0, 8: 123456789012345.0}
+
+# number of bytes of a text data segment that are parsed at once
+CHUNK_SIZE = 2**20
+
+
+def _header_lines(nvectors, title='aiida-spirit'):
+    """Return the header of a single segment OVF file with `nvectors` 3D vectors."""
+    return [
+        '# OOMMF OVF 2.0',
+        '# Segment count: 1',
+        '# Begin: Segment',
+        '# Begin: Header',
+        f'# Title: {title}',
+        '# valuedim: 3',
+        '# valueunits: none none none',
+        '# valuelabels: spin_x spin_y spin_z',
+        '# meshunit: unspecified',
+        '# xmin: 0',
+        '# ymin: 0',
+        '# zmin: 0',
+        f'# xmax: {nvectors}',
+        '# ymax: 1',
+        '# zmax: 1',
+        '# meshtype: rectangular',
+        '# xbase: 0',
+        '# ybase: 0',
+        '# zbase: 0',
+        '# xstepsize: 1',
+        '# ystepsize: 1',
+        '# zstepsize: 1',
+        f'# xnodes: {nvectors}',
+        '# ynodes: 1',
+        '# znodes: 1',
+        '# End: Header',
+    ]
+
+
+def write_ovf(handle, chunks, nvectors, ovf_format='binary8'):
+    """Write an array of 3D vectors to an OVF file.
+
+    :param handle: binary file handle to which the file is written
+    :param chunks: iterable over chunks of the (nvectors, 3) array
+    :param nvectors: total number of vectors (needed for the header)
+    :param ovf_format: 'text', 'binary4' or 'binary8' ('binary' is the same as 'binary8')
+    :returns: number of vectors that were written
+    """
+    if ovf_format == 'text':
+        data_name, nbytes = 'Text', None
+    elif ovf_format in ['binary', 'binary8']:
+        data_name, nbytes = 'Binary 8', 8
+    elif ovf_format == 'binary4':
+        data_name, nbytes = 'Binary 4', 4
+    else:
+        raise ValueError(f'Unknown OVF format: {ovf_format}')
+
+    header = _header_lines(nvectors) + [f'# Begin: Data {data_name}']
+    handle.write(('\n'.join(header) + '\n').encode())
+    if data_name != 'Text':
+        handle.write(
+            np.array([_CHECK_VALUES[nbytes]],
+                     dtype=_BINARY_DTYPES[nbytes]).tobytes())
+
+    nwritten = 0
+    for vectors in chunks:
+        vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+        if data_name == 'Text':
+            handle.write(format_rows(vectors, '%r %r %r\n').encode())
+        else:
+            handle.write(vectors.astype(_BINARY_DTYPES[nbytes]).tobytes())
+        nwritten += len(vectors)
+    if nwritten != nvectors:
+        raise ValueError(f'Expected {nvectors} vectors but got {nwritten}')
+
+    if data_name != 'Text':
+        handle.write(b'\n')
+    handle.write(f'# End: Data {data_name}\n# End: Segment\n'.encode())
+    return nwritten
+
+
+def read_ovf_header(handle):
+    """Read the header of an OVF file up to the beginning of the data segment.
+
+    :param handle: binary file handle pointing to the beginning of the OVF file
+    :returns: dict with the header entries (keys in lower case) and the data format in 'data'
+    """
+    header = {}
+    for line in handle:
+        line = line.decode('latin-1').strip()
+        if not line.startswith('#') or line.startswith('##'):
+            continue
+        key, _, value = line[1:].partition(':')
+        key = key.strip().lower()
+        if key == 'begin' and value.strip().lower().startswith('data'):
+            header['data'] = value.strip()[len('data'):].strip().lower()
+            return header
+        if key not in ['begin', 'end']:
+            header[key] = value.split('##')[0].strip()
+    raise ValueError('No data segment found in the OVF file')
+
+
+def iter_text_blocks(handle, chunk_size=CHUNK_SIZE):
+    """Read a binary file handle in blocks of complete lines.
+
+    :param handle: binary file handle
+    :param chunk_size: number of bytes that are read at once (the last incomplete line is prepended to the next block)
+    :returns: generator over the blocks (bytes that end with a newline, except for the end of the file)
+    """
+    rest = b''
+    while True:
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            if rest:
+                yield rest
+            return
+        block = rest + chunk
+        iend = block.rfind(b'\n') + 1
+        block, rest = block[:iend], block[iend:]
+        if block:
+            yield block
+
+
+def _read_text_data(handle, nvalues, chunk_size=CHUNK_SIZE):
+    """Read `nvalues` whitespace separated numbers from a text data segment into a preallocated array."""
+    data = np.empty(nvalues, dtype=np.float64)
+    filled = 0
+    if nvalues > 0:
+        for block in iter_text_blocks(handle, chunk_size):
+            # only the numbers before the comment that ends the data segment are parsed
+            icomment = block.find(b'#')
+            values = np.array(
+                (block if icomment < 0 else block[:icomment]).split(),
+                dtype=np.float64)
+            nnew = min(len(values), nvalues - filled)
+            data[filled:filled + nnew] = values[:nnew]
+            filled += nnew
+            if filled == nvalues or icomment >= 0:
+                break
+    if filled < nvalues:
+        raise ValueError(
+            f'Could not read {nvalues} values from the OVF data segment')
+    return data
+
+
+def read_ovf(handle, chunk_size=CHUNK_SIZE):
+    """Read the vectors of the first segment of an OVF file.
+
+    Binary data segments are read with `np.frombuffer` directly from the file content.
+    Text data segments are parsed in chunks of `chunk_size` bytes into a preallocated array.
+
+    :param handle: binary file handle pointing to the beginning of the OVF file
+    :param chunk_size: number of bytes of a text data segment that are parsed at once
+    :returns: array of shape (nvectors, valuedim)
+    """
+    header = read_ovf_header(handle)
+    valuedim = int(header.get('valuedim', 3))
+    nvalues = valuedim
+    for key in ['xnodes', 'ynodes', 'znodes']:
+        nvalues *= int(header.get(key, 1))
+
+    data_format = header['data']
+    if data_format.startswith('binary'):
+        nbytes = int(data_format.split()[-1])
+        dtype = _BINARY_DTYPES[nbytes]
+        check = np.frombuffer(handle.read(nbytes), dtype=dtype)
+        if len(check) != 1 or check[0] != _CHECK_VALUES[nbytes]:
+            raise ValueError(
+                'Wrong check value in the binary OVF data segment')
+        buffer = handle.read(nvalues * nbytes)
+        if len(buffer) != nvalues * nbytes:
+            raise ValueError(
+                'Unexpected end of file while reading the OVF data segment')
+        data = np.frombuffer(buffer, dtype=dtype)
+    elif data_format == 'text':
+        data = _read_text_data(handle, nvalues, chunk_size)
+    else:
+        raise ValueError(f'Unsupported OVF data format: {data_format}')
+
+    return data.reshape(-1, valuedim)
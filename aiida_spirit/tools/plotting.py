@@ -5,7 +5,7 @@ Plotting tools for aiida-spirit.
 
 import numpy as np
 from ._vfr import setup, update
-from .get_from_remote import list_remote_files, get_file_content_from_remote
+from .get_from_remote import list_remote_files, get_spins_from_remote
 
 
 def init_spinview(vfr_frame_id='', height_px=600, width_percent=100):
@@ -123,9 +123,12 @@ def show_spins(  # pylint: disable=inconsistent-return-statements,too-many-argum
         )
         return
 
-    m = spirit_calc.outputs.magnetization
-    minit = m.get_array('initial')
-    mfinal = m.get_array('final')
+    mag_node = spirit_calc.outputs.magnetization
+    minit = mag_node.get_array('initial')
+    mfinal = mag_node.get_array('final')
+    if getattr(mag_node, 'n_basis_cells', None) is not None:
+        # SpinConfigurationData knows the size of the spirit system
+        n_basis_cells = mag_node.n_basis_cells
     if show_final_structure:
         m = mfinal
     else:
@@ -145,6 +148,9 @@ def show_spins(  # pylint: disable=inconsistent-return-statements,too-many-argum
             # hide defects
             atom_types = spirit_calc.outputs.atom_types.get_array('atom_types')
             m[atom_types < 0] = 0
+        elif hasattr(mag_node, 'get_defect_mask'):
+            # SpinConfigurationData stores the defects
+            m[mag_node.get_defect_mask()] = 0
         else:
             # fallback if atom_types are not there
             # these are the positions where the initial and final spins are the same (hide those if we have defects)
@@ -172,8 +178,7 @@ def show_spins(  # pylint: disable=inconsistent-return-statements,too-many-argum
         #image_id = all_image_ids[use_remote_spins_id]
         fname = spin_images[
             use_remote_spins_id]  #'spirit_Image-00_Spins_'+str(image_id)+'.ovf'
-        txt = get_file_content_from_remote(spirit_calc, fname)
-        m = np.loadtxt(txt)
+        m = get_spins_from_remote(spirit_calc, fname)
         print(f'loaded spin configuration from {fname}')
 
     # consistency check for magnetization and positions
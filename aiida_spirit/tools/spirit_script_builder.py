@@ -2,6 +2,7 @@
 """
 Helper class for builder run_spirit script.
 """
+import posixpath
 
 
 class PythonScriptBuilder():
@@ -75,6 +76,29 @@ class PythonScriptBuilder():
 
 class SpiritScriptBuilder(PythonScriptBuilder):
     """Helper class to build pyton scripts for the spirit api"""
+    def __init__(self, indentation='', profile_phases=False):
+        """If `profile_phases` is True the `phase` probes record the wall-clock time and the
+        peak memory of the phases of the script which are written with `write_timings`."""
+        super().__init__(indentation)
+        self.profile_phases = profile_phases
+        if profile_phases:
+            self += """
+            # probes for the wall-clock time and the peak memory (resident set size) of the phases of the run
+            import json
+            import resource
+            import sys
+            import time
+            _timings = {}
+            _t_phase = time.perf_counter()
+            def _phase(name):
+                global _t_phase
+                _t_now = time.perf_counter()
+                # ru_maxrss is given in kilobytes on Linux and in bytes on macOS
+                _rss_unit = 1024**2 if sys.platform == 'darwin' else 1024
+                _timings[name] = {'wall_time': _t_now - _t_phase,
+                                  'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / _rss_unit}
+                _t_phase = time.perf_counter()
+            """
 
     _method_dict = {
         'llg': 'simulation.METHOD_LLG',
@@ -133,11 +157,20 @@ class SpiritScriptBuilder(PythonScriptBuilder):
         """Format a list as a string of positional arguments"""
         return ''.join([', {}'.format(l) for l in list])
 
-    def _spirit_call(self, module, function_name, *args, **kwargs):
-        """A generic call to any of the spirit api functions."""
-        self += '{}.{}(p_state{}{})'.format(module, function_name,
-                                            self.list_to_arg_string(args),
-                                            self._dict_to_arg_string(kwargs))
+    def _spirit_call(self,
+                     module,
+                     function_name,
+                     *args,
+                     assign_to=None,
+                     **kwargs):
+        """A generic call to any of the spirit api functions.
+        The return value is assigned to the variable `assign_to` if it is given."""
+        call = '{}.{}(p_state{}{})'.format(module, function_name,
+                                           self.list_to_arg_string(args),
+                                           self._dict_to_arg_string(kwargs))
+        if assign_to is not None:
+            call = '{} = {}'.format(assign_to, call)
+        self += call
 
     def import_modules(self, *args):
         """Imports the modules given in `*args`. If no `*args` are given, imports all modules in the `module` dict"""
@@ -153,12 +186,238 @@ class SpiritScriptBuilder(PythonScriptBuilder):
         return self.block(
             "with state.State(\"{}\") as p_state:".format(input_file))
 
+    def write_atom_types(self, atom_types_file='atom_types.txt'):
+        """Write out the atom_types (needed for parsing defects)."""
+        self += 'atom_types = geometry.get_atom_types(p_state)'
+        with self.block("with open('{}', 'w') as _f:".format(atom_types_file)):
+            self += "_f.writelines([f'{i}\\n' for i in atom_types])"
+
     def configuration(self, fname, *args, **kwargs):
         """Sets one of the configuration api functions on of p_state"""
         self._spirit_call(self.module('configuration'), fname, *args, **kwargs)
 
-    def start_simulation(self, method, solver, *args, **kwargs):
-        """Start a simulation with a method and a solver."""
-        self._spirit_call(self.module('simulation'), 'start',
-                          self.method(method), self.solver(solver), *args,
+    def start_simulation(self, method, solver, *args, run_info=None, **kwargs):
+        """Start a simulation with a method and a solver.
+        The returned `simulation_run_info` is stored in the variable `run_info` if it is given."""
+        self._spirit_call(self.module('simulation'),
+                          'start',
+                          self.method(method),
+                          self.solver(solver),
+                          *args,
+                          assign_to=run_info,
                           **kwargs)
+
+    def expand_couplings(self,
+                         archive='couplings.npz',
+                         couplings_file='couplings.txt',
+                         rcut=None,
+                         writers_module='aiida_spirit_writers'):
+        """Write the couplings file from the compressed binary archive that was uploaded."""
+        self += '# convert the uploaded couplings archive to the couplings file that spirit reads'
+        self += 'import zipfile'
+        self += 'from {} import iter_npy_chunks, write_couplings'.format(
+            writers_module)
+        with self.block(
+                "with zipfile.ZipFile('{}') as _zf, open('{}', 'w') as _f:".
+                format(archive, couplings_file)):
+            if rcut is None:
+                self += "write_couplings(_f, iter_npy_chunks(_zf.open('Jij_expanded.npy')))"
+            else:
+                self += (
+                    "write_couplings(_f, iter_npy_chunks(_zf.open('Jij_expanded.npy')), "
+                    "iter_npy_chunks(_zf.open('positions_expanded.npy')), rcut={})"
+                    .format(rcut))
+
+    def link_shared_file(self, filename, shared_path, uploaded=True):
+        """Keep a file in a shared folder on the remote computer and symlink it into the working directory.
+
+        If the file was `uploaded` with this calculation it is copied to a unique temporary name in the
+        shared folder and renamed from there (the rename is atomic, such that concurrent calculations cannot
+        clash). Otherwise it was linked by AiiDA and the script only checks that the shared file still exists.
+        """
+        self += '# the couplings file is kept in the shared folder such that later calculations only link it'
+        self += 'import os'
+        if uploaded:
+            self += 'import shutil'
+            self += 'import uuid'
+            with self.block(
+                    "if not os.path.exists('{}'):".format(shared_path)):
+                self += "os.makedirs('{}', exist_ok=True)".format(
+                    posixpath.dirname(shared_path))
+                self += "_tmp_path = '{}.' + uuid.uuid4().hex + '.tmp'".format(
+                    shared_path)
+                self += "shutil.copyfile('{}', _tmp_path)".format(filename)
+                self += "os.replace(_tmp_path, '{}')".format(shared_path)
+            self += "os.remove('{}')".format(filename)
+            self += "os.symlink('{}', '{}')".format(shared_path, filename)
+        with self.block("if not os.path.exists('{}'):".format(filename)):
+            self += "raise FileNotFoundError('The shared file {} does not exist')".format(
+                shared_path)
+
+    def write_summary(self,
+                      summary_file='summary.json',
+                      observables_module='aiida_spirit_observables',
+                      **lattice_info):
+        """Compute the observables of the final spin configuration and write them to a json file.
+
+        The `lattice_info` (n_basis_cells, n_basis_atoms, cell, pbc) is passed to `get_observables`
+        of the copy of the observables module that is put next to run_spirit.py.
+        Needs the `atom_types` that are written at the beginning of the script.
+        """
+        self += '# compute the observables on the compute node instead of retrieving the spin configurations'
+        self += 'import json'
+        self += 'import numpy as np'
+        self += 'from spirit import system'
+        self += 'from {} import get_observables'.format(observables_module)
+        self += 'spins = np.nan_to_num(np.array(system.get_spin_directions(p_state)))'
+        self += 'summary = get_observables(spins, {}, atom_types=np.array(atom_types))'.format(
+            lattice_info)
+        self += 'summary["energy_per_spin"] = system.get_energy(p_state) / system.get_nos(p_state)'
+        with self.block("with open('{}', 'w') as _f:".format(summary_file)):
+            self += 'json.dump(summary, _f)'
+
+    def compress_files(self,
+                       filenames,
+                       compression='gzip',
+                       compression_module='aiida_spirit_compression'):
+        """Compress the output files (that exist) with the copy of the compression module next to run_spirit.py."""
+        self += '# compress the output files before they are retrieved'
+        self += 'import os'
+        self += 'from {} import compress_file'.format(compression_module)
+        with self.block('for _fname in {!r}:'.format(list(filenames))):
+            with self.block('if os.path.exists(_fname):'):
+                self += "compress_file(_fname, '{}')".format(compression)
+
+    def restart_from(self,
+                     parent_folder='parent_calc',
+                     restart_info_file='restart_info.json',
+                     checkpoints_module='aiida_spirit_checkpoints'):
+        """Read the spin configuration with the largest iteration of the parent calculation and
+        run only the remaining LLG iterations.
+
+        The spin configurations of the parent calculation are linked into `parent_folder`. The file and the
+        iteration from which the run is continued are written to `restart_info_file`.
+        """
+        self += '# continue from the last spin configuration of the parent calculation'
+        self += 'from spirit import parameters'
+        self += 'from {} import find_restart_file, write_restart_info'.format(
+            checkpoints_module)
+        self += "restart_file, restart_iteration = find_restart_file('{}', '{}')".format(
+            parent_folder, restart_info_file)
+        with self.block('if restart_file is None:'):
+            self += "raise FileNotFoundError('No complete spin configuration found in the parent folder')"
+        self += 'io.image_read(p_state, restart_file)'
+        self += "write_restart_info('{}', restart_file, restart_iteration)".format(
+            restart_info_file)
+        self += 'n_iterations, n_iterations_log = parameters.llg.get_iterations(p_state)'
+        self += '# spirit fails to write the output files for zero iterations'
+        self += 'parameters.llg.set_iterations(p_state, max(n_iterations - restart_iteration, 1), n_iterations_log)'
+
+    def periodic_checkpoints(self,
+                             checkpoint_file,
+                             interval,
+                             fileformat=3,
+                             checkpoints_module='aiida_spirit_checkpoints'):
+        """Start a block in which the spin configuration is written to `checkpoint_file` every `interval` seconds.
+
+        The checkpoints are written by a background thread while the simulation that is started inside
+        the block runs, the iteration of the LLG run is written to the header of the OVF file.
+        e.g::
+
+            with script.periodic_checkpoints('checkpoint.ovf', 600):
+                script.start_simulation('LLG', 'Depondt')
+        """
+        self += '# write checkpoints of the spin configuration while the simulation runs'
+        self += 'from spirit import parameters'
+        self += 'from {} import PeriodicCheckpoint'.format(checkpoints_module)
+        with self.block('def write_checkpoint(filename):'):
+            with self.block('if not simulation.running_on_image(p_state):'):
+                self += 'return False'
+            self += '# the simulated time advances by one time step per iteration'
+            self += 'iteration = round(simulation.get_time(p_state) / parameters.llg.get_timestep(p_state))'
+            self += "io.image_write(p_state, filename, {}, f'Iteration: {{iteration}}')".format(
+                fileformat)
+            self += 'return True'
+        return self.block(
+            "with PeriodicCheckpoint(write_checkpoint, '{}', {}):".format(
+                checkpoint_file, interval))
+
+    def phase(self, name):
+        """Record the time since the previous probe as phase `name` (only if `profile_phases` is set)."""
+        if self.profile_phases:
+            self += "_phase('{}')".format(name)
+
+    def write_timings(self, timings_file='timings.json'):
+        """Write the recorded phase timings to a json file (only if `profile_phases` is set)."""
+        if self.profile_phases:
+            with self.block(
+                    "with open('{}', 'w') as _f:".format(timings_file)):
+                self += 'json.dump(_timings, _f)'
+
+    def write_run_info(self,
+                       run_info_file='run_info.json',
+                       method='LLG',
+                       solver=None,
+                       run_info=None,
+                       max_walltime=None):
+        """Write a machine readable summary of the run (version and feature flags of spirit,
+        number of errors and warnings, iterations, runtime and final energy) to a json file.
+
+        :param run_info_file: name of the json file
+        :param method: simulation method (LLG or MC)
+        :param solver: solver of the simulation (None for MC)
+        :param run_info: name of the variable that holds the `simulation_run_info` returned by `simulation.start`
+        :param max_walltime: maximal walltime of the LLG simulation in seconds (used for the termination reason)
+        """
+        self += '# machine readable summary of the run that is used instead of the log messages in the stdout'
+        # the imports are local to a function such that they do not shadow variables of the script
+        with self.block('def _write_run_info(p_state):'):
+            self += 'import json'
+            self += 'from spirit import log, parameters, system, version'
+            self += """
+            _run_info = {
+                'spirit_version': {key: getattr(version, key) for key in
+                                   ['version', 'revision', 'openmp', 'cuda', 'threads', 'defects', 'pinning', 'scalartype']},
+                'simulation_mode': '%s',
+                'num_errors': log.get_n_errors(p_state),
+                'num_warnings': log.get_n_warnings(p_state),
+                'energy': system.get_energy(p_state),
+                'energy_per_spin': system.get_energy(p_state) / system.get_nos(p_state),
+            }
+            """ % method.upper()
+            if solver is not None:
+                self += "_run_info['solver'] = '{}'".format(solver)
+            if run_info is not None:
+                self += """
+                _run_info.update({
+                    'n_iterations': %(info)s.total_iterations,
+                    'runtime_ms': %(info)s.total_walltime,
+                    'it_per_s': %(info)s.total_ips,
+                    'max_torque': %(info)s.max_torque,
+                })
+                """ % {
+                    'info': run_info
+                }
+                if method.upper() == 'LLG':
+                    self += (
+                        "_run_info['simulation_time'] = "
+                        '{}.total_iterations * parameters.llg.get_timestep(p_state)'
+                        .format(run_info))
+                    # same reasons as in the log of spirit (which has no reason if all iterations are done)
+                    reasons = [(
+                        '{}.max_torque < parameters.llg.get_convergence(p_state)'
+                        .format(run_info), 'The force converged')]
+                    if max_walltime is not None:
+                        reasons.insert(
+                            0, ('{}.total_walltime >= {}'.format(
+                                run_info, 1000 * max_walltime),
+                                'The maximum walltime has been reached'))
+                    for i, (condition, reason) in enumerate(reasons):
+                        with self.block('{} {}:'.format(
+                                'elif' if i > 0 else 'if', condition)):
+                            self += "_run_info['termination_reason'] = '{}'".format(
+                                reason)
+            with self.block(
+                    "with open('{}', 'w') as _f:".format(run_info_file)):
+                self += 'json.dump(_run_info, _f)'
+        self += '_write_run_info(p_state)'
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Stationarity test of the observables of a finite-temperature LLG run in run_spirit.py.
+
+With a temperature the torque of an LLG run fluctuates and the force convergence is never
+reached. Instead the run is advanced in chunks of iterations and the energy and the
+magnetization are sampled after every chunk. The run is stationary once the means of the
+samples over two adjacent sliding windows agree within their standard errors. The module only
+uses the standard library such that a copy of it can be used in run_spirit.py on the compute node.
+"""
+
+import collections
+import math
+
+
+class StationarityTest:
+    """Compare the means of the last two sliding windows of samples of one or more observables.
+
+    The samples are stationary if for every observable the means of the last `window` samples and
+    of the `window` samples before agree within `n_sigma` standard errors of their difference, i.e.
+    ``|mean1 - mean2| <= n_sigma * sqrt(error1**2 + error2**2)``. The means and the standard errors
+    of the windows are computed with `error_analysis` (e.g. the `BinningAnalysis` of the mc_sampling
+    module), such that the test does not depend on the scale of the observables and also works for
+    observables that fluctuate around zero.
+    """
+    def __init__(self, error_analysis, window=10, n_sigma=2.):
+        """
+        :param error_analysis: class of an accumulator with `add(value)` and the properties `mean` and `error`
+        :param window: number of samples in each of the two windows
+        :param n_sigma: number of standard errors within which the means of the two windows have to agree
+        """
+        self.error_analysis = error_analysis
+        self.window = window
+        self.n_sigma = n_sigma
+        self._samples = collections.deque(maxlen=2 * window)
+
+    def add(self, *values):
+        """Add a sample of the observables (e.g. the energy per spin and the norm of the magnetization)."""
+        self._samples.append(values)
+
+    def _analyse_windows(self):
+        """Return the error analyses of every observable over the previous and the last window (None if there
+        are less than 2*window samples)."""
+        if len(self._samples) < 2 * self.window:
+            return None
+        samples = list(self._samples)
+        windows = []
+        for window_samples in [samples[:self.window], samples[self.window:]]:
+            analyses = []
+            for values in zip(*window_samples):
+                analysis = self.error_analysis()
+                for value in values:
+                    analysis.add(value)
+                analyses.append(analysis)
+            windows.append(analyses)
+        return windows
+
+    def window_means(self):
+        """Return the means of the observables over the previous and the last window.
+
+        :returns: two lists with the mean of every observable (None if there are less than 2*window samples)
+        """
+        windows = self._analyse_windows()
+        if windows is None:
+            return None
+        previous, last = windows
+        return [analysis.mean for analysis in previous
+                ], [analysis.mean for analysis in last]
+
+    @property
+    def stationary(self):
+        """True if the means of every observable over the last two windows agree within their standard errors."""
+        windows = self._analyse_windows()
+        if windows is None:
+            return False
+        return all(
+            abs(last.mean - previous.mean) <= self.n_sigma *
+            math.sqrt(previous.error**2 + last.error**2)
+            for previous, last in zip(*windows))
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Helper class for building the version of the run_spirit script that runs an LLG simulation until it is stationary.
+"""
+from .spirit_script_builder import SpiritScriptBuilder
+
+
+class StationarityScriptBuilder(SpiritScriptBuilder):
+    """Helper class to build run_spirit.py for a finite-temperature LLG run that is stopped once it is stationary.
+
+    The simulation is advanced in chunks of iterations and the energy and the magnetization are sampled after
+    every chunk with the `StationarityTest` of the copy of the stationarity module that is put next to
+    run_spirit.py. e.g.::
+
+        script.stationarity_settings({'window': 10}, max_walltime=3600)
+        script.run_until_stationary('LLG', 'Depondt', deadline=True)
+        script.write_stationarity()
+    """
+    def stationarity_settings(self,
+                              stationarity=None,
+                              max_walltime=None,
+                              stationarity_module='aiida_spirit_stationarity',
+                              mc_sampling_module='aiida_spirit_mc_sampling'):
+        """Define the chunks, the `StationarityTest` and the averaging of `run_until_stationary`.
+
+        :param stationarity: dict with chunk_iterations (default llg_n_iterations_log), window (number of chunks),
+            n_sigma and averaging_iterations (default window * chunk_iterations)
+        :param max_walltime: no new chunk is started if it would not be finished within this number of seconds
+        """
+        stationarity = stationarity or {}
+        self += '# advance the LLG simulation in chunks until the energy and the magnetization are stationary'
+        self += 'import json'
+        self += 'import time'
+        self += 'import types'
+        self += 'import numpy as np'
+        self += 'from spirit import parameters, quantities, system'
+        self += 'from {} import StationarityTest'.format(stationarity_module)
+        self += 'from {} import BinningAnalysis'.format(mc_sampling_module)
+        self += 'n_total, n_iterations_log = parameters.llg.get_iterations(p_state)'
+        self += 'n_chunk = {}'.format(
+            stationarity.get('chunk_iterations', 'n_iterations_log'))
+        self += 'stationarity_test = StationarityTest(BinningAnalysis, {}, {})'.format(
+            stationarity.get('window', 10), stationarity.get('n_sigma', 2.))
+        self += 'n_averaging = {}'.format(
+            stationarity.get('averaging_iterations',
+                             'stationarity_test.window * n_chunk'))
+        if max_walltime is not None:
+            self += 'deadline = time.monotonic() + {}'.format(max_walltime)
+
+    def stationarity_checkpoints(
+            self,
+            checkpoint_file,
+            fileformat=3,
+            checkpoints_module='aiida_spirit_checkpoints'):
+        """Define the `checkpoint` to which `run_until_stationary` writes the spin configuration after every chunk
+        (with the total iteration in the header, as the checkpoints of `periodic_checkpoints`)."""
+        self += 'from {} import PeriodicCheckpoint'.format(checkpoints_module)
+        with self.block('def write_checkpoint(filename):'):
+            self += "io.image_write(p_state, filename, {}, f'Iteration: {{n_done}}')".format(
+                fileformat)
+        self += '# the checkpoint is written after every chunk (not in a background thread)'
+        self += "checkpoint = PeriodicCheckpoint(write_checkpoint, '{}', interval=None)".format(
+            checkpoint_file)
+
+    def run_until_stationary(self,
+                             method,
+                             solver,
+                             output=None,
+                             deadline=False,
+                             checkpoint=False):
+        """Advance an LLG simulation in chunks until the energy and the magnetization are stationary
+        and average them over the following iterations.
+
+        After every chunk the energy per spin and the norm of the magnetization are sampled. Once the
+        `StationarityTest` passes, the run continues for `averaging_iterations` and the averages and their
+        standard errors (binning analysis) are accumulated for `write_stationarity`. The run also stops if
+        `llg_n_iterations` are done, if the force converged or if the next chunk would not be finished before
+        the `deadline`. The settings are defined with `stationarity_settings` (and `stationarity_checkpoints`).
+
+        :param output: dict with the llg output settings any, final, archive and filetype that are used after the
+            first chunk (the initial state and the snapshots are only written by the first chunk)
+        :param deadline: stop before the deadline of `stationarity_settings`
+        :param checkpoint: write the checkpoint of `stationarity_checkpoints` after every chunk
+        """
+        self += """
+        energy, magnetization = BinningAnalysis(), BinningAnalysis()
+        n_done, walltime_ms, n_stationary, t_chunk = 0, 0, None, 0.
+        stop_reason = 'n_iterations'
+        # the energy contributions are only in the header of the energy archive if they are computed before
+        # the first chunk (the later chunks append rows with all contributions to the archive)
+        system.update_data(p_state)
+        """
+        with self.block('while n_done < n_total:'):
+            if deadline:
+                with self.block('if time.monotonic() + t_chunk > deadline:'):
+                    self += "stop_reason = 'walltime'"
+                    self += 'break'
+            self._advance_chunk(method, solver, output or {})
+            if checkpoint:
+                self += 'checkpoint.write_now()'
+            self._sample_chunk()
+
+    def _advance_chunk(self, method, solver, output):
+        """Run the next chunk of iterations (the output after the first chunk is set by `output`)."""
+        self += 'n_next = min(n_chunk, n_total - n_done)'
+        with self.block('if n_stationary is not None:'):
+            self += 'n_next = min(n_next, n_stationary + n_averaging - n_done)'
+        self += 'parameters.llg.set_iterations(p_state, n_next, min(n_iterations_log, n_next))'
+        self += 't_start = time.monotonic()'
+        self.start_simulation(method, solver, run_info='chunk_info')
+        self += 't_chunk = time.monotonic() - t_start'
+        with self.block('if n_done == 0:'):
+            self += '# the iterations of every chunk start at zero, the snapshots would be overwritten'
+            self += 'parameters.llg.set_output_general(p_state, any={}, initial=False, final={})'.format(
+                output.get('any', True), output.get('final', True))
+            self += 'parameters.llg.set_output_configuration(p_state, step=False, archive={}, filetype={})'.format(
+                output.get('archive', False), output.get('filetype', 3))
+        self += 'n_done += chunk_info.total_iterations'
+        self += 'walltime_ms += chunk_info.total_walltime'
+
+    def _sample_chunk(self):
+        """Sample the energy and the magnetization after a chunk and check if the run is stopped."""
+        self += 'system.update_data(p_state)'
+        self += """
+        sample = (system.get_energy(p_state) / system.get_nos(p_state),
+                  float(np.linalg.norm(quantities.get_magnetization(p_state))))
+        """
+        with self.block(
+                'if chunk_info.max_torque < parameters.llg.get_convergence(p_state):'
+        ):
+            self += "stop_reason = 'converged'"
+            self += 'break'
+        with self.block('if n_stationary is None:'):
+            self += 'stationarity_test.add(*sample)'
+            with self.block('if stationarity_test.stationary:'):
+                self += 'n_stationary = n_done'
+        with self.block('else:'):
+            self += 'energy.add(sample[0])'
+            self += 'magnetization.add(sample[1])'
+            with self.block('if n_done >= n_stationary + n_averaging:'):
+                self += "stop_reason = 'stationary'"
+                self += 'break'
+
+    def write_stationarity(self,
+                           run_info='run_info',
+                           result_file='stationarity.json'):
+        """Write the averages, their standard errors and the reason for the stop of `run_until_stationary`
+        to `result_file`. The `simulation_run_info` of the chunks is summed up in the variable `run_info`
+        and written to `result_file` as well (the log of spirit only has the run info of the single chunks)."""
+        self += '# the summed up run info of the chunks'
+        self += (
+            '{} = types.SimpleNamespace(total_iterations=n_done, total_walltime=walltime_ms, '
+            'total_ips=1000 * n_done / max(walltime_ms, 1), max_torque=chunk_info.max_torque)'
+            .format(run_info))
+        self += """
+        _stationarity = {
+            'stop_reason': stop_reason,
+            'n_iterations': n_done,
+            'n_iterations_saved': n_total - n_done,
+            'stationary_iteration': n_stationary,
+            'chunk_iterations': n_chunk,
+            'n_averaged': energy.count,
+            'run_info': {
+                'runtime_ms': %(info)s.total_walltime,
+                'it_per_s': %(info)s.total_ips,
+                'simulation_time': n_done * parameters.llg.get_timestep(p_state),
+            },
+        }
+        # same reasons as in the log of spirit
+        _reasons = {'converged': 'The force converged', 'walltime': 'The maximum walltime has been reached'}
+        if stop_reason in _reasons:
+            _stationarity['run_info']['termination_reason'] = _reasons[stop_reason]
+        if energy.count > 0:
+            _stationarity.update({
+                'energy_per_spin': energy.mean,
+                'energy_per_spin_error': energy.error,
+                'magnetization_norm': magnetization.mean,
+                'magnetization_norm_error': magnetization.error,
+            })
+        """ % {
+            'info': run_info
+        }
+        with self.block("with open('{}', 'w') as _f:".format(result_file)):
+            self += 'json.dump(_stationarity, _f)'
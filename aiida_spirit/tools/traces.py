@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Reading of convergence traces (e.g. the energy archive of spirit) and their reduction to a
+bounded number of rows.
+
+The first and the last row of a trace are always kept such that the initial and the exact
+final values are stored regardless of the reduction.
+"""
+
+import numpy as np
+from .ovf import CHUNK_SIZE, iter_text_blocks
+
+# allowed reduction methods of a trace
+TRACE_REDUCTIONS = ['stride', 'lttb', 'tail']
+
+
+def read_trace(handle, skiprows=1, chunk_size=CHUNK_SIZE):
+    """Read a whitespace separated table of numbers (e.g. the energy archive of spirit).
+
+    The table is parsed in blocks of complete lines of `chunk_size` bytes into an array that is
+    grown in place, the number of columns is taken from the first row.
+
+    :param handle: binary file handle
+    :param skiprows: number of header lines that are skipped
+    :param chunk_size: number of bytes that are parsed at once
+    :returns: 2D array with one row per line of the table
+    """
+    for _ in range(skiprows):
+        handle.readline()
+    data = np.empty(0, dtype=np.float64)
+    filled, ncols = 0, None
+    for block in iter_text_blocks(handle, chunk_size):
+        if ncols is None and block.strip():
+            ncols = len(block.lstrip().split(b'\n', 1)[0].split())
+        values = np.array(block.split(), dtype=np.float64)
+        if filled + len(values) > len(data):
+            data.resize(max(filled + len(values), 5 * len(data) // 4),
+                        refcheck=False)
+        data[filled:filled + len(values)] = values
+        filled += len(values)
+    if ncols is None:
+        return np.empty((0, 0))
+    if filled % ncols != 0:
+        raise ValueError(f'Not all rows of the table have {ncols} columns')
+    data.resize(filled, refcheck=False)
+    return data.reshape(-1, ncols)
+
+
+def _stride_indices(nrows, max_rows):
+    """Every n-th row such that at most max_rows rows are kept (including the last row)."""
+    step = int(np.ceil((nrows - 1) / (max_rows - 1)))
+    indices = np.arange(0, nrows, step)
+    if indices[-1] != nrows - 1:
+        indices = np.append(indices, nrows - 1)
+    return indices
+
+
+def _tail_indices(nrows, max_rows):
+    """The first row and the last max_rows-1 rows."""
+    return np.append(0, np.arange(nrows - max_rows + 1, nrows))
+
+
+def _lttb_indices(x, y, max_rows):
+    """Largest-Triangle-Three-Buckets downsampling (Steinarsson 2013).
+
+    The rows between the first and the last row are divided into max_rows-2 buckets.
+    From each bucket the point that spans the largest triangle with the previously selected
+    point and the average of the next bucket is kept, which preserves the minima and maxima
+    of the trace much better than a fixed stride.
+    """
+    nrows = len(x)
+    edges = np.linspace(1, nrows - 1, max_rows - 1).astype(int)
+    indices = np.empty(max_rows, dtype=int)
+    indices[0], indices[-1] = 0, nrows - 1
+    selected = 0
+    for ibucket in range(max_rows - 2):
+        start, end = edges[ibucket], edges[ibucket + 1]
+        if ibucket + 2 < len(edges):
+            next_start, next_end = end, edges[ibucket + 2]
+            x_avg, y_avg = x[next_start:next_end].mean(
+            ), y[next_start:next_end].mean()
+        else:
+            x_avg, y_avg = x[-1], y[-1]
+        area = np.abs((x[selected] - x_avg) * (y[start:end] - y[selected]) -
+                      (x[selected] - x[start:end]) * (y_avg - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[ibucket + 1] = selected
+    return indices
+
+
+def reduce_trace(data, method='lttb', max_rows=1000, xcol=0, ycol=1):
+    """Reduce a trace to at most max_rows rows.
+
+    :param data: 2D array with one row per logged iteration
+    :param method: 'stride' (every n-th row), 'lttb' (Largest-Triangle-Three-Buckets downsampling
+        of column ycol over column xcol) or 'tail' (first row and the last rows)
+    :param max_rows: maximal number of rows that are kept (at least 3)
+    :param xcol: column that is used as x-axis in the lttb method (e.g. the iteration)
+    :param ycol: column that is used as y-axis in the lttb method (e.g. the total energy)
+    :returns: reduced array and the indices of the kept rows in the original array
+    """
+    if method not in TRACE_REDUCTIONS:
+        raise ValueError(
+            f'Unknown trace reduction: {method} (allowed: {TRACE_REDUCTIONS})')
+    if max_rows < 3:
+        raise ValueError('max_rows needs to be at least 3')
+
+    data = np.asarray(data)
+    nrows = len(data)
+    if nrows <= max_rows:
+        indices = np.arange(nrows)
+    elif method == 'stride':
+        indices = _stride_indices(nrows, max_rows)
+    elif method == 'tail':
+        indices = _tail_indices(nrows, max_rows)
+    else:
+        indices = _lttb_indices(data[:, xcol].astype(float),
+                                data[:, ycol].astype(float), max_rows)
+    return data[indices], indices
+
+
+def join_restarted_trace(data, xcol=0):
+    """Make the iteration column of a trace cumulative where it restarts at zero.
+
+    Spirit starts the iterations of every `simulation.start` at zero, e.g. the energy archive of
+    an LLG run that is advanced in chunks consists of one segment per chunk. Every segment is shifted
+    by the last iteration of the previous segment (the number of rows is not changed).
+
+    :param data: 2D array with one row per logged iteration
+    :param xcol: column of the iteration
+    :returns: copy of the array with the cumulative iterations
+    """
+    data = np.array(data, dtype=float)
+    starts = list(np.flatnonzero(np.diff(data[:, xcol]) < 0) + 1)
+    for start, end in zip(starts, starts[1:] + [len(data)]):
+        # the previous segment was already shifted
+        data[start:end, xcol] += data[start - 1, xcol]
+    return data
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming writers for the input files of a spirit calculation.
+
+The arrays are read from the `.npy` files in chunks of rows and are formatted
+chunk by chunk. This keeps the memory footprint bounded, also for very large
+inputs (e.g. millions of couplings).
+"""
+
+import numpy as np
+
+# number of rows that are read and formatted at once
+CHUNK_SIZE = 2**16
+
+# column names of the couplings file
+COUPLINGS_COLUMNS = ['i', 'j', 'da', 'db', 'dc', 'Jij']
+COUPLINGS_COLUMNS_DMI = COUPLINGS_COLUMNS + ['Dij', 'Dijx', 'Dijy', 'Dijz']
+
+
+def open_array_file(node, arrayname):
+    """Open the `.npy` file of an array stored in an ArrayData node in binary mode."""
+    filename = f'{arrayname}.npy'
+    if hasattr(node, 'base'):
+        # aiida-core>=2.0
+        return node.base.repository.open(filename, mode='rb')
+    return node.open(filename, mode='rb')
+
+
+def iter_npy_chunks(handle, chunk_size=CHUNK_SIZE):
+    """Iterate over the rows of an array in `.npy` format in chunks.
+
+    Only the header and the rows of the current chunk are read from the file handle.
+
+    :param handle: binary file handle pointing to the beginning of a `.npy` file
+    :param chunk_size: maximal number of rows in a chunk
+    :returns: generator of arrays with at most `chunk_size` rows
+    """
+    version = np.lib.format.read_magic(handle)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(
+            handle)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(
+            handle)
+
+    if fortran_order or dtype.hasobject or len(shape) == 0:
+        # rows are not contiguous on disk, fall back to loading the full array
+        handle.seek(0)
+        array = np.atleast_1d(np.load(handle))
+        for istart in range(0, len(array), chunk_size):
+            yield array[istart:istart + chunk_size]
+        return
+
+    row_shape = shape[1:]
+    row_bytes = int(np.prod(row_shape, dtype=np.int64)) * dtype.itemsize
+    for istart in range(0, shape[0], chunk_size):
+        nrows = min(chunk_size, shape[0] - istart)
+        buffer = handle.read(nrows * row_bytes)
+        if len(buffer) != nrows * row_bytes:
+            raise ValueError('Unexpected end of file while reading the array.')
+        yield np.frombuffer(buffer, dtype=dtype).reshape((nrows, ) + row_shape)
+
+
+def iter_array_chunks(node, arrayname, chunk_size=CHUNK_SIZE):
+    """Iterate over the rows of an array of an ArrayData node in chunks.
+
+    :param node: ArrayData node
+    :param arrayname: name of the array
+    :param chunk_size: maximal number of rows in a chunk
+    :returns: generator of arrays with at most `chunk_size` rows
+    """
+    with open_array_file(node, arrayname) as handle:
+        yield from iter_npy_chunks(handle, chunk_size)
+
+
+def format_rows(rows, row_format):
+    """Format a 2D array into a string with one line per row.
+
+    :param rows: 2D array that is formatted
+    :param row_format: %-style format string for a single row (including the newline)
+    """
+    if len(rows) == 0:
+        return ''
+    # tolist converts to python scalars which are formatted with the shortest repr
+    return (row_format * len(rows)) % tuple(np.ravel(rows).tolist())
+
+
+def _couplings_row_format(ncols):
+    """Return the format of a single line in the couplings file."""
+    return '\t'.join(['%d'] * 5 + ['%r'] * (ncols - 5)) + '\n'
+
+
+def expand_dmi(jijs):
+    """Convert the (i, j, da, db, dc, Jij, Dx, Dy, Dz) columns to the spirit format.
+
+    The DMI vector is split into the magnitude (Dij) and the normalized direction (Dijx, Dijy, Dijz).
+    Couplings without DMI get a zero direction vector.
+    """
+    if jijs.shape[1] < 9:
+        raise ValueError(
+            f'jij_data invalid: the DMI vector needs the Dx, Dy and Dz columns but got {jijs.shape[1]} columns'
+        )
+    jd = np.empty((len(jijs), 10), dtype=np.float64)
+    jd[:, :6] = jijs[:, :6]
+    # compute magnitude of DMI vector and add after Jij column
+    jd[:, 6] = np.linalg.norm(jijs[:, 6:9], axis=1)
+    # Dx, Dy, Dz are only used to get direction
+    np.divide(jijs[:, 6:9], jd[:, 6:7], out=jd[:, 7:10], where=jd[:, 6:7] > 0)
+    jd[jd[:, 6] == 0, 7:10] = 0.
+    return jd
+
+
+def write_couplings(handle, jij_chunks, positions_chunks=None, rcut=None):
+    """Write the couplings file in the tab-separated format that spirit reads.
+
+    :param handle: text file handle to which the couplings are written
+    :param jij_chunks: iterable over chunks of the `Jij_expanded` array
+        (columns i, j, da, db, dc, Jij and optionally Dx, Dy, Dz)
+    :param positions_chunks: iterable over chunks of the `positions_expanded` array,
+        needs to be given if `rcut` is not None
+    :param rcut: cutoff radius, couplings with larger distance are dropped
+    :returns: number of couplings that were written
+    """
+    if rcut is not None:
+        if positions_chunks is None:
+            raise ValueError(
+                'couplings_cutoff_radius needs positions_expanded in the jij_data'
+            )
+        chunks = zip(jij_chunks, positions_chunks)
+    else:
+        chunks = ((jijs, None) for jijs in jij_chunks)
+
+    header_written = False
+    nwritten = 0
+    for jijs, positions in chunks:
+        ncols = jijs.shape[1] if jijs.ndim == 2 else 0
+        if ncols >= 8:
+            # has Dij's
+            jijs = expand_dmi(jijs)
+            columns = COUPLINGS_COLUMNS_DMI
+        elif ncols >= 6:
+            # has Jijs
+            jijs = jijs[:, :6]
+            columns = COUPLINGS_COLUMNS
+        else:
+            # no Jijs found, stop here
+            raise ValueError('jij_data invalid')
+
+        if not header_written:
+            # spirit wants to have the data separated in tabs
+            handle.write('\t'.join(columns) + '\n')
+            header_written = True
+
+        # cut all couplings that are futher away that the cutoff radius
+        if rcut is not None:
+            r = np.sqrt(np.sum(positions**2, axis=1))
+            jijs = jijs[r <= rcut]
+
+        handle.write(format_rows(jijs, _couplings_row_format(len(columns))))
+        nwritten += len(jijs)
+
+    if not header_written:
+        raise ValueError('jij_data invalid')
+
+    return nwritten
+
+
+def normalize_rows(vectors):
+    """Normalize the rows of a (N, 3) array of directions in place."""
+    norm = np.sqrt(vectors[:, 0]**2 + vectors[:, 1]**2 + vectors[:, 2]**2)
+    vectors /= norm[:, np.newaxis]
+    return vectors
+
+
+def write_rows(handle, chunks, nint, nfloat, normalize=False):
+    """Write tab-separated rows without header that have integer columns followed by float columns.
+
+    :param handle: text file handle to which the rows are written
+    :param chunks: iterable over chunks of the array
+    :param nint: number of integer columns at the beginning of each row
+    :param nfloat: number of float columns
+    :param normalize: if True the float columns are normalized to unit length
+    :returns: number of rows that were written
+    """
+    ncols = nint + nfloat
+    row_format = '\t'.join(['%d'] * nint + ['%r'] * nfloat) + '\n'
+    nwritten = 0
+    for rows in chunks:
+        rows = np.asarray(rows)
+        if rows.ndim != 2 or rows.shape[1] != ncols:
+            raise ValueError(
+                f'Expected array with {ncols} columns but got shape {rows.shape}'
+            )
+        if normalize:
+            # copy only the float columns of this chunk, the chunks read from the file are read-only
+            directions = normalize_rows(rows[:, nint:].astype(np.float64))
+            if nint > 0:
+                rows = np.concatenate(
+                    [rows[:, :nint].astype(np.float64), directions], axis=1)
+            else:
+                rows = directions
+        handle.write(format_rows(rows, row_format))
+        nwritten += len(rows)
+    return nwritten
+
+
+def write_pinning(handle, chunks):
+    """Write the pinning file (i, da, db, dc, Sx, Sy, Sz) with normalized directions."""
+    return write_rows(handle, chunks, nint=4, nfloat=3, normalize=True)
+
+
+def write_defects(handle, chunks):
+    """Write the defects file (i, da, db, dc, itype)."""
+    return write_rows(handle, chunks, nint=5, nfloat=0)
+
+
+def write_initial_state(handle, chunks):
+    """Write the initial spin directions (x, y, z) normalized to unit length."""
+    return write_rows(handle, chunks, nint=0, nfloat=3, normalize=True)
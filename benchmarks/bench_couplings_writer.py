@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the streaming couplings writer against the previous pandas implementation.
+
+Usage: python benchmarks/bench_couplings_writer.py --n-couplings 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from aiida_spirit.tools.writers import iter_npy_chunks, write_couplings
+
+
+def write_couplings_pandas(handle,
+                           jij_expanded,
+                           positions_expanded=None,
+                           rcut=None):
+    """Previous implementation of `SpiritCalculation.write_couplings_file` (full DataFrame + to_csv)"""
+    from pandas import DataFrame  # pylint: disable=import-outside-toplevel
+    jd = np.zeros((len(jij_expanded), 10))
+    jd[:, :6] = jij_expanded[:, :6]
+    jd[:, 6] = np.linalg.norm(jij_expanded[:, 6:9], axis=1)
+    jd[:, 7:10] = jij_expanded[:, 6:9]
+    jijs_df = DataFrame(jd,
+                        columns=[
+                            'i', 'j', 'da', 'db', 'dc', 'Jij', 'Dij', 'Dijx',
+                            'Dijy', 'Dijz'
+                        ])
+    jijs_df['Dijx'] /= jijs_df['Dij']
+    jijs_df['Dijy'] /= jijs_df['Dij']
+    jijs_df['Dijz'] /= jijs_df['Dij']
+    jijs_df = jijs_df.astype({
+        'i': 'int64',
+        'j': 'int64',
+        'da': 'int64',
+        'db': 'int64',
+        'dc': 'int64'
+    })
+    if rcut is not None:
+        r = np.sqrt(np.sum(positions_expanded**2, axis=1))
+        jijs_df = jijs_df[r <= rcut]
+    jijs_df.to_csv(handle, sep='\t', index=False)
+
+
+def _measure(func):
+    """Return runtime and peak traced memory of func()"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    func()
+    runtime = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return runtime, peak / 1024**2
+
+
+def _create_inputs(tmpdir, n):
+    """Save random couplings and positions of `n` pairs as npy files and return their paths"""
+    rng = np.random.default_rng(42)
+    jijs = np.zeros((n, 9))
+    jijs[:, 2:5] = rng.integers(-5, 6, size=(n, 3))
+    jijs[:, 5:9] = rng.normal(size=(n, 4))
+    jij_file = os.path.join(tmpdir, 'Jij_expanded.npy')
+    pos_file = os.path.join(tmpdir, 'positions_expanded.npy')
+    np.save(jij_file, jijs)
+    np.save(pos_file, jijs[:, 2:5])
+    return jij_file, pos_file
+
+
+def run_old(jij_file, pos_file, out_file, rcut):
+    """Previous implementation: load the full arrays and write them with pandas"""
+    with open(out_file, 'w', encoding='utf-8') as _f:
+        write_couplings_pandas(_f,
+                               np.load(jij_file),
+                               np.load(pos_file),
+                               rcut=rcut)
+
+
+def run_new(jij_file, pos_file, out_file, rcut):
+    """Current implementation: stream the npy files in chunks"""
+    with open(jij_file, 'rb') as _fj, open(pos_file, 'rb') as _fp:
+        with open(out_file, 'w', encoding='utf-8') as _f:
+            write_couplings(_f,
+                            iter_npy_chunks(_fj),
+                            iter_npy_chunks(_fp),
+                            rcut=rcut)
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n-couplings', type=int, default=10**6)
+    parser.add_argument('--rcut', type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        jij_file, pos_file = _create_inputs(tmpdir, args.n_couplings)
+        out_old = os.path.join(tmpdir, 'couplings_old.txt')
+        out_new = os.path.join(tmpdir, 'couplings_new.txt')
+
+        t_old, m_old = _measure(
+            lambda: run_old(jij_file, pos_file, out_old, args.rcut))
+        t_new, m_new = _measure(
+            lambda: run_new(jij_file, pos_file, out_new, args.rcut))
+
+        with open(out_old,
+                  encoding='utf-8') as f_old, open(out_new,
+                                                   encoding='utf-8') as f_new:
+            identical = f_old.read() == f_new.read()
+
+    print(f'couplings: {args.n_couplings}')
+    print(f'pandas:    {t_old:8.2f} s  peak memory {m_old:9.1f} MiB')
+    print(f'streaming: {t_new:8.2f} s  peak memory {m_new:9.1f} MiB')
+    print(f'speedup:   {t_old/t_new:8.2f} x, identical output: {identical}')
+
+
+if __name__ == '__main__':
+    main()
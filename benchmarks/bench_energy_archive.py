@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the chunked reader of the energy archive against the previous `np.loadtxt` parsing.
+
+Usage: python benchmarks/bench_energy_archive.py --n-rows 1000000
+(the default corresponds to a long LLG run that writes the energy every 10 iterations)
+"""
+import argparse
+import gzip
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from aiida_spirit.tools.traces import read_trace
+
+
+def read_loadtxt(filename):
+    """Previous implementation of the parser (`np.loadtxt` with a text handle)"""
+    with gzip.open(filename, 'rt') as _f:
+        return np.loadtxt(_f, skiprows=1)
+
+
+def read_new(filename):
+    """Current implementation of the parser"""
+    with gzip.open(filename, 'rb') as _f:
+        return read_trace(_f)
+
+
+def _measure(func, filename):
+    """Return runtime, peak traced memory and result of func(filename)
+
+    The runtime is measured without tracemalloc, since tracing the allocation of every
+    token of the split text blocks would dominate the runtime of `read_trace`.
+    """
+    t0 = time.perf_counter()
+    result = func(filename)
+    runtime = time.perf_counter() - t0
+    tracemalloc.start()
+    func(filename)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return runtime, peak / 1024**2, result
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n-rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    energies = np.random.default_rng(42).normal(size=(args.n_rows, 7))
+    energies[:, 0] = np.arange(args.n_rows) * 10
+    result_size = energies.nbytes / 1024**2
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir,
+                                'spirit_Image-00_Energy-archive.txt.gz')
+        with gzip.open(filename, 'wt') as _f:
+            _f.write(
+                '  iteration  E_tot  E_Zeeman  E_Anisotropy  E_Exchange  E_DMI  E_DDI\n'
+            )
+            np.savetxt(_f, energies, fmt='%.10e')
+
+        print(f'{args.n_rows} rows (result array: {result_size:.1f} MiB)')
+        size = os.path.getsize(filename) / 1024**2
+        for label, func in [('np.loadtxt', read_loadtxt),
+                            ('read_trace', read_new)]:
+            runtime, peak, result = _measure(func, filename)
+            assert np.allclose(result, energies)
+            print(
+                f'{label:20} file {size:7.1f} MiB  {runtime:7.3f} s  peak memory {peak:8.1f} MiB'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the precompiled input.cfg renderer against the previous line-by-line implementation.
+
+Renders the input config for many submissions (e.g. a temperature scan) and checks that
+both implementations give the same result.
+
+Usage: python benchmarks/bench_input_cfg.py --n-submissions 10000 --n-sites 1000
+"""
+import argparse
+import time
+from collections import namedtuple
+import numpy as np
+from aiida_spirit.calculations import TEMPLATE_PATH, INPUT_TEMPLATE, _get_geometry
+from aiida_spirit.data._formatting_info import _forbidden_keys
+from aiida_spirit.data._type_check import verify_input_para
+
+
+class FakeStructure():
+    """Minimal stand-in for a StructureData node (avoids the need for an AiiDA profile)"""
+
+    Site = namedtuple('Site', ['position'])
+
+    def __init__(self, cell, positions):
+        self.cell = cell
+        self.positions = positions
+        self.base = self
+        self.attributes = self
+
+    @property
+    def sites(self):
+        """Sites with positions, mimics `structure.sites`"""
+        return [self.Site(list(pos)) for pos in self.positions]
+
+    def get(self, key, default=None):  # pylint: disable=unused-argument
+        """Raw site attributes, mimics `structure.base.attributes.get('sites')`"""
+        return [{'position': list(pos)} for pos in self.positions]
+
+
+def _modify_line(my_string, new_value):
+    """Previous implementation"""
+    splitted = my_string.split(' ', 1)
+    cnt = 0
+    for element in splitted[1]:
+        if element == ' ':
+            cnt += 1
+        else:
+            break
+    return splitted[0] + (cnt + 1) * ' ' + new_value + '\n'
+
+
+def _get_geometry_old(structure):
+    """Previous implementation"""
+    cell = np.array(structure.cell)
+    U2rel = np.linalg.inv(cell.transpose())
+    sv = ''
+    for element in cell:
+        sv += ' '.join(map(str, element)) + '\n'
+    num_sites = len(structure.sites)
+    sites_pos = ''
+    for site in structure.sites:
+        pos_rel = np.dot(U2rel, site.position)
+        pos_rel = pos_rel % 1
+        sites_pos += ' '.join(map(str, pos_rel)) + '\n'
+    return 'bravais_vectors\n' + sv + '\n' + 'basis\n' + str(
+        num_sites) + '\n' + sites_pos
+
+
+def render_old(input_dict, structure):
+    """Previous implementation of `SpiritCalculation.write_input_cfg` (reads the template every time)"""
+    input_file = []
+    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f_orig:
+        for line in f_orig:
+            input_file.append(line)
+            key = line.split(' ', 1)[0]
+            if key in input_dict and key not in _forbidden_keys:
+                input_file[-1] = _modify_line(
+                    line, verify_input_para(key, input_dict[key]))
+            if key == 'bravais_lattice':
+                input_file[-1] = _get_geometry_old(structure)
+    return ''.join(input_file)
+
+
+def render_new(input_dict, structure):
+    """Current implementation of `SpiritCalculation.write_input_cfg`"""
+    values = {
+        key: verify_input_para(key, val)
+        for key, val in input_dict.items()
+        if key in INPUT_TEMPLATE and key not in _forbidden_keys
+    }
+    return ''.join(
+        INPUT_TEMPLATE.render(
+            values, replacements={'bravais_lattice':
+                                  _get_geometry(structure)}))
+
+
+def _time(func, inputs, structure):
+    """Return the runtime of rendering all inputs"""
+    t0 = time.perf_counter()
+    for input_dict in inputs:
+        func(input_dict, structure)
+    return time.perf_counter() - t0
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n-submissions', type=int, default=10000)
+    parser.add_argument('--n-sites', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    cell = [[1.0, 0.0, 0.0], [0.5, 0.8660254037844386, 0.0], [0.0, 0.0, 2.1]]
+    structure = FakeStructure(cell,
+                              rng.random((args.n_sites, 3)) @ np.array(cell))
+    inputs = [{
+        'llg_temperature': float(temp),
+        'mc_temperature': float(temp),
+        'boundary_conditions': [True, True, False],
+        'llg_n_iterations': 50000,
+    } for temp in np.linspace(0, 500, args.n_submissions)]
+
+    for input_dict in inputs[:10]:
+        assert render_old(input_dict,
+                          structure) == render_new(input_dict, structure)
+
+    t_old = _time(render_old, inputs, structure)
+    t_new = _time(render_new, inputs, structure)
+    print(f'{args.n_submissions} submissions with {args.n_sites} sites')
+    print(f'line-by-line template: {t_old:8.3f} s')
+    print(
+        f'precompiled template:  {t_new:8.3f} s  (speedup {t_old / t_new:.1f}x)'
+    )
+
+
+if __name__ == '__main__':
+    main()
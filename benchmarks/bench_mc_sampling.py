@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the batched MC sampling loop of run_spirit.py against the previous loop.
+
+The previous loop called `simulation.single_shot` once per decorrelation step and summed
+E, E^2, |M|, M^2 and M^4 in Python. The current loop advances all decorrelation steps
+with one `simulation.n_shot` call and uses the online accumulators of
+`aiida_spirit.tools.mc_sampling`. The current loop additionally calls `system.update_data`
+before reading the energy (otherwise spirit returns the energy of the last log step).
+
+Needs the spirit python package. Usage: python benchmarks/bench_mc_sampling.py --sizes 4 8 16 32
+"""
+import argparse
+import time
+import numpy as np
+from spirit import state, system, simulation, configuration, parameters, quantities, geometry
+from aiida_spirit.tools.mc_sampling import MCAccumulator
+
+
+def sample_old(p_state, n_samples, n_decorrelation):
+    """Previous sampling loop of the MC script"""
+    NOS = system.get_nos(p_state)
+    E, E2, M, M2, M4 = 0, 0, 0, 0, 0
+    for _ in range(n_samples):
+        for _ in range(n_decorrelation):
+            simulation.single_shot(p_state)
+        E_local = system.get_energy(p_state) / NOS
+        M_local_tot = np.linalg.norm(
+            np.array(quantities.get_magnetization(p_state)))
+        E += E_local
+        E2 += E_local**2
+        M += M_local_tot
+        M2 += M_local_tot**2
+        M4 += M_local_tot**4
+    return E / n_samples, M / n_samples
+
+
+def sample_new(p_state, n_samples, n_decorrelation):
+    """Current sampling loop of the MC script"""
+    NOS = system.get_nos(p_state)
+    accumulator = MCAccumulator()
+    for _ in range(n_samples):
+        simulation.n_shot(p_state, n_decorrelation)
+        system.update_data(p_state)
+        E_local = system.get_energy(p_state) / NOS
+        M_local_tot = np.linalg.norm(quantities.get_magnetization(p_state))
+        accumulator.add(E_local, M_local_tot)
+    return accumulator.energy.mean, accumulator.magnetization.mean
+
+
+def _run(p_state, func, n_samples, n_decorrelation, temperature):
+    """Time the sampling of func at a temperature"""
+    parameters.mc.set_temperature(p_state, temperature)
+    configuration.plus_z(p_state)
+    n_iterations = n_samples * n_decorrelation
+    parameters.mc.set_iterations(p_state, n_iterations, n_iterations)
+    simulation.start(p_state, simulation.METHOD_MC, single_shot=True)
+    t0 = time.perf_counter()
+    func(p_state, n_samples, n_decorrelation)
+    runtime = time.perf_counter() - t0
+    simulation.stop(p_state)
+    return n_samples / runtime
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--n-samples', type=int, default=200)
+    parser.add_argument('--n-decorrelation', type=int, default=20)
+    parser.add_argument('--temperature', type=float, default=10.)
+    args = parser.parse_args()
+
+    print(
+        f'{"spins":>8} {"old samples/s":>14} {"new samples/s":>14} {"speedup":>8}'
+    )
+    with state.State('', quiet=True) as p_state:
+        for size in args.sizes:
+            geometry.set_n_cells(p_state, [size, size, 1])
+            rate_old = _run(p_state, sample_old, args.n_samples,
+                            args.n_decorrelation, args.temperature)
+            rate_new = _run(p_state, sample_new, args.n_samples,
+                            args.n_decorrelation, args.temperature)
+            print(
+                f'{size * size:8d} {rate_old:14.1f} {rate_new:14.1f} {rate_new / rate_old:7.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
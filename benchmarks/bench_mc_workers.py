@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the sampling of a temperature scan with a number of worker processes.
+
+The temperatures are split into contiguous blocks that are sampled in forked worker processes
+with a spirit state of their own, as in the MC script of run_spirit.py with `n_workers`.
+Each worker uses a single OpenMP thread such that the scaling with the number of processes
+is measured. The speedup can only be close to linear if the node has at least as many
+cores as workers.
+
+Needs the spirit python package. Usage: python benchmarks/bench_mc_workers.py --workers 1 2 4 8
+"""
+import os
+
+# one OpenMP thread per worker, this needs to be set before spirit is loaded
+os.environ['OMP_NUM_THREADS'] = '1'
+
+# pylint: disable=wrong-import-position
+import argparse
+import multiprocessing
+import time
+import numpy as np
+from spirit import state, system, simulation, configuration, parameters, quantities, geometry, constants
+from aiida_spirit.tools.mc_sampling import MCAccumulator
+
+_ARGS = None
+
+
+def run_temperatures(temperatures):
+    """Sample the temperatures in a state of its own (same loop as the MC script)"""
+    results = []
+    with state.State('', quiet=True) as p_state:
+        geometry.set_n_cells(p_state, [_ARGS.size, _ARGS.size, 1])
+        NOS = system.get_nos(p_state)
+        for T in temperatures:
+            parameters.mc.set_temperature(p_state, T)
+            configuration.plus_z(p_state)
+            accumulator = MCAccumulator()
+            n_iterations = _ARGS.n_thermalisation + _ARGS.n_decorrelation * _ARGS.n_samples
+            parameters.mc.set_iterations(p_state, n_iterations, n_iterations)
+            simulation.start(p_state, simulation.METHOD_MC, single_shot=True)
+            simulation.n_shot(p_state, _ARGS.n_thermalisation)
+            for _ in range(_ARGS.n_samples):
+                simulation.n_shot(p_state, _ARGS.n_decorrelation)
+                system.update_data(p_state)
+                accumulator.add(
+                    system.get_energy(p_state) / NOS,
+                    np.linalg.norm(quantities.get_magnetization(p_state)))
+            simulation.stop(p_state)
+            results.append(accumulator.observables(T, constants.k_B))
+    return results
+
+
+def _run(temperatures, n_workers):
+    """Time the temperature scan with n_workers processes"""
+    t0 = time.perf_counter()
+    if n_workers == 1:
+        run_temperatures(temperatures)
+    else:
+        with multiprocessing.get_context('fork').Pool(n_workers) as pool:
+            pool.map(run_temperatures, np.array_split(temperatures, n_workers))
+    return time.perf_counter() - t0
+
+
+def main():
+    """Run the benchmark"""
+    global _ARGS  # pylint: disable=global-statement
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--size', type=int, default=16)
+    parser.add_argument('--n-temperatures', type=int, default=16)
+    parser.add_argument('--n-thermalisation', type=int, default=200)
+    parser.add_argument('--n-samples', type=int, default=50)
+    parser.add_argument('--n-decorrelation', type=int, default=5)
+    _ARGS = parser.parse_args()
+
+    temperatures = np.linspace(10, 2000, _ARGS.n_temperatures)
+    print(
+        f'cores: {os.cpu_count()}, spins: {_ARGS.size**2}, temperatures: {_ARGS.n_temperatures}'
+    )
+    print(f'{"workers":>8} {"runtime (s)":>12} {"speedup":>8}')
+    runtime_serial = None
+    for n_workers in _ARGS.workers:
+        runtime = _run(temperatures, n_workers)
+        if runtime_serial is None:
+            runtime_serial = runtime
+        print(
+            f'{n_workers:8d} {runtime:12.2f} {runtime_serial / runtime:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
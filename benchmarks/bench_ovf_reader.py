@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the OVF reader against the previous `np.loadtxt` parsing of the spin files.
+
+Usage: python benchmarks/bench_ovf_reader.py --n-spins 1048576
+(the default corresponds to a 256x256x16 film)
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from aiida_spirit.tools.ovf import write_ovf, read_ovf
+
+
+def read_loadtxt(filename):
+    """Previous implementation of the parser (`SpiritParser._parse_if_found`)"""
+    with open(filename, 'r', encoding='utf-8') as _f:
+        return np.loadtxt(_f)
+
+
+def read_new(filename):
+    """Current implementation of the parser"""
+    with open(filename, 'rb') as _f:
+        return read_ovf(_f)
+
+
+def _measure(func, filename):
+    """Return runtime, peak traced memory and result of func(filename)"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func(filename)
+    runtime = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return runtime, peak / 1024**2, result
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n-spins', type=int, default=256 * 256 * 16)
+    args = parser.parse_args()
+
+    spins = np.random.default_rng(42).normal(size=(args.n_spins, 3))
+    spins /= np.linalg.norm(spins, axis=1)[:, np.newaxis]
+    result_size = spins.nbytes / 1024**2
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = {}
+        for ovf_format in ['text', 'binary8']:
+            files[ovf_format] = os.path.join(tmpdir, f'spins_{ovf_format}.ovf')
+            with open(files[ovf_format], 'wb') as _f:
+                write_ovf(_f, [spins], len(spins), ovf_format=ovf_format)
+
+        print(f'{args.n_spins} spins (result array: {result_size:.1f} MiB)')
+        for label, func, ovf_format in [
+            ('np.loadtxt, text', read_loadtxt, 'text'),
+            ('read_ovf, text', read_new, 'text'),
+            ('read_ovf, binary8', read_new, 'binary8'),
+        ]:
+            runtime, peak, result = _measure(func, files[ovf_format])
+            assert np.allclose(result, spins)
+            size = os.path.getsize(files[ovf_format]) / 1024**2
+            print(
+                f'{label:20} file {size:7.1f} MiB  {runtime:7.3f} s  peak memory {peak:8.1f} MiB'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the single-pass stdout parser against the previous implementation.
+
+A synthetic spirit stdout of the given size is created (log messages of the iterations
+between the initialisation and the final summary of the run).
+
+Usage: python benchmarks/bench_parse_outfile.py --size-mb 1024
+"""
+import argparse
+import os
+import tempfile
+import time
+from aiida_spirit.parsers import parse_outfile, _version_info_value, _VERSION_INFO_KEYS
+
+HEADER = """2021-06-01 09:00:00  [  ALL  ] [ALL ] [--] [--]  =====================================================
+                                                 ========== Spirit State: Initialising... ============
+                                                 ==========     Version:  2.2.0
+                                                 ==========     Revision: e82250d3b1441
+2021-06-01 09:00:00  [ INFO  ] [ALL ] [--] [--]  =====================================================
+                                                 ========== Optimization Info
+                                                     Using OpenMP with n=8 threads
+                                                     Not using CUDA
+                                                     Not using std::thread
+                                                     Defects are enabled
+                                                     Pinning is enabled
+                                                     Using double as scalar type
+                                                     Number of  Errors:  0
+                                                     Number of Warnings: 0
+2021-06-01 09:00:00  [  ALL  ] [LLG ] [01] [01]  ------------  Started  LLG Calculation  ------------
+                                                     Solver: Depondt
+"""
+STEP = """2021-06-01 09:00:01  [  ALL  ] [LLG ] [01] [01]  ----- LLG Calculation: {0} iterations
+                                                     Time since last step:   0:0:0.032
+                                                     Completed   {0} / 2000000 iterations
+                                                     Force convergence parameter: 0.000001000000
+                                                     Maximum torque:              0.002294924207
+"""
+FOOTER = """2021-06-01 11:00:02  [  ALL  ] [LLG ] [01] [01]  ------------ Terminated LLG Calculation ------------
+                                                 ------- Reason: The force converged
+                                                     Total duration:    2:0:1.646
+                                                     Iterations / sec:  247.78
+                                                     Simulated time:    0.409 ps
+                                                     Solver: Depondt
+"""
+
+
+def _search_string(searchkey, txt):
+    """Same as `masci_tools.io.common_functions.search_string`"""
+    for iline, line in enumerate(txt):
+        if searchkey in line:
+            return iline
+    return -1
+
+
+def parse_outfile_old(txt):
+    """Previous implementation (one linear scan per key)"""
+    out_dict = {}
+    itmp = _search_string('Total duration', txt)
+    if itmp >= 0:
+        t_str = txt[itmp].split()[2]
+        tmp = [float(i) for i in t_str.split(':')]
+        out_dict['runtime'] = t_str
+        out_dict['runtime_sec'] = tmp[0] * 3600 + tmp[1] * 60 + tmp[2]
+    itmp = _search_string('Iterations / sec', txt)
+    if itmp >= 0:
+        out_dict['it_per_s'] = float(txt[itmp].split()[-1])
+    itmp = _search_string('Simulated time', txt)
+    if itmp >= 0:
+        tmp = txt[itmp].split()
+        out_dict['simulation_time'] = float(tmp[-2])
+        out_dict['simulation_time_unit'] = tmp[-1]
+    itmp = _search_string('Number of  Errors', txt)
+    if itmp >= 0:
+        out_dict['num_errors'] = int(txt[itmp].split()[-1])
+    itmp = _search_string('Number of Warnings', txt)
+    if itmp >= 0:
+        out_dict['num_warnings'] = int(txt[itmp].split()[-1])
+    itmp = _search_string('Terminated', txt)
+    if itmp >= 0:
+        out_dict['simulation_mode'] = txt[itmp].split()[-3]
+    itmp = _search_string('Solver:', txt)
+    if itmp >= 0:
+        out_dict['solver'] = txt[itmp].split()[-1]
+    spirit_version_info = {}
+    for key in _VERSION_INFO_KEYS:
+        itmp = _search_string(key, txt)
+        if itmp >= 0:
+            spirit_version_info[key] = _version_info_value(txt[itmp])
+    out_dict['spirit_version_info'] = spirit_version_info
+    return out_dict
+
+
+def run_old(filename):
+    """Previous parser usage: readlines() + parse_outfile"""
+    with open(filename, 'r', encoding='utf-8') as _f:
+        txt = _f.readlines()
+    return parse_outfile_old(txt)
+
+
+def run_new(filename):
+    """Current parser usage: stream the file handle"""
+    with open(filename, 'rb') as _f:
+        return parse_outfile(_f)
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=float, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'spirit.stdout')
+        nsteps = int(args.size_mb * 1024**2 / len(STEP.format(1000000)))
+        with open(filename, 'w', encoding='utf-8') as _f:
+            _f.write(HEADER)
+            for istep in range(0, nsteps, 1000):
+                _f.write(''.join(
+                    STEP.format(i)
+                    for i in range(istep, min(istep + 1000, nsteps))))
+            _f.write(FOOTER)
+        print(
+            f'synthetic stdout: {os.path.getsize(filename) / 1024**2:.0f} MiB')
+
+        t0 = time.perf_counter()
+        result_new = run_new(filename)
+        t_new = time.perf_counter() - t0
+        print(f'single pass parser: {t_new:8.2f} s')
+
+        t0 = time.perf_counter()
+        result_old = run_old(filename)
+        t_old = time.perf_counter() - t0
+        print(
+            f'previous parser:    {t_old:8.2f} s  (speedup {t_old / t_new:.1f}x)'
+        )
+
+        # the termination reason is only parsed by the current parser
+        assert result_new.pop('termination_reason') == 'The force converged'
+        assert result_old == result_new
+
+
+if __name__ == '__main__':
+    main()
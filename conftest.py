@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 """pytest fixtures for simplified testing."""
 from __future__ import absolute_import
+import os
 import pytest
+from aiida_spirit.tools.helpers import prepare_test_inputs
 pytest_plugins = ['aiida.manage.tests.pytest_fixtures']
 
 
@@ -15,3 +17,18 @@ def spirit_code(aiida_local_code_factory):
     """Get a spirit code.
     """
     return aiida_local_code_factory(executable='python', entry_point='spirit')
+
+
+@pytest.fixture(scope='function')
+def spirit_inputs(spirit_code):  # pylint: disable=redefined-outer-name
+    """Get the inputs of a spirit calculation with the test input files and 5 mins max runtime.
+    """
+    inputs = prepare_test_inputs(
+        os.path.join(os.path.dirname(os.path.realpath(__file__)), 'tests',
+                     'input_files'))
+    inputs['code'] = spirit_code
+    inputs['metadata']['options'] = {
+        # 5 mins max runtime
+        'max_wallclock_seconds': 300
+    }
+    return inputs
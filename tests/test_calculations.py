@@ -2,12 +2,18 @@
 """ Tests for calculations
 
 """
+import gzip
+import io
 import os
 import numpy as np
+import pytest
 from aiida.plugins import CalculationFactory
 from aiida.orm import StructureData, Dict, ArrayData
 from aiida.engine import run, run_get_node
 from aiida_spirit.tools.helpers import prepare_test_inputs
+from aiida_spirit.tools.writers import write_couplings
+from aiida_spirit.data.spin_configuration import SpinConfigurationData
+from aiida_spirit.calculations import _get_extra
 
 from . import TEST_DIR
 
@@ -220,6 +226,583 @@ def test_spirit_calc_with_param(spirit_code):
     assert mag_mean[2] > 0.80
 
 
+def test_spirit_calc_shared_couplings(spirit_inputs, tmp_path):
+    """Test running two calculations that share the couplings file in a folder on the remote
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['metadata']['options']['shared_couplings_folder'] = str(tmp_path /
+                                                                   'shared')
+
+    nodes = []
+    for _ in range(2):
+        result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+        assert node.is_finished_ok
+        workdir = result['remote_folder'].get_remote_path()
+        assert os.path.islink(os.path.join(workdir, 'couplings.txt'))
+        nodes.append(node)
+
+    # the couplings file was uploaded only with the first calculation
+    assert 'couplings.txt' in nodes[0].list_object_names()
+    assert 'couplings.txt' not in nodes[1].list_object_names()
+    assert _get_extra(nodes[0], 'shared_couplings') == _get_extra(
+        nodes[1], 'shared_couplings')
+    assert len(os.listdir(tmp_path / 'shared')) == 1
+
+
+def test_spirit_calc_couplings_npz(spirit_inputs):
+    """Test running a calculation where the couplings are uploaded as compressed binary arrays
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'LLG',
+            'solver': 'Depondt',
+            'couplings_format': 'npz',
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+    check_outcome(result)
+
+    # the couplings file was created on the compute node with the same content as the text mode
+    workdir = result['remote_folder'].get_remote_path()
+    assert 'couplings.npz' in os.listdir(workdir)
+    expected = io.StringIO()
+    write_couplings(expected, [inputs['jij_data'].get_array('Jij_expanded')])
+    with open(os.path.join(workdir, 'couplings.txt'), encoding='utf-8') as _f:
+        assert _f.read() == expected.getvalue()
+
+
+def test_spirit_calc_ovf_binary(spirit_inputs):
+    """Test running a calculation with binary OVF files for the initial state and the output spins
+    which are gzip compressed on the compute node
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['parameters'] = Dict(dict={
+        'llg_n_iterations': 10,
+        'llg_n_iterations_log': 10
+    })
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'LLG',
+            'solver': 'Depondt',
+            'ovf_format': 'binary8',
+            'compression': 'gzip',
+        })
+    # 5x5x5 spins of the default n_basis_cells, directions are normalized by the plugin
+    initial_state = np.random.default_rng(42).normal(size=(125, 3))
+    init = ArrayData()
+    init.set_array('initial_state', initial_state)
+    inputs['initial_state'] = init
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+
+    workdir = result['remote_folder'].get_remote_path()
+    assert 'initial_state.ovf' in os.listdir(workdir)
+    # the output files are compressed on the compute node
+    assert 'spirit_Image-00_Spins-final.ovf' not in os.listdir(workdir)
+    with gzip.open(os.path.join(workdir, 'spirit_Image-00_Spins-final.ovf.gz'),
+                   'rb') as _f:
+        assert b'# Begin: Data Binary 8' in _f.read()
+    assert 'energies' in result
+
+    assert isinstance(result['magnetization'], SpinConfigurationData)
+    m_init = result['magnetization'].get_array('initial')
+    expected = initial_state / np.linalg.norm(initial_state,
+                                              axis=1)[:, np.newaxis]
+    assert np.allclose(m_init, expected)
+
+    # observables of the final state are stored in the output parameters
+    m_final = result['magnetization'].get_array('final')
+    assert np.allclose(result['output_parameters']['magnetization'],
+                       m_final.mean(axis=0))
+    assert 'topological_charge' not in result['output_parameters'].get_dict()
+
+
+def test_spirit_calc_retrieve_minimal(spirit_inputs):
+    """Test running a calculation where the observables are computed on the compute node
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['parameters'] = Dict(dict={
+        'llg_n_iterations': 10,
+        'llg_n_iterations_log': 10
+    })
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'LLG',
+            'solver': 'Depondt',
+            'retrieve_profile': 'minimal',
+            'profile_phases': True,
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+    assert node.get_retrieve_temporary_list() == ['summary.json']
+
+    # spirit did not write the spin configurations, only the summary
+    workdir = result['remote_folder'].get_remote_path()
+    assert 'spirit_Image-00_Spins-final.ovf' not in os.listdir(workdir)
+    assert 'magnetization' not in result
+    assert 'energies' not in result
+    output_parameters = result['output_parameters'].get_dict()
+    assert len(output_parameters['magnetization']) == 3
+    assert output_parameters['n_defects'] == 0
+    assert 'energy_per_spin' in output_parameters
+
+    # wall-clock time and peak memory of the phases of the run
+    timings = output_parameters['timings']
+    assert list(timings) == [
+        'import', 'couplings', 'state_setup', 'configuration', 'simulation',
+        'summary', 'state_teardown'
+    ]
+    assert timings['simulation']['wall_time'] > 0
+    assert timings['simulation']['peak_rss_mb'] > 0
+
+
+def test_spirit_calc_quiet(spirit_inputs):
+    """Test running a calculation in the quiet mode where the output parameters are created from run_info.json
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['parameters'] = Dict(dict={
+        'llg_n_iterations': 100,
+        'llg_n_iterations_log': 10
+    })
+    inputs['run_options'] = Dict(dict={
+        'simulation_method': 'LLG',
+        'solver': 'Depondt',
+        'quiet': True,
+    })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+    assert 'run_info.json' in result['retrieved'].list_object_names()
+    with result['retrieved'].open('spirit.stdout') as _f:
+        assert 'Completed' not in _f.read()
+
+    output_parameters = result['output_parameters'].get_dict()
+    assert output_parameters['n_iterations'] == 100
+    assert output_parameters['simulation_mode'] == 'LLG'
+    assert output_parameters['solver'] == 'Depondt'
+    assert output_parameters['num_errors'] == 0
+    assert output_parameters['simulation_time_unit'] == 'ps'
+    assert output_parameters['spirit_version_info']['Pinning'] in [
+        'Pinning is enabled', 'Pinning is not enabled'
+    ]
+    assert 'magnetization' in result
+
+
+def test_spirit_calc_restart(spirit_inputs):
+    """Test continuing an LLG run from the spin configurations in the remote folder of a killed run
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    # simulate a job that was killed after the snapshot of iteration 150
+    inputs['metadata']['options'][
+        'append_text'] = 'rm spirit_Image-00_Spins-final.ovf spirit_Image-00_Spins_200.ovf'
+    inputs['parameters'] = Dict(
+        dict={
+            'llg_n_iterations': 200,
+            'llg_n_iterations_log': 50,
+            'llg_force_convergence': 1e-30,
+        })
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'LLG',
+            'solver': 'Depondt',
+            'quiet': True,
+            'checkpoint_interval': 0.01,
+        })
+
+    _, parent = run_get_node(CalculationFactory('spirit'), **inputs)
+    with parent.outputs.retrieved.open('run_spirit.py') as _f:
+        assert 'PeriodicCheckpoint' in _f.read()
+
+    # only the remaining iterations are run
+    inputs['metadata']['options'].pop('append_text')
+    inputs['parent_folder'] = parent.outputs.remote_folder
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+    output_parameters = result['output_parameters'].get_dict()
+    # the snapshot of iteration 150 or a later checkpoint
+    assert 150 <= output_parameters['restart']['iteration'] <= 200
+    assert output_parameters['n_iterations'] == max(
+        200 - output_parameters['restart']['iteration'], 1)
+    n_done = output_parameters['restart']['iteration'] + output_parameters[
+        'n_iterations']
+
+    # the iterations of the restarted run are carried over to the next restart
+    inputs['parameters'] = Dict(
+        dict={
+            'llg_n_iterations': 300,
+            'llg_n_iterations_log': 50,
+            'llg_force_convergence': 1e-30,
+        })
+    inputs['parent_folder'] = node.outputs.remote_folder
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+    output_parameters = result['output_parameters'].get_dict()
+    assert output_parameters['restart'] == {
+        'file': 'spirit_Image-00_Spins-final.ovf',
+        'iteration': n_done
+    }
+    assert output_parameters['n_iterations'] == 300 - n_done
+
+
+def test_spirit_calc_max_walltime(spirit_inputs):
+    """Test that spirit stops the simulation before the job is killed and that the run can be continued
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['parameters'] = Dict(
+        dict={
+            'llg_n_iterations': 10**8,
+            'llg_n_iterations_log': 10**4,
+            'llg_force_convergence': 1e-30,
+        })
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'LLG',
+            'solver': 'Depondt',
+            # spirit stops after 2 seconds
+            'walltime_margin': 298,
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.exit_status == node.process_class.exit_codes.ERROR_MAX_WALLTIME_REACHED.status
+    with result['retrieved'].open('input_created.cfg') as _f:
+        assert ['llg_max_walltime', '0:0:2'] in [line.split() for line in _f]
+    assert result['output_parameters'][
+        'termination_reason'] == 'The maximum walltime has been reached'
+    # the final state is written
+    assert 'magnetization' in result
+
+    # the restart is stopped again (the termination reason is also found in the quiet mode)
+    inputs['run_options'] = Dict(
+        dict=dict(inputs['run_options'].get_dict(), quiet=True))
+    inputs['parent_folder'] = node.outputs.remote_folder
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.exit_status == node.process_class.exit_codes.ERROR_MAX_WALLTIME_REACHED.status
+    output_parameters = result['output_parameters'].get_dict()
+    assert output_parameters[
+        'termination_reason'] == 'The maximum walltime has been reached'
+    assert output_parameters['restart'][
+        'file'] == 'spirit_Image-00_Spins-final.ovf'
+    assert output_parameters['restart']['iteration'] > 0
+
+
+@pytest.mark.parametrize('quiet', [True, False])
+def test_spirit_calc_stationary(spirit_inputs, quiet):
+    """Test that a finite-temperature LLG run is stopped once the energy and the magnetization are stationary
+    (the run info of the stdout and the run_info.json is summed up over the chunks)
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['parameters'] = Dict(
+        dict={
+            'llg_n_iterations': 10**6,
+            'llg_n_iterations_log': 50,
+            'llg_temperature': 10.,
+        })
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'LLG',
+            'solver': 'Depondt',
+            'configuration': {
+                'plus_z': True
+            },
+            'quiet': quiet,
+            'stationarity': {
+                'chunk_iterations': 100,
+                'window': 5,
+                'n_sigma': 2,
+                'averaging_iterations': 500
+            },
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+    output_parameters = result['output_parameters'].get_dict()
+    stationarity = output_parameters['stationarity']
+    assert stationarity['stop_reason'] == 'stationary'
+    # at least two windows of chunks and the averaging iterations are needed
+    assert stationarity['stationary_iteration'] >= 1000
+    assert stationarity[
+        'n_iterations'] == stationarity['stationary_iteration'] + 500
+    assert stationarity['n_iterations'] + stationarity[
+        'n_iterations_saved'] == 10**6
+    assert stationarity['n_averaged'] == 5
+    assert 'run_info' not in stationarity
+    assert 'termination_reason' not in output_parameters
+    assert np.isclose(output_parameters['it_per_s'] *
+                      output_parameters['runtime_sec'],
+                      stationarity['n_iterations'],
+                      rtol=1e-2)
+    if quiet:
+        assert stationarity['n_iterations'] == output_parameters[
+            'n_iterations']
+    # ordered ferromagnet (mu_s=2) at low temperature
+    assert 1.9 < stationarity['magnetization_norm'] <= 2
+    assert stationarity['energy_per_spin'] < 0
+    # the iterations of the energy archive are continued in every chunk
+    iterations = result['energies'].get_array('energies')[:, 0]
+    assert np.all(np.diff(iterations) >= 0)
+    assert iterations[-1] == stationarity['n_iterations']
+
+
+def test_spirit_calc_mc(spirit_inputs):
+    """Test running a Monte Carlo calculation
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'MC',
+            'solver': 'Depondt',
+            'mc_configuration': {
+                'n_thermalisation': 200,
+                'n_decorrelation': 2,
+                'n_samples': 50,
+                'n_temperatures': 3,
+                'T_start': 10,
+                'T_end': 2000,
+            },
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+
+    monte_carlo = result['monte_carlo']
+    assert np.allclose(monte_carlo.get_array('temperature'), [10, 1005, 2000])
+    for name in [
+            'energy', 'magnetization', 'susceptibility', 'specific_heat',
+            'binder_cumulant'
+    ]:
+        assert np.all(np.isfinite(monte_carlo.get_array(name)))
+    # thermalised at low temperature: ordered ferromagnet (mu_s=2) with the lowest energy
+    magnetization = monte_carlo.get_array('magnetization')
+    assert magnetization[0] > 1.9
+    assert magnetization[0] > magnetization[-1]
+    assert np.argmin(monte_carlo.get_array('energy')) == 0
+    # statistics of the samples
+    assert np.all(monte_carlo.get_array('n_samples') == 50)
+    assert np.all(monte_carlo.get_array('n_decorrelation') == 2)
+    assert np.all(monte_carlo.get_array('n_effective_samples') <= 50 * 1.2)
+    assert np.all(monte_carlo.get_array('energy_error') >= 0)
+    assert np.all(monte_carlo.get_array('magnetization_error') >= 0)
+
+
+def test_spirit_calc_mc_adaptive(spirit_inputs):
+    """Test a Monte Carlo calculation that adapts the decorrelation and stops at a target error
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'MC',
+            'solver': 'Depondt',
+            'mc_configuration': {
+                'n_thermalisation': 200,
+                'n_decorrelation': 1,
+                'n_samples': 512,
+                'n_temperatures': 3,
+                'T_start': 10,
+                'T_end': 2000,
+                'target_energy_error': 0.3,
+                'min_samples': 128,
+                'max_decorrelation': 3,
+            },
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+
+    monte_carlo = result['monte_carlo']
+    n_samples = monte_carlo.get_array('n_samples')
+    energy_error = monte_carlo.get_array('energy_error')
+    assert np.all((n_samples >= 128) & (n_samples <= 512))
+    # the sampling stops at the target error unless the maximal number of samples is reached
+    assert np.all((energy_error <= 0.3) | (n_samples == 512))
+    # the ordered state at the lowest temperature converges with the first samples
+    assert n_samples[0] == 128
+    n_decorrelation = monte_carlo.get_array('n_decorrelation')
+    assert np.all((n_decorrelation >= 1) & (n_decorrelation <= 3))
+    assert monte_carlo.get_array('magnetization')[0] > 1.9
+
+
+def test_spirit_calc_mc_restart(spirit_inputs):
+    """Test that a partial output_mc.txt (e.g. of a killed run) is parsed and that
+    the temperature scan can be restarted from it
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    # simulate a job that was killed after the first temperature
+    inputs['metadata']['options']['append_text'] = (
+        'head -n 2 output_mc.txt > output_mc.tmp && '
+        'mv output_mc.tmp output_mc.txt')
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'MC',
+            'solver': 'Depondt',
+            'mc_configuration': {
+                'n_thermalisation': 200,
+                'n_decorrelation': 2,
+                'n_samples': 50,
+                'n_temperatures': 3,
+                'T_start': 10,
+                'T_end': 2000,
+            },
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.exit_status == node.process_class.exit_codes.ERROR_MC_INCOMPLETE.status
+    partial = result['monte_carlo']
+    assert np.allclose(partial.get_array('temperature'), [10])
+
+    # the restart only samples the missing temperatures
+    inputs['metadata']['options'].pop('append_text')
+    inputs['monte_carlo_restart'] = partial
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+
+    monte_carlo = result['monte_carlo']
+    assert np.allclose(monte_carlo.get_array('temperature'), [10, 1005, 2000])
+    for name in partial.get_arraynames():
+        assert np.allclose(
+            monte_carlo.get_array(name)[0],
+            partial.get_array(name)[0])
+    assert np.all(monte_carlo.get_array('n_samples') == 50)
+    assert monte_carlo.get_array('magnetization')[0] > monte_carlo.get_array(
+        'magnetization')[-1]
+
+
+def test_spirit_calc_mc_workers(spirit_inputs):
+    """Test a Monte Carlo calculation in which the temperatures are sampled by 2 worker processes (quiet mode)
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'MC',
+            'solver': 'Depondt',
+            'mc_configuration': {
+                'n_thermalisation': 200,
+                'n_decorrelation': 2,
+                'n_samples': 50,
+                'n_temperatures': 3,
+                'T_start': 10,
+                'T_end': 2000,
+                'n_workers': 2,
+                'n_threads': 1,
+            },
+            'quiet': True,
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+
+    # the results of the workers are merged in the order of the temperatures
+    monte_carlo = result['monte_carlo']
+    assert np.allclose(monte_carlo.get_array('temperature'), [10, 1005, 2000])
+    magnetization = monte_carlo.get_array('magnetization')
+    assert magnetization[0] > 1.9
+    assert magnetization[0] > magnetization[-1]
+    assert np.argmin(monte_carlo.get_array('energy')) == 0
+    assert 'atom_types' in result
+    # run_info.json is written by the first worker
+    assert result['output_parameters']['num_errors'] == 0
+
+
+def test_spirit_calc_pt(spirit_inputs):
+    """Test a parallel tempering Monte Carlo calculation
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'PT',
+            'solver': 'Depondt',
+            'mc_configuration': {
+                'n_thermalisation': 200,
+                'n_decorrelation': 2,
+                'n_samples': 50,
+                'n_temperatures': 4,
+                'T_start': 10,
+                'T_end': 2000,
+                'exchange_interval': 5,
+            },
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.is_finished_ok
+
+    monte_carlo = result['monte_carlo']
+    assert np.allclose(monte_carlo.get_array('temperature'),
+                       np.linspace(10, 2000, 4))
+    for name in [
+            'energy', 'magnetization', 'susceptibility', 'specific_heat',
+            'binder_cumulant'
+    ]:
+        assert np.all(np.isfinite(monte_carlo.get_array(name)))
+    magnetization = monte_carlo.get_array('magnetization')
+    assert magnetization[0] > 1.9
+    assert magnetization[0] > magnetization[-1]
+    assert np.argmin(monte_carlo.get_array('energy')) == 0
+    # acceptance rate of the swaps with the next temperature (none for the highest temperature)
+    acceptance = monte_carlo.get_array('exchange_acceptance')
+    assert np.all((acceptance[:-1] >= 0) & (acceptance[:-1] <= 1))
+    assert np.isnan(acceptance[-1])
+
+
+def test_spirit_calc_pt_max_walltime(spirit_inputs):
+    """Test that the parallel tempering stops the sampling before the walltime is reached
+    this actually runs spirit and therefore needs
+    to have spirit installed in the python environment."""
+
+    inputs = spirit_inputs
+    inputs['run_options'] = Dict(
+        dict={
+            'simulation_method': 'PT',
+            'solver': 'Depondt',
+            # the sampling stops after two seconds
+            'walltime_margin': 298,
+            'mc_configuration': {
+                'n_thermalisation': 200,
+                'n_decorrelation': 2,
+                'n_samples': 10**7,
+                'n_temperatures': 4,
+                'T_start': 10,
+                'T_end': 2000,
+            },
+        })
+
+    result, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert node.exit_status == node.process_class.exit_codes.ERROR_MAX_WALLTIME_REACHED.status
+    # the results of the samples that were taken are stored for all temperatures
+    n_samples = result['monte_carlo'].get_array('n_samples')
+    assert len(n_samples) == 4
+    assert np.all((n_samples > 0) & (n_samples < 10**7))
+    assert np.all(np.isfinite(result['monte_carlo'].get_array('energy')))
+
+
 def check_outcome(result, threshold=1e-5):
     """check the result of a spirit calculation
     Checks if retrieved is there and if the output inside of the retreived makes sense"""
@@ -247,6 +830,12 @@ def check_outcome(result, threshold=1e-5):
     assert int(errors) == 0
     assert int(warnings) == 0
 
+    # the parse time of every file is recorded
+    parser_timings = result['output_parameters']['parser_timings']
+    assert set(parser_timings) >= {
+        'spirit.stdout', 'spirit_Image-00_Spins-final.ovf'
+    }
+
     # check if initial and final spin image make sense
     spins_initial = result['magnetization'].get_array('initial')
     var_initial = np.std(spins_initial, axis=0).max()
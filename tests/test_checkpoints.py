@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+""" Tests for the checkpoints of LLG runs and the search of the restart file
+
+"""
+import json
+import threading
+from aiida_spirit.tools.checkpoints import (read_ovf_iteration,
+                                            is_complete_ovf, find_restart_file,
+                                            write_restart_info,
+                                            temporary_filename,
+                                            PeriodicCheckpoint)
+
+
+def _write_spins(path, iteration=None, complete=True):
+    """Write a small text OVF file like spirit does (the iteration is in the description of the header)"""
+    lines = [
+        '# OOMMF OVF 2.0', '# Segment count: 000001', '# Begin: Segment',
+        '# Begin: Header'
+    ]
+    if iteration is not None:
+        lines += [
+            '# Desc: LLG simulation (Depondt solver)',
+            f'# Desc:      Iteration: {iteration}'
+        ]
+    lines += ['# End: Header', '# Begin: Data Text', '0 0 1', '0 0 1']
+    if complete:
+        lines += ['# End: Data Text', '# End: Segment']
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def test_read_ovf_iteration(tmp_path):
+    """The iteration is read from the header, files of a killed job are detected"""
+    _write_spins(tmp_path / 'spins.ovf', 1000)
+    assert read_ovf_iteration(tmp_path / 'spins.ovf') == 1000
+    assert is_complete_ovf(tmp_path / 'spins.ovf')
+
+    _write_spins(tmp_path / 'spins.ovf', None, complete=False)
+    assert read_ovf_iteration(tmp_path / 'spins.ovf') is None
+    assert not is_complete_ovf(tmp_path / 'spins.ovf')
+
+
+def test_find_restart_file(tmp_path):
+    """The complete spin configuration with the largest iteration is found"""
+    assert find_restart_file(tmp_path) == (None, 0)
+
+    _write_spins(tmp_path / 'spirit_Image-00_Spins-initial.ovf', 0)
+    _write_spins(tmp_path / 'spirit_Image-00_Spins_100.ovf', 100)
+    _write_spins(tmp_path / 'spirit_Image-00_Spins-checkpoint.ovf', 170)
+    # the job was killed while this snapshot was written
+    _write_spins(tmp_path / 'spirit_Image-00_Spins_200.ovf',
+                 200,
+                 complete=False)
+    # not a spin configuration of spirit
+    _write_spins(tmp_path / 'other.ovf', 300)
+    filename, iteration = find_restart_file(tmp_path)
+    assert filename.endswith('spirit_Image-00_Spins-checkpoint.ovf')
+    assert iteration == 170
+
+    _write_spins(tmp_path / 'spirit_Image-00_Spins-final.ovf', 200)
+    filename, iteration = find_restart_file(tmp_path)
+    assert filename.endswith('spirit_Image-00_Spins-final.ovf')
+    assert iteration == 200
+
+    # the previous run was itself continued from iteration 1000
+    write_restart_info(tmp_path / 'restart_info.json', filename, 1000)
+    assert find_restart_file(tmp_path, 'restart_info.json')[1] == 1200
+    with open(tmp_path / 'restart_info.json', encoding='utf-8') as _f:
+        assert json.load(_f) == {
+            'file': 'spirit_Image-00_Spins-final.ovf',
+            'iteration': 1000
+        }
+
+
+def test_periodic_checkpoint(tmp_path):
+    """Checkpoints are written in the background and replace the previous checkpoint"""
+    filename = str(tmp_path / 'checkpoint.ovf')
+    written = threading.Event()
+    calls = []
+
+    def write(tmp_filename):
+        calls.append(tmp_filename)
+        if len(calls) == 1:
+            # e.g. the simulation did not start yet
+            return False
+        _write_spins(tmp_path / tmp_filename, len(calls))
+        if len(calls) == 3:
+            written.set()
+        return True
+
+    with PeriodicCheckpoint(write, filename, interval=0.01) as checkpoint:
+        assert written.wait(10)
+    assert checkpoint.n_written >= 2
+    assert all(tmp_filename == temporary_filename(filename)
+               for tmp_filename in calls)
+    assert read_ovf_iteration(filename) == len(calls)
+    assert not (tmp_path / 'tmp_checkpoint.ovf').exists()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+""" Tests for the compression of the output files
+
+"""
+import io
+import os
+import numpy as np
+import pytest
+from aiida_spirit.tools.compression import compress_file, open_decompressed
+from aiida_spirit.tools.ovf import write_ovf, read_ovf
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_compress_roundtrip(tmp_path, compression):
+    """Compress a text OVF file and read it back with the streaming decompression"""
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    spins = np.random.default_rng(42).normal(size=(1000, 3))
+    filename = str(tmp_path / 'spins.ovf')
+    with open(filename, 'wb') as _f:
+        write_ovf(_f, [spins], len(spins), ovf_format='text')
+    size = os.path.getsize(filename)
+
+    compressed_name = compress_file(filename, compression)
+    assert not os.path.exists(filename)
+    assert os.path.getsize(compressed_name) < size
+
+    with open(compressed_name, 'rb') as _f:
+        assert np.allclose(read_ovf(open_decompressed(_f, compression)), spins)
+
+
+def test_open_decompressed_text():
+    """Uncompressed handles are passed through (and wrapped for text mode)"""
+    handle = io.BytesIO(b'# header\n1 2 3\n')
+    assert open_decompressed(handle) is handle
+    assert np.allclose(
+        np.loadtxt(open_decompressed(io.BytesIO(b'1 2 3\n'), text=True)),
+        [1, 2, 3])
+    with pytest.raises(ValueError):
+        open_decompressed(handle, 'bzip2')
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+""" Tests for the local file cache of generated input files
+
+"""
+import os
+from aiida.plugins import CalculationFactory
+from aiida.engine import run_get_node
+from aiida_spirit.tools.file_cache import FileCache, CACHE_DIR_ENV
+from aiida_spirit.calculations import _get_extra
+
+
+def _write(path, content):
+    with open(path, 'w', encoding='utf-8') as _f:
+        _f.write(content)
+
+
+def test_file_cache_fetch_and_evict(tmp_path):
+    """Store files in the cache, fetch them and check the LRU eviction"""
+    cache = FileCache(tmp_path / 'cache', max_size=25)
+    src = tmp_path / 'src.txt'
+
+    key1 = cache.make_key('couplings.txt', 'hash1', None)
+    assert key1 != cache.make_key('couplings.txt', 'hash1', 2.0)
+    assert not cache.fetch(key1, str(tmp_path / 'dest.txt'))
+
+    _write(src, 10 * 'a')
+    cache.store(key1, str(src))
+    assert cache.fetch(key1, str(tmp_path / 'dest.txt'))
+    with open(tmp_path / 'dest.txt', encoding='utf-8') as _f:
+        assert _f.read() == 10 * 'a'
+
+    # two more files exceed the maximal size, key2 is the least recently used one
+    key2, key3 = cache.make_key('2'), cache.make_key('3')
+    _write(src, 10 * 'b')
+    cache.store(key2, str(src))
+    os.utime(cache.get_path(key2), (0, 0))
+    _write(src, 10 * 'c')
+    cache.store(key3, str(src))
+    assert os.path.exists(cache.get_path(key1))
+    assert not os.path.exists(cache.get_path(key2))
+    assert os.path.exists(cache.get_path(key3))
+
+
+def test_file_cache_dry_run(spirit_inputs, tmp_path, monkeypatch):
+    """The second calculation with the same jij_data reuses the cached couplings file"""
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+
+    inputs = spirit_inputs
+    inputs['metadata']['dry_run'] = True
+
+    _, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert _get_extra(node, 'file_cache') == {'couplings.txt': 'miss'}
+    _, node = run_get_node(CalculationFactory('spirit'), **inputs)
+    assert _get_extra(node, 'file_cache') == {'couplings.txt': 'hit'}
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+""" Tests for the import time of the plugin entry points
+
+"""
+import subprocess
+import sys
+
+# modules that are imported by the daemon workers and by verdi
+ENTRY_POINT_MODULES = [
+    'aiida_spirit.calculations', 'aiida_spirit.parsers',
+    'aiida_spirit.tools.plotting'
+]
+# heavy dependencies that should only be imported when they are actually used
+LAZY_MODULES = ['pandas', 'masci_tools', 'IPython']
+# budget for the import time spent in the aiida_spirit modules themselves (i.e. without aiida-core, numpy, ...)
+SELF_TIME_BUDGET_US = 200000
+
+
+def _get_import_times(modules):
+    """Import the modules in a fresh interpreter and return the self time (in us) of all imported modules"""
+    code = '; '.join(f'import {module}' for module in modules)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True,
+                          text=True,
+                          check=True)
+    import_times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        import_times[name.strip()] = int(self_time)
+    return import_times
+
+
+def test_import_time_budget():
+    """Importing the entry points does not import heavy dependencies and stays within the time budget"""
+    import_times = _get_import_times(ENTRY_POINT_MODULES)
+
+    for module in LAZY_MODULES:
+        imported = [
+            name for name in import_times
+            if name == module or name.startswith(module + '.')
+        ]
+        assert imported == [], f'{module} is imported with the entry points'
+
+    self_time = sum(time for name, time in import_times.items()
+                    if name.startswith('aiida_spirit'))
+    assert self_time < SELF_TIME_BUDGET_US
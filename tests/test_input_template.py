@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+""" Tests for the precompiled input config template
+
+"""
+from aiida_spirit.data._input_template import InputTemplate
+
+
+def test_input_template_render():
+    """Only the lines of the given keys are changed, the whitespace after the key is kept"""
+    lines = [
+        '### comment llg_temperature 1\n', '\n', 'llg_temperature  0\n',
+        'bravais_lattice sc\n', 'log_to_file 1\n'
+    ]
+    template = InputTemplate(lines)
+    assert 'llg_temperature' in template
+    assert '###' not in template
+
+    rendered = template.render(
+        {
+            'llg_temperature': ' 5.0',
+            'unknown_key': '1'
+        },
+        replacements={'bravais_lattice': 'bravais_vectors\n1 0 0\n'})
+    assert rendered == [
+        '### comment llg_temperature 1\n', '\n', 'llg_temperature   5.0\n',
+        'bravais_vectors\n1 0 0\n', 'log_to_file 1\n'
+    ]
+    # the template itself is not modified
+    assert template.lines == lines
+
+
+def test_input_template_get():
+    """The values of the template are returned as strings"""
+    template = InputTemplate([
+        '### llg_temperature 1\n', 'llg_temperature  0\n',
+        'llg_output_any 1\n', 'bravais_lattice\n'
+    ])
+    assert template.get('llg_temperature') == '0'
+    assert template.get('llg_output_any') == '1'
+    assert template.get('bravais_lattice') == ''
+    assert template.get('unknown_key') is None
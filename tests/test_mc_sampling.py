@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+""" Tests for the online accumulators, the binning analysis and the replica exchange of the MC sampling
+
+"""
+import numpy as np
+from aiida_spirit.tools.mc_sampling import (OnlineMoments, BinningAnalysis,
+                                            MCAccumulator, ReplicaExchange,
+                                            adapt_decorrelation)
+
+
+def test_online_moments():
+    """Welford mean and variance agree with numpy, also for a large offset"""
+    values = 1e8 + np.random.default_rng(42).normal(size=1000)
+    moments = OnlineMoments()
+    for value in values:
+        moments.add(value)
+    assert moments.count == 1000
+    assert np.isclose(moments.mean, values.mean(), rtol=1e-14)
+    assert np.isclose(moments.variance, values.var(), rtol=1e-8)
+    assert OnlineMoments().variance == 0.
+
+
+def test_mc_accumulator():
+    """Observables of the accumulated samples"""
+    rng = np.random.default_rng(42)
+    energies = rng.normal(-100, 2, size=500)
+    magnetizations = rng.uniform(0.5, 1, size=500)
+    accumulator = MCAccumulator()
+    for energy, magnetization in zip(energies, magnetizations):
+        accumulator.add(energy, magnetization)
+
+    energy, magnetization, chi, c_v, cumulant = accumulator.observables(
+        10., 0.5)
+    assert np.isclose(energy, energies.mean())
+    assert np.isclose(magnetization, magnetizations.mean())
+    assert np.isclose(chi, magnetizations.var() / 5.)
+    assert np.isclose(c_v, energies.var() / 50.)
+    assert np.isclose(
+        cumulant,
+        1 - np.mean(magnetizations**4) / (3 * np.mean(magnetizations**2)**2))
+
+
+def _ar1(rho, size, seed=1):
+    """Correlated time series with the integrated autocorrelation time 0.5 * (1 + rho) / (1 - rho)"""
+    noise = np.random.default_rng(seed).normal(size=size)
+    values = np.empty(size)
+    values[0] = noise[0]
+    for i in range(1, size):
+        values[i] = rho * values[i - 1] + noise[i]
+    return values
+
+
+def test_binning_analysis():
+    """Binning errors and autocorrelation times of uncorrelated and correlated samples"""
+    values = np.random.default_rng(42).normal(size=2**14)
+    binning = BinningAnalysis()
+    for value in values:
+        binning.add(value)
+    assert binning.count == 2**14
+    assert np.isclose(binning.mean, values.mean())
+    assert np.isclose(binning.error,
+                      values.std() / np.sqrt(len(values)),
+                      rtol=0.2)
+    assert binning.autocorrelation_time < 1
+
+    values = _ar1(0.8, 2**16)
+    binning = BinningAnalysis()
+    for value in values:
+        binning.add(value)
+    # tau_int = 4.5: the naive error underestimates the error by a factor of 3
+    assert np.isclose(binning.autocorrelation_time, 4.5, rtol=0.25)
+    assert binning.error > 2.5 * values.std() / np.sqrt(len(values))
+
+    # the error of constant values vanishes
+    binning = BinningAnalysis()
+    for _ in range(100):
+        binning.add(1.)
+    assert binning.error == 0.
+    assert binning.autocorrelation_time == 0.5
+
+
+def test_adapt_decorrelation():
+    """Decorrelation that makes the samples approximately uncorrelated"""
+    assert adapt_decorrelation(2, 0.5, 100) == 2
+    assert adapt_decorrelation(2, 0.9, 100) == 2
+    assert adapt_decorrelation(2, 5., 100) == 20
+    assert adapt_decorrelation(2, 500., 100) == 100
+
+
+def test_mc_accumulator_statistics():
+    """Errors, effective number of samples and convergence check"""
+    accumulator = MCAccumulator()
+    for energy, magnetization in zip(_ar1(0.8, 2**14), _ar1(0.5, 2**14,
+                                                            seed=2)):
+        accumulator.add(energy, magnetization)
+    energy_error, magnetization_error, n_samples, n_effective = accumulator.statistics(
+    )
+    assert n_samples == 2**14
+    assert energy_error == accumulator.energy.error
+    assert magnetization_error == accumulator.magnetization.error
+    # the energy has the larger autocorrelation time
+    assert np.isclose(n_effective,
+                      2**14 / (2 * accumulator.energy.autocorrelation_time))
+    assert accumulator.converged(energy_error * 1.01,
+                                 magnetization_error * 1.01)
+    assert not accumulator.converged(energy_error * 0.99)
+    assert accumulator.converged()
+
+
+def test_replica_exchange():
+    """Swaps of neighbouring replicas alternate between the even and odd pairs"""
+    exchange = ReplicaExchange([1., 2., 3., 4.], 1., seed=42)
+    # the lower temperature has the higher energy: swaps are always accepted
+    assert exchange.propose([0., -1., -2., -3.]) == [(0, 1), (2, 3)]
+    assert exchange.propose([0., -1., -2., -3.]) == [(1, 2)]
+    assert exchange.n_attempts == [1, 1, 1]
+    assert exchange.acceptance_rates == [1., 1., 1.]
+
+    # ordered energies with a large gap: swaps are (practically) never accepted
+    for _ in range(10):
+        exchange.propose([-1000., -500., 0., 500.])
+    assert exchange.n_attempts == [6, 6, 6]
+    assert exchange.acceptance_rates == [1 / 6] * 3
+
+
+def test_replica_exchange_detailed_balance():
+    """Acceptance rate of a swap with a fixed energy difference is the Metropolis probability"""
+    exchange = ReplicaExchange([1., 2.], 1., seed=1)
+    # (beta_0 - beta_1) * (E_0 - E_1) = 0.5 * (-1)
+    for _ in range(20000):
+        exchange.propose([0., 1.])
+    assert exchange.n_attempts == [10000]
+    assert np.isclose(exchange.acceptance_rates[0], np.exp(-0.5), atol=0.02)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+""" Tests for the observables that are derived from spin configurations
+
+"""
+import numpy as np
+from aiida_spirit.tools.observables import get_observables, get_topological_charge
+
+
+def _skyrmion(n=40, radius=10.):
+    """Skyrmion (core pointing in -z) in a ferromagnetic background on a n x n square lattice"""
+    y, x = np.meshgrid(np.arange(n) - n / 2 + 0.5,
+                       np.arange(n) - n / 2 + 0.5,
+                       indexing='ij')
+    r = np.sqrt(x**2 + y**2)
+    theta = np.where(r < radius, np.pi * (1 - r / radius), 0.)
+    phi = np.arctan2(y, x)
+    spins = np.stack([
+        np.sin(theta) * np.cos(phi),
+        np.sin(theta) * np.sin(phi),
+        np.cos(theta)
+    ],
+                     axis=-1)
+    return spins.reshape(-1, 3)
+
+
+def test_topological_charge():
+    """A skyrmion has a charge of -1, the ferromagnet has zero charge"""
+    cell = np.eye(3)
+    spins = _skyrmion()
+    assert np.isclose(get_topological_charge(spins, [40, 40, 1], cell), -1.)
+    assert np.isclose(
+        get_topological_charge(spins, [40, 40, 1],
+                               cell,
+                               pbc=[True, True, False]), -1.)
+    # the sign depends on the orientation of the lattice vectors
+    assert np.isclose(
+        get_topological_charge(spins, [40, 40, 1],
+                               [[0, 1, 0], [1, 0, 0], [0, 0, 1]]), 1.)
+    ferro = np.zeros((40 * 40, 3))
+    ferro[:, 2] = 1
+    assert np.isclose(get_topological_charge(ferro, [40, 40, 1], cell), 0.)
+    # not defined for 3D systems
+    assert get_topological_charge(ferro, [40, 20, 2], cell) is None
+
+
+def test_observables_defects_sublattices():
+    """Magnetization with defects and two sublattices"""
+    # antiferromagnet with two atoms in the basis, one defect on the first sublattice
+    spins = np.zeros((8, 3))
+    spins[0::2, 2] = 1.
+    spins[1::2, 2] = -1.
+    spins[2] = 0.
+    atom_types = np.array([0, 1, -1, 1, 0, 1, 0, 1])
+
+    lattice_info = {
+        'n_basis_cells': [4, 1, 1],
+        'n_basis_atoms': 2,
+        'cell': np.eye(3)
+    }
+    observables = get_observables(spins, lattice_info, atom_types=atom_types)
+    assert np.allclose(observables['magnetization'], [0, 0, -1 / 8])
+    assert np.isclose(observables['magnetization_masked_abs'], 1 / 7)
+    assert observables['n_defects'] == 1
+    assert np.allclose(observables['magnetization_sublattices'],
+                       [[0, 0, 1], [0, 0, -1]])
+    assert np.allclose(observables['magnetization_atom_types']['0'], [0, 0, 1])
+    assert 'topological_charge' not in observables
+
+
+def test_observables_single_spin():
+    """A single spin gives a 0-d array of atom types when it is read with np.loadtxt"""
+    spins = np.array([[0., 0., 1.]])
+    lattice_info = {
+        'n_basis_cells': [1, 1, 1],
+        'n_basis_atoms': 1,
+        'cell': np.eye(3)
+    }
+    observables = get_observables(spins,
+                                  lattice_info,
+                                  atom_types=np.loadtxt(['0']))
+    assert np.allclose(observables['magnetization'], [0, 0, 1])
+    assert observables['n_defects'] == 0
+    assert np.allclose(observables['magnetization_atom_types']['0'], [0, 0, 1])
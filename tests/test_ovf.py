@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+""" Tests for reading and writing OVF files
+
+"""
+import io
+import numpy as np
+import pytest
+from aiida_spirit.tools.ovf import write_ovf, read_ovf
+
+
+@pytest.mark.parametrize('ovf_format', ['text', 'binary4', 'binary8'])
+def test_ovf_roundtrip(ovf_format):
+    """Write and read back spin directions in all OVF formats"""
+    spins = np.random.default_rng(0).normal(size=(11, 3))
+    handle = io.BytesIO()
+    assert write_ovf(handle, [spins[:4], spins[4:]],
+                     len(spins),
+                     ovf_format=ovf_format) == 11
+
+    handle.seek(0)
+    read = read_ovf(handle)
+    assert read.shape == (11, 3)
+    if ovf_format == 'binary4':
+        assert np.allclose(read, spins, rtol=1e-6)
+    else:
+        assert (read == spins).all()
+
+
+def test_ovf_wrong_check_value():
+    """A corrupted binary data segment is detected"""
+    handle = io.BytesIO()
+    write_ovf(handle, [np.zeros((2, 3))], 2, ovf_format='binary8')
+    content = handle.getvalue().replace(
+        np.array([123456789012345.0]).tobytes(),
+        np.array([1.0]).tobytes())
+    with pytest.raises(ValueError):
+        read_ovf(io.BytesIO(content))
+
+
+def test_ovf_text_chunks():
+    """Text data segments are parsed correctly across chunk boundaries, also with nan values"""
+    spins = np.random.default_rng(1).normal(size=(7, 3))
+    spins[2] = np.nan
+    handle = io.BytesIO()
+    write_ovf(handle, [spins], len(spins), ovf_format='text')
+    for chunk_size in [5, 64, 2**20]:
+        handle.seek(0)
+        read = read_ovf(handle, chunk_size=chunk_size)
+        assert np.array_equal(read, spins, equal_nan=True)
+
+    # missing lines in the data segment are detected
+    content = handle.getvalue().split(b'\n')
+    del content[-5]
+    with pytest.raises(ValueError):
+        read_ovf(io.BytesIO(b'\n'.join(content)), chunk_size=16)
+
+
+@pytest.mark.filterwarnings('error')
+@pytest.mark.parametrize('chunk_size', [7, 2**20])
+def test_ovf_text_no_warnings(chunk_size):
+    """The text parser stops at the end of the data segment without deprecated numpy functions"""
+    spins = np.random.default_rng(2).normal(size=(5, 3))
+    handle = io.BytesIO()
+    write_ovf(handle, [spins], len(spins), ovf_format='text')
+    # spirit writes further segments and comments after the data segment
+    handle.write(b'# Begin: Segment\n# Desc: 1 2 3\n')
+    handle.seek(0)
+    assert np.array_equal(read_ovf(handle, chunk_size=chunk_size), spins)
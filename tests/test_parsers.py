@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+""" Tests for the parser
+
+"""
+import io
+from aiida_spirit.parsers import parse_outfile, parse_run_info, _BLOCK_SIZE
+
+STDOUT = """2021-06-01 10:00:00  [  ALL  ] [ALL ] [--] [--]  =====================================================
+                                                 ========== Spirit State: Initialising... ============
+                                                 ==========     Version:  2.2.0
+                                                 ==========     Revision: e82250d3b1441
+2021-06-01 10:00:00  [ INFO  ] [ALL ] [--] [--]  =====================================================
+                                                 ========== Optimization Info
+                                                     Not using OpenMP
+                                                     Not using CUDA
+                                                     Not using std::thread
+                                                     Defects are not enabled
+                                                     Pinning is not enabled
+                                                     Using double as scalar type
+                                                     Number of  Errors:  0
+                                                     Number of Warnings: 1
+2021-06-01 10:00:00  [  ALL  ] [LLG ] [01] [01]  ------------  Started  LLG Calculation  ------------
+                                                     Solver: Depondt
+2021-06-01 10:00:02  [  ALL  ] [LLG ] [01] [01]  ------------ Terminated LLG Calculation ------------
+                                                 ------- Reason: The force converged
+                                                     Total duration:    0:1:1.646
+                                                     Iterations / sec:  247.78
+                                                     Simulated time:    0.409 ps
+                                                     Solver: Heun
+                                                     Number of  Errors:  2
+"""
+
+
+def test_parse_outfile():
+    """Parse the stdout from a file handle and from a list of lines"""
+    expected = {
+        'runtime': '0:1:1.646',
+        'runtime_sec': 61.646,
+        'it_per_s': 247.78,
+        'simulation_time': 0.409,
+        'simulation_time_unit': 'ps',
+        'num_errors': 0,
+        'num_warnings': 1,
+        'simulation_mode': 'LLG',
+        'solver': 'Depondt',
+        'termination_reason': 'The force converged',
+        'spirit_version_info': {
+            'Version': 'Version:2.2.0\n',
+            'Revision': 'Revision: e82250d3b1441\n',
+            'OpenMP': 'Not using OpenMP',
+            'CUDA': 'Not using CUDA',
+            'std::thread': 'Not using std::thread',
+            'Defects': 'Defects are not enabled',
+            'Pinning': 'Pinning is not enabled',
+            'scalar type': 'Using double as scalar type',
+        },
+    }
+    assert parse_outfile(io.StringIO(STDOUT).readlines()) == expected
+    assert parse_outfile(io.StringIO(STDOUT)) == expected
+    assert parse_outfile(io.BytesIO(STDOUT.encode())) == expected
+
+    # the first occurrence is found also if the keys are in different blocks of the file
+    lines = STDOUT.split('\n')
+    padding = (' ' * 100 + '\n') * (_BLOCK_SIZE // 100)
+    long_stdout = '\n'.join(lines[:14]) + '\n' + padding + '\n'.join(
+        lines[14:])
+    assert parse_outfile(io.StringIO(long_stdout)) == expected
+    assert parse_outfile(io.BytesIO(long_stdout.encode())) == expected
+
+
+def test_parse_run_info():
+    """The run_info.json of the quiet mode gives the same keys as the stdout"""
+    run_info = {
+        'spirit_version': {
+            'version': '2.2.0',
+            'revision': 'e82250d3b1441',
+            'openmp': 'OFF',
+            'cuda': 'OFF',
+            'threads': 'OFF',
+            'defects': 'OFF',
+            'pinning': 'OFF',
+            'scalartype': 'double'
+        },
+        'simulation_mode': 'LLG',
+        'solver': 'Depondt',
+        'num_errors': 0,
+        'num_warnings': 1,
+        'n_iterations': 15277,
+        'runtime_ms': 61646,
+        'it_per_s': 247.78,
+        'simulation_time': 0.409,
+    }
+    out_dict = parse_run_info(run_info)
+    expected = parse_outfile(io.StringIO(STDOUT))
+    for key in [
+            'runtime', 'runtime_sec', 'it_per_s', 'simulation_time',
+            'simulation_time_unit', 'num_errors', 'num_warnings',
+            'simulation_mode', 'solver'
+    ]:
+        assert out_dict[key] == expected[key]
+    assert out_dict['spirit_version_info'] == expected['spirit_version_info']
+    assert out_dict['n_iterations'] == 15277
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+""" Tests for the SpinConfigurationData plugin
+
+"""
+import numpy as np
+import pytest
+from aiida.orm import load_node
+from aiida.plugins import DataFactory
+
+SpinConfigurationData = DataFactory('spirit.spin_configuration')
+
+
+def _random_spins(nspins=50):
+    spins = np.random.default_rng(0).normal(size=(nspins, 3))
+    return spins / np.linalg.norm(spins, axis=1)[:, np.newaxis]
+
+
+def _stored_nbytes(node, name):
+    """Size in bytes of the stored (encoded) array"""
+    return super(SpinConfigurationData, node).get_array(name).nbytes
+
+
+@pytest.mark.parametrize('encoding,angle_bits,atol', [
+    ('float64', 16, 0),
+    ('float32', 16, 1e-7),
+    ('angles', 16, 1e-4),
+    ('angles', 8, 3e-2),
+])
+def test_spin_configuration_encodings(encoding, angle_bits, atol):
+    """Store spins with the different encodings and check the precision after loading them again"""
+    spins = _random_spins()
+    spins[3] = np.nan  # defect
+    node = SpinConfigurationData()
+    node.set_spins('final', spins, encoding=encoding, angle_bits=angle_bits)
+    node.n_basis_cells = [5, 10, 1]
+    node.n_basis_atoms = 1
+    node.store()
+
+    loaded = load_node(node.pk)
+    decoded = loaded.get_array('final')
+    assert decoded.dtype == np.float64
+    assert loaded.get_shape('final') == (50, 3)
+    assert loaded.n_basis_cells == [5, 10, 1]
+    assert (decoded[3] == 0).all()
+    assert loaded.get_defect_mask().sum() == 1
+    assert np.allclose(decoded, np.nan_to_num(spins), rtol=0, atol=atol)
+
+
+def test_spin_configuration_size():
+    """The angles encoding uses a sixth of the size of float64 (the default)"""
+    node = SpinConfigurationData()
+    node.set_spins('initial', _random_spins(), encoding='angles')
+    assert _stored_nbytes(node, 'initial') == 50 * 2 * 2
+    with pytest.raises(ValueError):
+        node.set_spins('final', _random_spins(), encoding='float16')
+    # the default encoding is lossless
+    spins = _random_spins()
+    node.set_spins('final', spins)
+    assert _stored_nbytes(node, 'final') == 50 * 3 * 8
+    assert (node.get_array('final') == spins).all()
+
+
+def test_spin_configuration_get_array_cache():
+    """The decoded spins of a stored node are cached and a single array is returned without a name"""
+    node = SpinConfigurationData()
+    node.set_spins('final', _random_spins(), encoding='angles')
+    assert node.get_array('final') is not node.get_array('final')
+    node.store()
+
+    loaded = load_node(node.pk)
+    decoded = loaded.get_array()
+    assert decoded.shape == (50, 3)
+    assert loaded.get_array('final') is decoded
+    loaded.clear_internal_cache()
+    assert loaded.get_array('final') is not decoded
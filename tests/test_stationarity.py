@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+""" Tests for the stationarity test of finite-temperature LLG runs
+
+"""
+import random
+from aiida_spirit.tools.mc_sampling import BinningAnalysis
+from aiida_spirit.tools.stationarity import StationarityTest
+
+
+def test_stationarity_test():
+    """A relaxing observable is not stationary, the fluctuations around a constant mean are"""
+    test = StationarityTest(BinningAnalysis, window=50, n_sigma=2)
+    rng = random.Random(42)
+    for i in range(99):
+        # relaxation of the energy and the magnetization
+        test.add(-1 + 0.1 * 0.95**i, 0.8 + 0.1 * 0.95**i)
+        assert not test.stationary
+    test.add(-1., 0.8)
+    assert not test.stationary
+
+    for _ in range(200):
+        test.add(-1 + 1e-3 * rng.gauss(0, 1), 0.8 + 1e-3 * rng.gauss(0, 1))
+    assert test.stationary
+    previous, last = test.window_means()
+    assert len(previous) == len(last) == 2
+    assert abs(last[0] + 1) < 1e-3
+
+    # a drift of one of the observables
+    for i in range(100):
+        test.add(-1., 0.8 - 0.001 * i)
+    assert not test.stationary
+
+
+def test_stationarity_test_zero_mean():
+    """Fluctuations around zero are stationary (a relative tolerance would never be reached)"""
+    test = StationarityTest(BinningAnalysis, window=20)
+    rng = random.Random(1)
+    for _ in range(40):
+        test.add(rng.gauss(0, 1e-2), 0.5 * rng.gauss(0, 1))
+    assert test.stationary
+    # a jump of the mean by many standard errors is detected
+    for _ in range(20):
+        test.add(0.1 + rng.gauss(0, 1e-2), 0.5 * rng.gauss(0, 1))
+    assert not test.stationary
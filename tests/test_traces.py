@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+""" Tests for the reduction of convergence traces
+
+"""
+import gzip
+import io
+import numpy as np
+import pytest
+from aiida_spirit.tools.traces import read_trace, reduce_trace, join_restarted_trace
+
+
+def _trace(nrows=100000):
+    """Decaying and oscillating energy trace with a single spike"""
+    iterations = np.arange(nrows) * 10
+    energy = np.exp(-iterations / 2e5) + 0.01 * np.sin(iterations / 1e3)
+    energy[12345] = 5.
+    return np.stack([iterations, energy, 2 * energy], axis=1)
+
+
+@pytest.mark.parametrize('method', ['stride', 'lttb', 'tail'])
+def test_reduce_trace(method):
+    """All methods keep the first and the last row and at most max_rows rows"""
+    data = _trace()
+    reduced, rows = reduce_trace(data, method, max_rows=500)
+    assert len(reduced) <= 500
+    assert np.array_equal(reduced[0], data[0])
+    assert np.array_equal(reduced[-1], data[-1])
+    assert np.array_equal(reduced, data[rows])
+    assert np.all(np.diff(rows) > 0)
+
+
+def test_reduce_trace_lttb_extrema():
+    """The lttb method keeps the spike and short traces are not changed"""
+    data = _trace()
+    reduced, _ = reduce_trace(data, 'lttb', max_rows=500)
+    assert reduced[:, 1].max() == 5.
+    reduced, rows = reduce_trace(data[:100], 'lttb', max_rows=500)
+    assert np.array_equal(reduced, data[:100])
+    assert len(rows) == 100
+    with pytest.raises(ValueError):
+        reduce_trace(data, 'mean')
+
+
+def test_join_restarted_trace():
+    """The iterations of the segments of a chunked run are made cumulative"""
+    segment = np.array([[0, 1.], [100, 2.], [200, 3.], [250, 4.]])
+    data = np.concatenate([segment, segment, segment])
+    joined = join_restarted_trace(data)
+    assert joined[:, 0].tolist() == [
+        0, 100, 200, 250, 250, 350, 450, 500, 500, 600, 700, 750
+    ]
+    assert np.array_equal(joined[:, 1], data[:, 1])
+    # the input is not changed and traces without restarts are kept
+    assert data[-1, 0] == 250
+    assert np.array_equal(join_restarted_trace(segment), segment)
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+@pytest.mark.parametrize('chunk_size', [7, 2**20])
+def test_read_trace(compressed, chunk_size):
+    """The energy archive is read in blocks of lines, also from a gzip stream"""
+    data = _trace()[::100]
+    text = b'  iteration  E_tot  E_2\n' + b''.join(
+        b'%d %.17g %.17g\n' % tuple(row) for row in data)
+    if compressed:
+        text = gzip.compress(text)
+    handle = io.BytesIO(text)
+    with gzip.open(handle) if compressed else handle as _f:
+        assert np.array_equal(read_trace(_f, chunk_size=chunk_size), data)
+    # a single row gives a 2D array, rows with a different number of columns are not accepted
+    assert read_trace(
+        io.BytesIO(b'header\n0 1.5 3.\n')).tolist() == [[0, 1.5, 3.]]
+    assert read_trace(io.BytesIO(b'header\n')).shape == (0, 0)
+    with pytest.raises(ValueError):
+        read_trace(io.BytesIO(b'header\n0 1.5 3.\n10 1.5\n'))
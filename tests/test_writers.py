@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+""" Tests for the streaming input file writers
+
+"""
+import io
+import numpy as np
+import pytest
+from aiida.orm import ArrayData
+from aiida_spirit.tools.writers import (iter_npy_chunks, iter_array_chunks,
+                                        write_couplings, write_pinning,
+                                        write_defects, write_initial_state)
+
+
+def _npy_handle(array):
+    """Return a binary file handle with the array in .npy format"""
+    handle = io.BytesIO()
+    np.save(handle, array)
+    handle.seek(0)
+    return handle
+
+
+def test_iter_npy_chunks():
+    """Check that the chunked reading recovers the full array"""
+    array = np.arange(3 * 17, dtype=float).reshape(17, 3)
+    chunks = list(iter_npy_chunks(_npy_handle(array), chunk_size=5))
+    assert [len(c) for c in chunks] == [5, 5, 5, 2]
+    assert (np.concatenate(chunks) == array).all()
+
+    # fortran ordered arrays are also supported
+    chunks = list(
+        iter_npy_chunks(_npy_handle(np.asfortranarray(array)), chunk_size=5))
+    assert (np.concatenate(chunks) == array).all()
+
+
+def test_iter_array_chunks():
+    """Read the chunks from the repository of an ArrayData node"""
+    array = np.arange(4 * 9, dtype=float).reshape(9, 4)
+    node = ArrayData()
+    node.set_array('test', array)
+    node.store()
+    chunks = list(iter_array_chunks(node, 'test', chunk_size=4))
+    assert len(chunks) == 3
+    assert (np.concatenate(chunks) == array).all()
+
+
+def test_write_couplings_dmi_cutoff():
+    """Write a couplings file with DMI vectors and a cutoff radius"""
+    jijs = np.array([
+        [0, 0, 1, 0, 0, 10.0, 6.0, 0.0, 0.0],
+        [0, 0, 0, 1, 0, 10.0, 0.0, 0.0, 0.0],
+        [0, 0, 2, 0, 0, 1.0, 0.0, 0.0, 3.0],
+    ])
+    positions = np.array([[1., 0., 0.], [0., 1., 0.], [2., 0., 0.]])
+
+    handle = io.StringIO()
+    nwritten = write_couplings(handle,
+                               iter_npy_chunks(_npy_handle(jijs),
+                                               chunk_size=2),
+                               iter_npy_chunks(_npy_handle(positions),
+                                               chunk_size=2),
+                               rcut=1.5)
+    assert nwritten == 2
+    assert handle.getvalue() == (
+        'i\tj\tda\tdb\tdc\tJij\tDij\tDijx\tDijy\tDijz\n'
+        '0\t0\t1\t0\t0\t10.0\t6.0\t1.0\t0.0\t0.0\n'
+        '0\t0\t0\t1\t0\t10.0\t0.0\t0.0\t0.0\t0.0\n')
+
+
+def test_write_couplings_jij_only():
+    """Write a couplings file with only Jij's"""
+    jijs = np.array([[0, 0, 1, 0, 0, 1.5, 7], [0, 0, -1, 0, 0, 1.5, 7]])
+    handle = io.StringIO()
+    write_couplings(handle, [jijs])
+    assert handle.getvalue(
+    ) == 'i\tj\tda\tdb\tdc\tJij\n0\t0\t1\t0\t0\t1.5\n0\t0\t-1\t0\t0\t1.5\n'
+
+
+def test_write_couplings_incomplete_dmi():
+    """Couplings with only two of the three components of the DMI vector are rejected"""
+    jijs = np.array([[0, 0, 1, 0, 0, 10., 6., 0.]])
+    with pytest.raises(ValueError, match='Dx, Dy and Dz'):
+        write_couplings(io.StringIO(), [jijs])
+
+
+def test_write_pinning_defects_initial_state():
+    """Write pinning, defects and initial state files with normalized directions"""
+    pinning = np.array([[0, 1, 0, 0, 0.0, 0.0, 2.0],
+                        [1, 1, 0, 0, 3.0, 0.0, 4.0],
+                        [0, 2, 0, 0, 0.0, -1.0, 0.0]])
+    handle = io.StringIO()
+    assert write_pinning(handle,
+                         iter_npy_chunks(_npy_handle(pinning),
+                                         chunk_size=2)) == 3
+    assert handle.getvalue(
+    ) == '0\t1\t0\t0\t0.0\t0.0\t1.0\n1\t1\t0\t0\t0.6\t0.0\t0.8\n0\t2\t0\t0\t0.0\t-1.0\t0.0\n'
+
+    handle = io.StringIO()
+    write_defects(handle, [np.array([[0, 1, 0, 0, -1], [1, 0, 2, 0, -1]])])
+    assert handle.getvalue() == '0\t1\t0\t0\t-1\n1\t0\t2\t0\t-1\n'
+
+    handle = io.StringIO()
+    write_initial_state(handle, [np.array([[0, 0, 5], [0, -2, 0]])])
+    assert handle.getvalue() == '0.0\t0.0\t1.0\n0.0\t-1.0\t0.0\n'